@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Subject, Topic, LearningPreference, LearningGoal, 
-    LearningSession, Resource, UserResource, Progress
+    LearningSession, Resource, UserResource, Progress, DashboardSnapshot, SessionRollup
 )
 
 
@@ -63,3 +63,18 @@ class ProgressAdmin(admin.ModelAdmin):
     list_filter = ('subject', 'created_at')
     search_fields = ('user__email', 'subject__name')
     readonly_fields = ('created_at', 'last_activity')
+
+
+@admin.register(DashboardSnapshot)
+class DashboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('user', 'section', 'built_at')
+    list_filter = ('section',)
+    search_fields = ('user__email',)
+    readonly_fields = ('built_at',)
+
+
+@admin.register(SessionRollup)
+class SessionRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'period', 'bucket_start', 'subject', 'goal', 'minutes', 'session_count')
+    list_filter = ('period', 'subject')
+    search_fields = ('user__email', 'goal__title')
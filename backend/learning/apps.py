@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class LearningConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'learning'
+
+    def ready(self):
+        # Register the ETag invalidation receivers
+        import learning.signals  # noqa: F401
+        from learning.recommender import start_warm_up
+
+        start_warm_up()
@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    DashboardSnapshot, LearningGoal, LearningPreference, LearningSession, Progress, Resource, UserResource
+)
+from .recommender import get_recommender
+from .serializers import (
+    LearningGoalSerializer, LearningPreferenceSerializer, LearningSessionSerializer,
+    ProgressSerializer, ResourceSerializer
+)
+
+SECTIONS = [section for section, _label in DashboardSnapshot.SECTION_CHOICES]
+RECENT_SESSIONS = 5
+RECOMMENDED_RESOURCES = 5
+
+# Sections to rebuild when a row of each model changes
+SECTION_DEPENDENCIES = {
+    LearningPreference: ('preferences', 'recommended_resources'),
+    LearningGoal: ('goals', 'recent_sessions', 'recommended_resources'),  # sessions show goal_title
+    LearningSession: ('recent_sessions',),
+    UserResource: ('recommended_resources',),
+    Progress: ('progress',),
+}
+
+
+def build_preferences(user_id):
+    preferences = LearningPreference.objects.select_related('subject', 'topic', 'user').filter(user_id=user_id).first()
+    return LearningPreferenceSerializer(preferences).data if preferences else None
+
+
+def build_goals(user_id):
+    goals = LearningGoal.objects.select_related('subject', 'topic', 'user').filter(user_id=user_id)
+    return LearningGoalSerializer(goals, many=True).data
+
+
+def build_recent_sessions(user_id):
+    sessions = LearningSession.objects.select_related('goal', 'user').filter(
+        user_id=user_id,
+    ).order_by('-start_time')[:RECENT_SESSIONS]
+    return LearningSessionSerializer(sessions, many=True).data
+
+
+def build_progress(user_id):
+    records = Progress.objects.select_related('subject', 'topic', 'user').filter(user_id=user_id)
+    return ProgressSerializer(records, many=True).data
+
+
+def build_recommended_resources(user_id):
+    ranked = get_recommender().recommend(user_id, RECOMMENDED_RESOURCES)
+    resources = Resource.objects.select_related('subject', 'topic').in_bulk(ranked)
+    return ResourceSerializer([resources[pk] for pk in ranked if pk in resources], many=True).data
+
+
+SECTION_BUILDERS = {
+    'preferences': build_preferences,
+    'goals': build_goals,
+    'recent_sessions': build_recent_sessions,
+    'progress': build_progress,
+    'recommended_resources': build_recommended_resources,
+}
+
+
+def build_sections(user_id, sections):
+    # Serializer output is made of plain dicts and lists; JSONField stores it as is
+    return {section: SECTION_BUILDERS[section](user_id) for section in sections}
+
+
+def store_sections(user_id, payloads):
+    """Insert snapshot rows in one query, keeping any row another writer stored first"""
+    DashboardSnapshot.objects.bulk_create([
+        DashboardSnapshot(user_id=user_id, section=section, payload=payload) for section, payload in payloads.items()
+    ], ignore_conflicts=True)
+
+
+def get_dashboard(user_id):
+    """Dashboard payload of a user: one query when every section is materialized.
+
+    Missing sections (first visit, catalog change) are built with the
+    select_related queries and stored for the next read. Reads only insert;
+    rebuilding a stored section is left to the writes that change its data.
+    """
+    stored = dict(DashboardSnapshot.objects.filter(user_id=user_id).values_list('section', 'payload'))
+    missing = [section for section in SECTIONS if section not in stored]
+    if missing:
+        built = build_sections(user_id, missing)
+        store_sections(user_id, built)
+        stored.update(built)
+    return {section: stored[section] for section in SECTIONS}
+
+
+def refresh_snapshot_rows(user_id, sections):
+    """Rebuild the materialized sections among sections; users without a snapshot cost one query"""
+    rows = list(DashboardSnapshot.objects.filter(user_id=user_id, section__in=sections).only('id', 'section'))
+    if not rows:
+        return
+    built = build_sections(user_id, [row.section for row in rows])
+    now = timezone.now()
+    for row in rows:
+        row.payload, row.built_at = built[row.section], now
+    DashboardSnapshot.objects.bulk_update(rows, ['payload', 'built_at'])
+
+
+def rebuild_dashboard_sections(user_id, sections):
+    """Rebuild the given sections of one user once the current transaction commits"""
+    sections = [section for section in SECTIONS if section in set(sections)]
+    if user_id is None or not sections:
+        return
+    transaction.on_commit(lambda: refresh_snapshot_rows(user_id, sections))
+
+
+def invalidate_dashboards(sections=None, user_ids=None):
+    """Drop snapshot rows (every section and every user by default); the next read rebuilds them"""
+    snapshots = DashboardSnapshot.objects.all()
+    if sections is not None:
+        snapshots = snapshots.filter(section__in=sections)
+    if user_ids is not None:
+        snapshots = snapshots.filter(user_id__in=user_ids)
+    snapshots.delete()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from learning.models import SessionRollup
+from learning.rollups import rollup_rows
+from roadmap.etags import bump_data_versions
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily and weekly session rollups from the ended learning sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Only rebuild this user id (repeatable)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per bulk INSERT")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rollup rows")
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        rows = rollup_rows(user_ids)
+        existing = SessionRollup.objects.all() if user_ids is None else SessionRollup.objects.filter(user_id__in=user_ids)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(rows)} rollup row(s) would replace {existing.count()}"))
+            return
+
+        with transaction.atomic():
+            # Replace rather than merge: the grouped rows are the complete state
+            removed, _per_model = existing.delete()
+            SessionRollup.objects.bulk_create(rows, batch_size=max(1, options['batch_size']))
+            bump_data_versions({row.user_id for row in rows} | set(user_ids or ()))
+        self.stdout.write(self.style.SUCCESS(f"{len(rows)} rollup row(s) written, {removed} replaced"))
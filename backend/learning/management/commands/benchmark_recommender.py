@@ -0,0 +1,86 @@
+import json
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from learning.recommender import ResourceRecommender, resource_features
+
+WORDS = (
+    'algebra calculus geometry statistics probability python django react databases networking compilers '
+    'operating systems security cryptography machine learning neural networks optimization physics chemistry '
+    'biology history economics writing research methods design patterns testing deployment cloud linux'
+).split()
+TYPES = ['video', 'article', 'book', 'course', 'exercise', 'tutorial']
+LEVELS = ['beginner', 'intermediate', 'advanced']
+
+
+class Command(BaseCommand):
+    help = "Time recommender top-k on a synthetic in-memory catalog (no database rows are written)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=100000, help="Synthetic resources in the matrix")
+        parser.add_argument('--dimensions', type=int, default=128, help="Hashed feature dimensions")
+        parser.add_argument('--users', type=int, default=32, help="Users scored per batched product")
+        parser.add_argument('--k', type=int, default=5, help="Recommendations per user")
+        parser.add_argument('--repeat', type=int, default=20, help="Runs per measurement")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def synthetic_rows(self, count, rng):
+        vocabulary = WORDS + [f'term{index}' for index in range(5000)]
+        for index in range(count):
+            yield (
+                index + 1,
+                ' '.join(rng.choice(vocabulary) for _ in range(4)),
+                ' '.join(rng.choice(vocabulary) for _ in range(30)),
+                rng.choice(TYPES), rng.choice(LEVELS), rng.randint(1, 20), rng.randint(1, 200),
+            )
+
+    def timed(self, run, repeat):
+        run()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        return round((time.perf_counter() - started) / repeat * 1000, 3)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        repeat, k = max(1, options['repeat']), max(1, options['k'])
+        recommender = ResourceRecommender(options['dimensions'])
+        started = time.perf_counter()
+        recommender.upsert(list(self.synthetic_rows(options['resources'], rng)))
+        load_seconds = round(time.perf_counter() - started, 2)
+
+        # Profiles shaped like real ones: a few goal words, catalog facets and some completed rows
+        idf = recommender.idf()
+        vectors = np.zeros((recommender.dimensions, max(1, options['users'])), dtype=np.float32)
+        exclude = []
+        for column in range(vectors.shape[1]):
+            features = resource_features(
+                ' '.join(rng.sample(WORDS, 3)), '', rng.choice(TYPES), rng.choice(LEVELS), rng.randint(1, 20), rng.randint(1, 200),
+            )
+            history = rng.sample(range(recommender.size), 20)
+            vectors[:, column] = (recommender.vectorize(features) + recommender.matrix[history].sum(axis=0)) * idf
+            exclude.append({int(recommender.ids[row]) for row in history})
+
+        single_ms = self.timed(lambda: recommender.top_k(vectors[:, :1], exclude[:1], k), repeat)
+        batch_ms = self.timed(lambda: recommender.top_k(vectors, exclude, k), repeat)
+        new_rows = list(self.synthetic_rows(100, rng))
+        new_rows = [(recommender.size + index + 1, *row[1:]) for index, row in enumerate(new_rows)]
+        upsert_ms = self.timed(lambda: recommender.upsert(new_rows[:1]), repeat)
+        result = {
+            'resources': recommender.size, 'dimensions': recommender.dimensions, 'load_seconds': load_seconds,
+            'top_k_single_ms': single_ms, 'top_k_batch_ms': batch_ms, 'batch_users': vectors.shape[1],
+            'top_k_per_user_ms': round(batch_ms / vectors.shape[1], 3), 'upsert_ms': upsert_ms,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(f"{result['resources']} resources x {result['dimensions']} dimensions loaded in {load_seconds}s")
+        self.stdout.write(f"  top-{k}, one user            {single_ms:>9} ms")
+        self.stdout.write(
+            f"  top-{k}, {result['batch_users']} users batched     {batch_ms:>9} ms "
+            f"({result['top_k_per_user_ms']} ms per user)"
+        )
+        self.stdout.write(f"  add one resource             {upsert_ms:>9} ms")
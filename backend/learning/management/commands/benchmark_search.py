@@ -0,0 +1,93 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from learning.models import Resource, Subject, Topic
+from learning.search import SEARCH_RANK, full_text_search, search_index_available
+
+WORDS = (
+    'algebra calculus geometry statistics probability python django react databases networking compilers '
+    'operating systems security cryptography machine learning neural networks optimization physics chemistry '
+    'biology history economics writing research methods design patterns testing deployment cloud linux'
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare LIKE and FTS5 resource search latency on synthetic resources (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=100000, help="Synthetic resources to search")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query")
+        parser.add_argument('--page-size', type=int, default=50, help="Rows fetched per search")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def synthetic_resources(self, count, subject, topic):
+        rng = random.Random(42)
+        vocabulary = WORDS + [f'term{index}' for index in range(5000)]
+        for index in range(count):
+            title = ' '.join(rng.choice(vocabulary) for _ in range(4))
+            description = ' '.join(rng.choice(vocabulary) for _ in range(30))
+            yield Resource(
+                title=f'{title} {index}', description=description, resource_type='article',
+                subject=subject, topic=topic, difficulty_level='beginner',
+            )
+
+    def timed(self, run, repeat):
+        run()  # Warm the page cache
+        started = time.perf_counter()
+        for _ in range(repeat):
+            rows = run()
+        return round((time.perf_counter() - started) / repeat * 1000, 2), rows
+
+    def handle(self, *args, **options):
+        if not search_index_available(Resource._meta.db_table):
+            raise CommandError("No FTS5 search index on this database; run the learning migrations on SQLite")
+        repeat, page_size = max(1, options['repeat']), max(1, options['page_size'])
+        queries = ['python', 'pyth', 'term4211', 'term42', 'machine learning']
+        results = []
+        try:
+            with transaction.atomic():
+                subject = Subject.objects.create(name='Benchmark subject')
+                topic = Topic.objects.create(subject=subject, name='Benchmark topic')
+                started = time.perf_counter()
+                Resource.objects.bulk_create(
+                    self.synthetic_resources(options['resources'], subject, topic), batch_size=2000,
+                )
+                load_seconds = round(time.perf_counter() - started, 2)
+
+                for text in queries:
+                    like = Q()
+                    for term in text.split():
+                        like &= Q(title__icontains=term) | Q(description__icontains=term)
+                    like_ms, like_rows = self.timed(
+                        lambda: list(Resource.objects.filter(like).order_by('-created_at', '-id')[:page_size]), repeat,
+                    )
+                    fts_ms, fts_rows = self.timed(
+                        lambda: list(full_text_search(Resource.objects.all(), text).order_by(SEARCH_RANK, 'id')[:page_size]),
+                        repeat,
+                    )
+                    results.append({
+                        'query': text, 'like_ms': like_ms, 'fts_ms': fts_ms,
+                        'like_rows': len(like_rows), 'fts_rows': len(fts_rows),
+                    })
+                raise Rollback
+        except Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps({'resources': options['resources'], 'load_seconds': load_seconds, 'queries': results}, indent=2))
+            return
+        self.stdout.write(f"{options['resources']} resources loaded in {load_seconds}s (rolled back)")
+        for row in results:
+            self.stdout.write(
+                f"  {row['query']!r:30} LIKE {row['like_ms']:>9} ms ({row['like_rows']} rows)   "
+                f"FTS5 {row['fts_ms']:>8} ms ({row['fts_rows']} rows)"
+            )
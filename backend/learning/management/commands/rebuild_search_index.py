@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from learning.search import SEARCH_TABLES, create_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the FTS5 search tables and triggers (after a migration remade a table) and rebuild them"
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Full-text search indexes are SQLite only; other databases use LIKE search")
+        for table in SEARCH_TABLES:
+            if not create_search_index(connection, table):
+                raise CommandError("This SQLite build has no FTS5 support")
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt the search index of {table}"))
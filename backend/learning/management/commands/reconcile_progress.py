@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from learning.dashboard import invalidate_dashboards
+from learning.models import Progress
+from learning.progress import COUNTER_FIELDS, aggregate_progress
+from roadmap.etags import bump_data_versions
+
+STORED_FIELDS = COUNTER_FIELDS + ('overall_progress',)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the Progress counters from sessions, completed resources and goals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help="Only reconcile this user id (repeatable)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk INSERT/UPDATE")
+        parser.add_argument('--dry-run', action='store_true', help="Only report the rows that drifted")
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        batch_size = max(1, options['batch_size'])
+        totals = aggregate_progress(user_ids)
+
+        rows = Progress.objects.all() if user_ids is None else Progress.objects.filter(user_id__in=user_ids)
+        existing = {(row.user_id, row.subject_id, row.topic_id): row for row in rows.only('id', 'user_id', 'subject_id', 'topic_id', *STORED_FIELDS)}
+        now = timezone.now()
+
+        changed = []
+        for key, row in existing.items():
+            # Rows with no source data left are zeroed, not deleted
+            expected = totals.get(key) or dict.fromkeys(STORED_FIELDS, 0)
+            if any(getattr(row, field) != expected[field] for field in STORED_FIELDS):
+                for field in STORED_FIELDS:
+                    setattr(row, field, expected[field])
+                row.last_activity = now
+                changed.append(row)
+        missing = [
+            Progress(user_id=user_id, subject_id=subject_id, topic_id=topic_id, **values)
+            for (user_id, subject_id, topic_id), values in totals.items()
+            if (user_id, subject_id, topic_id) not in existing and any(values.values())
+        ]
+
+        if not options['dry_run'] and (changed or missing):
+            with transaction.atomic():
+                Progress.objects.bulk_update(changed, [*STORED_FIELDS, 'last_activity'], batch_size=batch_size)
+                Progress.objects.bulk_create(missing, batch_size=batch_size)
+                # Bulk writes send no signals
+                touched = {row.user_id for row in changed + missing}
+                invalidate_dashboards(sections=['progress'], user_ids=touched)
+                bump_data_versions(touched)
+
+        verb = "would be" if options['dry_run'] else "were"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(changed)} progress row(s) {verb} corrected and {len(missing)} {verb} created "
+            f"({len(existing)} scanned)"
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='learninggoal',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='goal_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='learningsession',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='session_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progress',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='progress_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['-created_at', '-id'], name='resource_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userresource',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='userresource_user_keyset_idx'),
+        ),
+    ]
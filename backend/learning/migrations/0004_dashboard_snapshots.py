@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0003_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(choices=[('preferences', 'Preferences'), ('goals', 'Goals'), ('recent_sessions', 'Recent sessions'), ('progress', 'Progress'), ('recommended_resources', 'Recommended resources')], max_length=30)),
+                ('payload', models.JSONField(blank=True, null=True)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'section')},
+            },
+        ),
+    ]
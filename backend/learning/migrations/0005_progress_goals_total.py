@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_dashboard_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progress',
+            name='goals_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0005_progress_goals_total'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=10)),
+                ('bucket_start', models.DateField()),
+                ('minutes', models.PositiveIntegerField(default=0)),
+                ('session_count', models.PositiveIntegerField(default=0)),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_rollups', to='learning.learninggoal')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='learning.subject')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'period', 'bucket_start'], name='rollup_user_range_idx')],
+                'unique_together': {('user', 'period', 'bucket_start', 'goal')},
+            },
+        ),
+    ]
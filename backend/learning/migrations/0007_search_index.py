@@ -0,0 +1,97 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:39
+
+import django.db.models.deletion
+import learning.search
+from django.db import migrations, models
+
+from django.db.utils import OperationalError
+
+# Frozen copy of the learning.search DDL as of this migration, so later changes there cannot break it
+SEARCH_TABLES = ('learning_resource', 'learning_learninggoal')
+
+
+def create_search_index(cursor, table):
+    fts = f'{table}_fts'
+    try:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"title, description, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+    except OperationalError:
+        return False
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF title, description ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+        f"INSERT INTO {fts}(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+    )
+    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    return True
+
+
+def create_search_indexes(apps, schema_editor):
+    # FTS5 is SQLite only; other backends keep DRF's LIKE search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in SEARCH_TABLES:
+            if not create_search_index(cursor, table):
+                return
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in SEARCH_TABLES:
+            fts = f'{table}_fts'
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0006_session_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearningGoalSearchIndex',
+            fields=[
+                ('goal', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='learning.learninggoal')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('document', learning.search.SearchDocumentField(db_column='learning_learninggoal_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'learning_learninggoal_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourceSearchIndex',
+            fields=[
+                ('resource', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='learning.resource')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('document', learning.search.SearchDocumentField(db_column='learning_resource_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'learning_resource_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
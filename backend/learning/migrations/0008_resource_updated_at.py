@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-17 21:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# SQLite adds and drops this column by rebuilding learning_resource, which drops the triggers keeping
+# its FTS5 index in sync. Frozen copy of the 0007 trigger DDL, run after each rebuild.
+FTS = 'learning_resource_fts'
+SEARCH_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS}_ai AFTER INSERT ON learning_resource BEGIN "
+    f"INSERT INTO {FTS}(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS}_ad AFTER DELETE ON learning_resource BEGIN "
+    f"INSERT INTO {FTS}({FTS}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS}_au AFTER UPDATE OF title, description ON learning_resource BEGIN "
+    f"INSERT INTO {FTS}({FTS}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    f"INSERT INTO {FTS}(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS])
+        if cursor.fetchone() is None:
+            return  # no FTS5 in this SQLite build
+        for statement in SEARCH_TRIGGERS:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='resource',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['updated_at'], name='resource_updated_idx'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 
+from .search import SearchDocumentField
+
 
 class Subject(models.Model):
     """Subject model for organizing learning content"""
@@ -66,6 +68,11 @@ class LearningGoal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='goal_user_keyset_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.email} - {self.title}"
 
@@ -80,6 +87,11 @@ class LearningSession(models.Model):
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='session_user_keyset_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.email} - {self.goal.title} ({self.start_time.date()})"
 
@@ -105,11 +117,28 @@ class Resource(models.Model):
     estimated_duration = models.PositiveIntegerField(help_text="Estimated duration in minutes", null=True, blank=True)
     is_free = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='resource_keyset_idx'),
+            # Recommender processes pick up edits made elsewhere by updated_at
+            models.Index(fields=['updated_at'], name='resource_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.subject.name})"
 
 
+class DeletedResource(models.Model):
+    """Tombstone of a deleted resource, so other processes' recommenders drop it without listing the catalog"""
+    resource_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.resource_id} deleted {self.deleted_at}"
+
+
 class UserResource(models.Model):
     """Track user's interaction with resources"""
     STATUS_CHOICES = [
@@ -130,13 +159,20 @@ class UserResource(models.Model):
     
     class Meta:
         unique_together = ['user', 'resource']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='userresource_user_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.resource.title}"
 
 
 class Progress(models.Model):
-    """Overall learning progress tracking"""
+    """Overall learning progress tracking.
+
+    Counters are maintained by learning.progress from session, resource and
+    goal changes; overall_progress is the share of goals completed.
+    """
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='progress_records')
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE)
@@ -144,11 +180,100 @@ class Progress(models.Model):
     time_spent_minutes = models.PositiveIntegerField(default=0)
     resources_completed = models.PositiveIntegerField(default=0)
     goals_completed = models.PositiveIntegerField(default=0)
+    goals_total = models.PositiveIntegerField(default=0)
     last_activity = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         unique_together = ['user', 'subject', 'topic']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='progress_user_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.subject.name} ({self.overall_progress}%)"
+
+
+class DashboardSnapshot(models.Model):
+    """One precomputed section of a user's dashboard payload.
+
+    Rows are rebuilt per section when the data behind them changes, so a
+    dashboard read is a single query over at most one row per section.
+    """
+    SECTION_CHOICES = [
+        ('preferences', 'Preferences'),
+        ('goals', 'Goals'),
+        ('recent_sessions', 'Recent sessions'),
+        ('progress', 'Progress'),
+        ('recommended_resources', 'Recommended resources'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='dashboard_snapshots')
+    section = models.CharField(max_length=30, choices=SECTION_CHOICES)
+    payload = models.JSONField(null=True, blank=True)
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'section']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.section}"
+
+
+class SessionRollup(models.Model):
+    """Minutes of ended learning sessions per user, goal and day or week.
+
+    Maintained incrementally as sessions end, so charts read one row per
+    bucket instead of every session. Weeks start on Monday.
+    """
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='session_rollups')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    bucket_start = models.DateField()
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    goal = models.ForeignKey(LearningGoal, on_delete=models.CASCADE, related_name='session_rollups')
+    minutes = models.PositiveIntegerField(default=0)
+    session_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'period', 'bucket_start', 'goal']
+        indexes = [
+            models.Index(fields=['user', 'period', 'bucket_start'], name='rollup_user_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.period} {self.bucket_start}: {self.minutes} min"
+
+
+class ResourceSearchIndex(models.Model):
+    """Row of the SQLite FTS5 index over Resource, kept in sync by triggers (see learning.search)"""
+    resource = models.OneToOneField(
+        Resource, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING, related_name='search_index',
+    )
+    title = models.TextField()
+    description = models.TextField()
+    document = SearchDocumentField(db_column='learning_resource_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'learning_resource_fts'
+
+
+class LearningGoalSearchIndex(models.Model):
+    """Row of the SQLite FTS5 index over LearningGoal, kept in sync by triggers (see learning.search)"""
+    goal = models.OneToOneField(
+        LearningGoal, primary_key=True, db_column='rowid', on_delete=models.DO_NOTHING, related_name='search_index',
+    )
+    title = models.TextField()
+    description = models.TextField()
+    document = SearchDocumentField(db_column='learning_learninggoal_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'learning_learninggoal_fts'
@@ -0,0 +1,166 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from roadmap.etags import bump_data_version
+from .dashboard import rebuild_dashboard_sections
+from .models import LearningGoal, LearningSession, Progress, Resource, UserResource
+
+COUNTER_FIELDS = ('time_spent_minutes', 'resources_completed', 'goals_completed', 'goals_total')
+
+
+def overall_progress(goals_completed, goals_total):
+    return min(100, goals_completed * 100 // goals_total) if goals_total else 0
+
+
+def increment_counters(model, lookup, deltas, create_defaults=None, **updates):
+    """Add deltas to the counters of the row matching lookup in one UPDATE, creating the row if needed.
+
+    Counters never go below zero. A row is only created for positive
+    deltas, so removals cascading from a deleted parent are no-ops.
+    Returns whether a row was written.
+    """
+    rows = model.objects.filter(**lookup)
+    changes = {field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items() if delta}
+    changes.update(updates)
+    if rows.update(**changes):
+        return True
+    if not any(delta > 0 for delta in deltas.values()):
+        return False
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **{field: max(delta, 0) for field, delta in deltas.items()}, **(create_defaults or {}))
+    except IntegrityError:
+        # Another worker created the row between our update and insert
+        rows.update(**changes)
+    return True
+
+
+def add_progress(user_id, subject_id, topic_id, **deltas):
+    """Move the Progress counters of (user, subject, topic) by deltas, creating the row if needed"""
+    deltas = {field: int(deltas.get(field) or 0) for field in COUNTER_FIELDS}
+    if not any(deltas.values()) or None in (user_id, subject_id, topic_id):
+        return
+    updates = {'last_activity': timezone.now()}
+    if deltas['goals_completed'] or deltas['goals_total']:
+        # Computed from the new counters in the same statement
+        completed = Greatest(F('goals_completed') + deltas['goals_completed'], Value(0))
+        total = Greatest(F('goals_total') + deltas['goals_total'], Value(0))
+        updates['overall_progress'] = Case(
+            When(GreaterThan(total, 0), then=Least(completed * 100 / total, Value(100))),
+            default=Value(0),
+        )
+    created_progress = overall_progress(max(deltas['goals_completed'], 0), max(deltas['goals_total'], 0))
+    lookup = {'user_id': user_id, 'subject_id': subject_id, 'topic_id': topic_id}
+    if increment_counters(Progress, lookup, deltas, create_defaults={'overall_progress': created_progress}, **updates):
+        # Queryset updates send no signals
+        rebuild_dashboard_sections(user_id, ['progress'])
+        bump_data_version(user_id)
+
+
+def goal_key(goal_id, goal=None):
+    """(subject_id, topic_id) of a goal, from the loaded instance when there is one"""
+    if goal is not None:
+        return goal.subject_id, goal.topic_id
+    return LearningGoal.objects.filter(pk=goal_id).values_list('subject_id', 'topic_id').first() or (None, None)
+
+
+def resource_key(resource_id, resource=None):
+    if resource is not None:
+        return resource.subject_id, resource.topic_id
+    return Resource.objects.filter(pk=resource_id).values_list('subject_id', 'topic_id').first() or (None, None)
+
+
+def goal_changed(goal, previous):
+    """Apply a goal save; previous holds its loaded status, subject_id and topic_id, None when created"""
+    completed = goal.status == 'completed'
+    key = (goal.subject_id, goal.topic_id)
+    if previous is None:
+        add_progress(goal.user_id, *key, goals_total=1, goals_completed=int(completed))
+        return
+    old_key = (previous['subject_id'], previous['topic_id'])
+    was_completed = previous['status'] == 'completed'
+    if old_key != key:
+        # The goal moved: its goal counts and its sessions' time move with it
+        minutes = goal.sessions.aggregate(total=Sum('duration_minutes'))['total'] or 0
+        add_progress(goal.user_id, *old_key, goals_total=-1, goals_completed=-int(was_completed), time_spent_minutes=-minutes)
+        add_progress(goal.user_id, *key, goals_total=1, goals_completed=int(completed), time_spent_minutes=minutes)
+    elif completed != was_completed:
+        add_progress(goal.user_id, *key, goals_completed=1 if completed else -1)
+
+
+def goal_removed(goal):
+    add_progress(goal.user_id, goal.subject_id, goal.topic_id,
+                 goals_total=-1, goals_completed=-int(goal.status == 'completed'))
+
+
+def session_changed(session, previous):
+    """Apply a session save; previous holds its loaded duration_minutes and goal_id, None when created"""
+    previous = previous or {'duration_minutes': 0, 'goal_id': session.goal_id}
+    old_goal_id = previous['goal_id']
+    minutes, old_minutes = int(session.duration_minutes or 0), int(previous['duration_minutes'] or 0)
+    goal = session.goal if LearningSession.goal.is_cached(session) else None
+    if old_goal_id != session.goal_id:
+        add_progress(session.user_id, *goal_key(old_goal_id), time_spent_minutes=-old_minutes)
+        add_progress(session.user_id, *goal_key(session.goal_id, goal), time_spent_minutes=minutes)
+    elif minutes != old_minutes:
+        add_progress(session.user_id, *goal_key(session.goal_id, goal), time_spent_minutes=minutes - old_minutes)
+
+
+def session_removed(session):
+    minutes = int(session.duration_minutes or 0)
+    if minutes:
+        add_progress(session.user_id, *goal_key(session.goal_id), time_spent_minutes=-minutes)
+
+
+def user_resource_changed(user_resource, previous):
+    """Apply a user resource save; previous holds its loaded status and resource_id, None when created"""
+    previous = previous or {'status': None, 'resource_id': user_resource.resource_id}
+    old_status, old_resource_id = previous['status'], previous['resource_id']
+    was_completed, completed = old_status == 'completed', user_resource.status == 'completed'
+    if (was_completed, old_resource_id) == (completed, user_resource.resource_id):
+        return
+    resource = user_resource.resource if UserResource.resource.is_cached(user_resource) else None
+    if was_completed:
+        add_progress(user_resource.user_id, *resource_key(old_resource_id), resources_completed=-1)
+    if completed:
+        add_progress(user_resource.user_id, *resource_key(user_resource.resource_id, resource), resources_completed=1)
+
+
+def user_resource_removed(user_resource):
+    if user_resource.status == 'completed':
+        add_progress(user_resource.user_id, *resource_key(user_resource.resource_id), resources_completed=-1)
+
+
+def aggregate_progress(user_ids=None):
+    """{(user_id, subject_id, topic_id): counters} rebuilt from the source tables, one grouped query per table"""
+    sessions = LearningSession.objects.all()
+    resources = UserResource.objects.filter(status='completed')
+    goals = LearningGoal.objects.all()
+    if user_ids is not None:
+        sessions, resources, goals = (queryset.filter(user_id__in=user_ids) for queryset in (sessions, resources, goals))
+
+    totals = {}
+
+    def counters(key):
+        return totals.setdefault(key, dict.fromkeys(COUNTER_FIELDS, 0))
+
+    for user_id, subject_id, topic_id, minutes in sessions.values_list(
+        'user_id', 'goal__subject_id', 'goal__topic_id',
+    ).annotate(minutes=Sum('duration_minutes')).order_by():
+        counters((user_id, subject_id, topic_id))['time_spent_minutes'] = minutes or 0
+    for user_id, subject_id, topic_id, completed in resources.values_list(
+        'user_id', 'resource__subject_id', 'resource__topic_id',
+    ).annotate(completed=Count('id')).order_by():
+        counters((user_id, subject_id, topic_id))['resources_completed'] = completed
+    for user_id, subject_id, topic_id, total, completed in goals.values_list(
+        'user_id', 'subject_id', 'topic_id',
+    ).annotate(total=Count('id'), completed=Count('id', filter=Q(status='completed'))).order_by():
+        row = counters((user_id, subject_id, topic_id))
+        row['goals_total'], row['goals_completed'] = total, completed
+
+    for row in totals.values():
+        row['overall_progress'] = overall_progress(row['goals_completed'], row['goals_total'])
+    return totals
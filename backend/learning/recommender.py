@@ -0,0 +1,312 @@
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from roadmap.etags import data_versions
+from .models import DeletedResource, LearningGoal, LearningPreference, Resource, UserResource
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset('a an and are as at be by for from in into is it of on or the to with your you'.split())
+RESOURCE_FIELDS = ('id', 'title', 'description', 'resource_type', 'difficulty_level', 'subject_id', 'topic_id')
+
+# Feature weights: title words count twice the description's; catalog facets are single strong features
+TITLE_WEIGHT = 2.0
+TEXT_WEIGHT = 1.0
+FACET_WEIGHT = 3.0
+PREFERENCE_WEIGHT = 3.0
+HISTORY_WEIGHT = 1.0
+MAX_CACHED_FEATURES = 200000
+
+
+def tokens(text):
+    return [token for token in TOKEN_RE.findall((text or '').lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def resource_features(title, description, resource_type, difficulty_level, subject_id, topic_id):
+    """{feature: weight} of a resource: its words and its catalog facets"""
+    features = {}
+    for token in tokens(title):
+        features[token] = features.get(token, 0.0) + TITLE_WEIGHT
+    for token in tokens(description):
+        features[token] = features.get(token, 0.0) + TEXT_WEIGHT
+    for facet in (f'type:{resource_type}', f'difficulty:{difficulty_level}', f'subject:{subject_id}', f'topic:{topic_id}'):
+        features[facet] = features.get(facet, 0.0) + FACET_WEIGHT
+    return features
+
+
+class ResourceRecommender:
+    """Content-based recommender over a hashed feature matrix of the Resource catalog.
+
+    Each resource is a row of sublinear term weights hashed into
+    `dimensions` signed buckets and L2-normalized. A user is a vector over
+    the same buckets built from preferences, open goals and resource
+    history, weighted by IDF. Scoring every resource is one matrix product.
+    Rows are appended, replaced or dropped in place as resources change, so
+    the matrix is never rebuilt for catalog edits.
+    """
+
+    def __init__(self, dimensions=128):
+        self.dimensions = dimensions
+        self.matrix = np.zeros((0, dimensions), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self.size = 0
+        self.row_of = {}
+        self.document_frequency = np.zeros(dimensions, dtype=np.float32)
+        self.buckets = {}  # feature -> (bucket, sign)
+        self.lock = threading.RLock()
+
+    def vectorize(self, features):
+        values = [0.0] * self.dimensions
+        for feature, weight in features.items():
+            bucket = self.buckets.get(feature)
+            if bucket is None:
+                if len(self.buckets) >= MAX_CACHED_FEATURES:
+                    self.buckets.clear()
+                digest = zlib.crc32(feature.encode('utf-8'))
+                # The sign bit keeps colliding features from always adding up
+                bucket = self.buckets[feature] = (digest % self.dimensions, 1.0 if digest & 0x80000000 else -1.0)
+            values[bucket[0]] += bucket[1] * (1.0 + math.log(weight))
+        return np.array(values, dtype=np.float32)
+
+    def row_vector(self, row):
+        vector = self.vectorize(resource_features(*row[1:]))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def idf(self):
+        documents = max(int(self.active[:self.size].sum()), 1)
+        return (np.log((1.0 + documents) / (1.0 + self.document_frequency)) + 1.0).astype(np.float32)
+
+    def reserve(self, rows):
+        if self.size + rows <= len(self.ids):
+            return
+        capacity = max(self.size + rows, 2 * len(self.ids), 64)
+        matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        matrix[:self.size] = self.matrix[:self.size]
+        ids, active = np.zeros(capacity, dtype=np.int64), np.zeros(capacity, dtype=bool)
+        ids[:self.size], active[:self.size] = self.ids[:self.size], self.active[:self.size]
+        self.matrix, self.ids, self.active = matrix, ids, active
+
+    def upsert(self, rows):
+        """Add or replace resources given as RESOURCE_FIELDS tuples"""
+        with self.lock:
+            self.reserve(len(rows))
+            for row in rows:
+                vector = self.row_vector(row)
+                index = self.row_of.get(row[0])
+                if index is None:
+                    index = self.row_of[row[0]] = self.size
+                    self.ids[index], self.active[index] = row[0], True
+                    self.size += 1
+                else:
+                    self.document_frequency -= self.matrix[index] != 0
+                self.matrix[index] = vector
+                self.document_frequency += vector != 0
+
+    def remove(self, resource_ids):
+        """Drop resources from the results; their rows are zeroed and left in place"""
+        with self.lock:
+            for resource_id in resource_ids:
+                index = self.row_of.pop(resource_id, None)
+                if index is not None:
+                    self.document_frequency -= self.matrix[index] != 0
+                    self.matrix[index] = 0
+                    self.active[index] = False
+
+    def user_vectors(self, user_ids):
+        """(profile matrix with one column per user, resource ids each user already has); three queries.
+
+        A profile adds up the user's preferred subject, topic and level, the
+        words and catalog of their open goals, and the rows of the resources
+        they completed. Every resource they have is excluded from the results.
+        """
+        features = {user_id: {} for user_id in user_ids}
+        seen = {user_id: set() for user_id in user_ids}
+        completed = {user_id: [] for user_id in user_ids}
+
+        def add(user_id, feature, weight):
+            features[user_id][feature] = features[user_id].get(feature, 0.0) + weight
+
+        preferences = LearningPreference.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'subject_id', 'topic_id', 'proficiency_level',
+        )
+        for user_id, subject_id, topic_id, level in preferences:
+            for facet in (f'subject:{subject_id}', f'topic:{topic_id}', f'difficulty:{level}'):
+                add(user_id, facet, PREFERENCE_WEIGHT)
+        goals = LearningGoal.objects.filter(user_id__in=user_ids).exclude(status='completed').values_list(
+            'user_id', 'title', 'description', 'subject_id', 'topic_id',
+        )
+        for user_id, title, description, subject_id, topic_id in goals:
+            for feature in (*tokens(title), *tokens(description), f'subject:{subject_id}', f'topic:{topic_id}'):
+                add(user_id, feature, TEXT_WEIGHT)
+        history = UserResource.objects.filter(user_id__in=user_ids).values_list('user_id', 'resource_id', 'status')
+        for user_id, resource_id, status in history:
+            seen[user_id].add(resource_id)
+            if status == 'completed' and resource_id in self.row_of:
+                completed[user_id].append(self.row_of[resource_id])
+
+        vectors = np.zeros((self.dimensions, len(user_ids)), dtype=np.float32)
+        with self.lock:
+            for column, user_id in enumerate(user_ids):
+                vectors[:, column] = self.vectorize(features[user_id])
+                if completed[user_id]:
+                    vectors[:, column] += HISTORY_WEIGHT * self.matrix[completed[user_id]].sum(axis=0)
+            vectors *= self.idf()[:, None]
+        return vectors, [seen[user_id] for user_id in user_ids]
+
+    def top_k(self, vectors, exclude, k):
+        """Top k resource ids for each column of vectors, in one matrix product"""
+        with self.lock:
+            if not self.size:
+                return [[] for _ in exclude]
+            scores = self.matrix[:self.size] @ vectors
+            results = []
+            for column, seen in enumerate(exclude):
+                # Removed rows are zero vectors, so the score > 0 cut below drops them
+                column_scores = scores[:, column].copy()
+                if seen:
+                    rows = [self.row_of[resource_id] for resource_id in seen if resource_id in self.row_of]
+                    column_scores[rows] = -np.inf
+                count = min(k, self.size)
+                best = np.argpartition(-column_scores, count - 1)[:count]
+                best = best[np.argsort(-column_scores[best], kind='stable')]
+                results.append([int(self.ids[row]) for row in best if column_scores[row] > 0])
+            return results
+
+    def recommend_many(self, user_ids, k=5):
+        """{user_id: [resource_id, ...]} best first; resources a user already has are left out"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        vectors, seen = self.user_vectors(user_ids)
+        return dict(zip(user_ids, self.top_k(vectors, seen, k)))
+
+    def recommend(self, user_id, k=5):
+        return self.recommend_many([user_id], k)[user_id]
+
+
+_recommender = None
+_recommender_lock = threading.Lock()
+_catalog_version = None
+_checked_at = 0.0
+_synced_at = None
+# Re-read edits slightly older than the last sync: a transaction may commit after a later one started
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def load_catalog(recommender):
+    rows = list(Resource.objects.values_list(*RESOURCE_FIELDS).order_by('id'))
+    recommender.upsert(rows)
+    return recommender
+
+
+def get_recommender():
+    """The process-wide recommender, built on first use and kept in step with the catalog.
+
+    Resource saves in this process update it directly. Changes made by other
+    processes show up as a new catalog data version (checked at most every
+    RECOMMENDER_SYNC_SECONDS); then resources created or edited since the
+    last sync are upserted and deleted ones dropped, without a rebuild. A
+    process that last synced before the oldest kept tombstone reloads the
+    catalog instead. Stored recommended_resources sections are invalidated
+    by the writing process (see learning.signals), not here.
+    """
+    global _recommender, _catalog_version, _checked_at, _synced_at
+    with _recommender_lock:
+        now = time.monotonic()
+        if _recommender is None:
+            _catalog_version, _modified = data_versions()
+            _synced_at = timezone.now()
+            _recommender = load_catalog(ResourceRecommender(getattr(settings, 'RECOMMENDER_DIMENSIONS', 128)))
+            _checked_at = now
+        elif now - _checked_at >= getattr(settings, 'RECOMMENDER_SYNC_SECONDS', 5):
+            _checked_at = now
+            version, _modified = data_versions()
+            if version != _catalog_version:
+                since, _synced_at, _catalog_version = _synced_at, timezone.now(), version
+                if since - SYNC_OVERLAP < _synced_at - tombstone_retention():
+                    _recommender = load_catalog(ResourceRecommender(getattr(settings, 'RECOMMENDER_DIMENSIONS', 128)))
+                else:
+                    sync_catalog(_recommender, since - SYNC_OVERLAP)
+        return _recommender
+
+
+def tombstone_retention():
+    return timedelta(hours=getattr(settings, 'RECOMMENDER_TOMBSTONE_HOURS', 24))
+
+
+def sync_catalog(recommender, since):
+    """Upsert resources created or edited since `since` and drop those deleted since; two indexed queries"""
+    recommender.upsert(list(Resource.objects.filter(updated_at__gte=since).values_list(*RESOURCE_FIELDS).order_by('id')))
+    recommender.remove(list(DeletedResource.objects.filter(deleted_at__gte=since).values_list('resource_id', flat=True)))
+
+
+def record_deletion(resource_id):
+    """Leave a tombstone for other processes' recommenders, pruning those older than the retention"""
+    DeletedResource.objects.filter(deleted_at__lt=timezone.now() - tombstone_retention()).delete()
+    DeletedResource.objects.create(resource_id=resource_id)
+
+
+def warm_recommender():
+    """Load the catalog, so no request waits on the first build"""
+    try:
+        get_recommender()
+    except Exception:
+        # e.g. the tables are not migrated yet; the first dashboard read loads it instead
+        logger.exception("Recommender not warmed")
+
+
+def warm_in_background():
+    try:
+        warm_recommender()
+    finally:
+        # The thread's own connection
+        connection.close()
+
+
+def start_warm_up(argv=None):
+    """Warm the recommender in a background thread of a server process, if RECOMMENDER_WARM_ON_START is set.
+
+    Called from LearningConfig.ready(), so it runs no query itself. Management
+    commands (tests, migrate, ...) are skipped, and so is the file watching
+    parent process of runserver.
+    """
+    argv = sys.argv if argv is None else argv
+    if not getattr(settings, 'RECOMMENDER_WARM_ON_START', False):
+        return None
+    if argv and os.path.basename(argv[0]) in ('manage.py', 'django-admin'):
+        if argv[1:2] != ['runserver'] or ('--noreload' not in argv and os.environ.get('RUN_MAIN') != 'true'):
+            return None
+    thread = threading.Thread(target=warm_in_background, name='recommender-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def resource_changed(resource):
+    if _recommender is not None:
+        _recommender.upsert([tuple(getattr(resource, field) for field in RESOURCE_FIELDS)])
+
+
+def resource_removed(resource_id):
+    if _recommender is not None:
+        _recommender.remove([resource_id])
+
+
+def reset_recommender():
+    global _recommender, _catalog_version, _synced_at
+    with _recommender_lock:
+        _recommender, _catalog_version, _synced_at = None, None, None
@@ -0,0 +1,151 @@
+from datetime import date, timedelta
+
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import LearningSession, SessionRollup
+from .progress import goal_key, increment_counters
+
+BUCKETS = ('day', 'week', 'month')
+
+
+def session_day(start_time):
+    """Calendar day a session counts towards, in the current time zone like TruncDate"""
+    return timezone.localtime(start_time).date() if timezone.is_aware(start_time) else start_time.date()
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, bucket):
+    if bucket == 'week':
+        return start + timedelta(days=7)
+    if bucket == 'month':
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def add_session_minutes(user_id, goal_id, day, minutes, sessions, goal=None):
+    """Move the day and week rollups of (user, goal) containing day"""
+    if not (minutes or sessions) or goal_id is None:
+        return
+    subject_id = None
+    for period in ('day', 'week'):
+        lookup = {'user_id': user_id, 'period': period, 'bucket_start': bucket_start(day, period), 'goal_id': goal_id}
+        if subject_id is None and (minutes > 0 or sessions > 0):
+            # Only needed when the rollup row may have to be created
+            subject_id, _topic_id = goal_key(goal_id, goal)
+            if subject_id is None:
+                return
+        increment_counters(
+            SessionRollup, lookup, {'minutes': minutes, 'session_count': sessions},
+            create_defaults={'subject_id': subject_id},
+        )
+
+
+def session_contribution(state):
+    """(day, goal_id, minutes) an ended session adds to the rollups, None while it is running"""
+    if state is None or state['duration_minutes'] is None or state['start_time'] is None:
+        return None
+    # Instances built from request data may still hold the start time as a string
+    start_time = LearningSession._meta.get_field('start_time').to_python(state['start_time'])
+    return session_day(start_time), state['goal_id'], int(state['duration_minutes'])
+
+
+def session_changed(session, previous):
+    """Apply a session save; only ended sessions (with a duration) are rolled up"""
+    old = session_contribution(previous)
+    new = session_contribution({
+        'duration_minutes': session.duration_minutes, 'goal_id': session.goal_id, 'start_time': session.start_time,
+    })
+    if old == new:
+        return
+    goal = session.goal if LearningSession.goal.is_cached(session) else None
+    if old is not None and new is not None and old[:2] == new[:2]:
+        add_session_minutes(session.user_id, new[1], new[0], new[2] - old[2], 0, goal)
+        return
+    if old is not None:
+        add_session_minutes(session.user_id, old[1], old[0], -old[2], -1)
+    if new is not None:
+        add_session_minutes(session.user_id, new[1], new[0], new[2], 1, goal)
+
+
+def session_removed(session):
+    contribution = session_contribution({
+        'duration_minutes': session.duration_minutes, 'goal_id': session.goal_id, 'start_time': session.start_time,
+    })
+    if contribution is not None:
+        day, goal_id, minutes = contribution
+        add_session_minutes(session.user_id, goal_id, day, -minutes, -1)
+
+
+def goal_changed(goal, previous):
+    """Rollup rows carry the goal's subject for filtering; follow it when the goal moves"""
+    if previous is not None and previous['subject_id'] != goal.subject_id:
+        SessionRollup.objects.filter(goal=goal).update(subject_id=goal.subject_id)
+
+
+def rollup_rows(user_ids=None):
+    """SessionRollup rows rebuilt from the ended sessions, one grouped query per period"""
+    sessions = LearningSession.objects.filter(duration_minutes__isnull=False)
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+    truncs = {'day': TruncDate('start_time'), 'week': TruncWeek('start_time', output_field=DateField())}
+    rows = []
+    for period, trunc in truncs.items():
+        grouped = sessions.annotate(bucket=trunc).values(
+            'user_id', 'goal_id', 'goal__subject_id', 'bucket',
+        ).annotate(minutes=Sum('duration_minutes'), sessions=Count('id')).order_by()
+        rows.extend(
+            SessionRollup(
+                user_id=row['user_id'], period=period, bucket_start=row['bucket'], goal_id=row['goal_id'],
+                subject_id=row['goal__subject_id'], minutes=row['minutes'] or 0, session_count=row['sessions'],
+            )
+            for row in grouped
+        )
+    return rows
+
+
+def session_minutes(user_id, start, end, bucket='day', subject_id=None, goal_id=None):
+    """Minutes and ended sessions per bucket between start and end (inclusive), zero-filled.
+
+    Buckets are aligned (weeks start on Monday, months on the 1st), so the
+    first one may begin before start. Day and week buckets read their own
+    rollup rows; months group the daily rows.
+    """
+    first = bucket_start(start, bucket)
+    rows = SessionRollup.objects.filter(user_id=user_id, period='week' if bucket == 'week' else 'day')
+    if subject_id is not None:
+        rows = rows.filter(subject_id=subject_id)
+    if goal_id is not None:
+        rows = rows.filter(goal_id=goal_id)
+    rows = rows.filter(bucket_start__range=(first, end))
+    if bucket == 'month':
+        rows = rows.annotate(bucket=TruncMonth('bucket_start')).values('bucket')
+    else:
+        rows = rows.values(bucket=F('bucket_start'))
+    totals = {
+        row['bucket']: (row['minutes'], row['sessions'])
+        for row in rows.annotate(minutes=Sum('minutes'), sessions=Sum('session_count')).order_by()
+    }
+
+    buckets = []
+    current = first
+    while current <= end:
+        minutes, sessions = totals.get(current, (0, 0))
+        buckets.append({'start': current.isoformat(), 'minutes': minutes, 'sessions': sessions})
+        current = next_bucket(current, bucket)
+    return buckets
+
+
+def bucket_count(start, end, bucket):
+    first = bucket_start(start, bucket)
+    if bucket == 'month':
+        return (end.year - first.year) * 12 + end.month - first.month + 1
+    return (end - first).days // (7 if bucket == 'week' else 1) + 1
@@ -0,0 +1,130 @@
+import re
+
+from django.db import connection, models
+from django.db.models import F, Lookup
+from django.db.utils import DatabaseError, OperationalError
+from rest_framework import filters
+
+SEARCH_RANK = 'search_rank'
+# Tables with an FTS5 index over title and description
+SEARCH_TABLES = ('learning_resource', 'learning_learninggoal')
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+
+_available = {}
+
+
+def fts_table(table):
+    return f'{table}_fts'
+
+
+def create_search_index(db_connection, table):
+    """Create (if missing) the external-content FTS5 table and sync triggers of table, then rebuild it.
+
+    Returns False when SQLite was built without FTS5. Safe to re-run: the
+    SQLite schema editor drops triggers when it remakes a table, and running
+    this again restores them.
+    """
+    fts = fts_table(table)
+    with db_connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"title, description, content='{table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        except OperationalError:
+            return False
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF title, description ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+            f"INSERT INTO {fts}(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+        )
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    _available.pop(table, None)
+    return True
+
+
+def drop_search_index(db_connection, table):
+    fts = fts_table(table)
+    with db_connection.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+    _available.pop(table, None)
+
+
+def search_index_available(table):
+    """Whether table has an FTS5 index on this database; checked once per process"""
+    if connection.vendor != 'sqlite':
+        return False
+    if table not in _available:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [fts_table(table)])
+                _available[table] = cursor.fetchone() is not None
+        except DatabaseError:
+            _available[table] = False
+    return _available[table]
+
+
+def fts_query(text):
+    """FTS5 MATCH expression for user input: every word must match, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation typed by the user
+    are never interpreted. Returns None when nothing searchable is left.
+    """
+    terms = TERM_RE.findall(text or '')[:MAX_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'  # Search as you type: the word being typed is a prefix
+    return ' '.join(quoted)
+
+
+class SearchDocumentField(models.TextField):
+    """The FTS5 hidden column named after its table; only usable with the match lookup"""
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def full_text_search(queryset, text):
+    """queryset narrowed to FTS matches of text and annotated with their BM25 search_rank (lower is better).
+
+    The index is joined on rowid, so SQLite scans the FTS matches and looks
+    each row up by primary key; nothing is evaluated per table row.
+    """
+    match = fts_query(text)
+    if match is None:
+        return queryset
+    return queryset.filter(search_index__document__match=match).annotate(**{SEARCH_RANK: F('search_index__rank')})
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """SearchFilter backed by the FTS5 index, ranked by BM25.
+
+    On databases without the index this is DRF's SearchFilter (LIKE over
+    search_fields). Ranked results page in rank order with KeysetPagination.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = ' '.join(self.get_search_terms(request))
+        if fts_query(text) is None or not search_index_available(queryset.model._meta.db_table):
+            return super().filter_queryset(request, queryset, view)
+        return full_text_search(queryset, text)
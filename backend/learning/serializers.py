@@ -64,7 +64,7 @@ class ResourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Resource
         fields = '__all__'
-        read_only_fields = ('created_at',)
+        read_only_fields = ('created_at', 'updated_at')
 
 
 class UserResourceSerializer(serializers.ModelSerializer):
@@ -88,7 +88,10 @@ class ProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Progress
         fields = '__all__'
-        read_only_fields = ('user', 'created_at', 'last_activity')
+        read_only_fields = (
+            'user', 'created_at', 'last_activity', 'overall_progress', 'time_spent_minutes',
+            'resources_completed', 'goals_completed', 'goals_total',
+        )
 
 
 # Nested serializers for detailed views
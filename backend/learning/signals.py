@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_init, post_save
+from django.db import transaction
+from django.dispatch import receiver
+
+from roadmap.etags import bump_data_version
+from . import progress, recommender, rollups
+from .dashboard import SECTION_DEPENDENCIES, invalidate_dashboards, rebuild_dashboard_sections
+from .models import (
+    Subject, Topic, LearningPreference, LearningGoal,
+    LearningSession, Resource, UserResource, Progress
+)
+
+
+# Loaded values the Progress and rollup aggregates depend on, to turn a save into a delta
+AGGREGATE_STATE_FIELDS = {
+    LearningGoal: ('status', 'subject_id', 'topic_id'),
+    LearningSession: ('duration_minutes', 'goal_id', 'start_time'),
+    UserResource: ('status', 'resource_id'),
+}
+# (on save, on delete) handlers per model, in order
+AGGREGATE_HANDLERS = {
+    LearningGoal: [(progress.goal_changed, progress.goal_removed), (rollups.goal_changed, None)],
+    LearningSession: [(progress.session_changed, progress.session_removed), (rollups.session_changed, rollups.session_removed)],
+    UserResource: [(progress.user_resource_changed, progress.user_resource_removed)],
+}
+
+
+def aggregate_state(instance):
+    return {field: instance.__dict__.get(field) for field in AGGREGATE_STATE_FIELDS[type(instance)]}
+
+
+@receiver(post_init, sender=LearningGoal)
+@receiver(post_init, sender=LearningSession)
+@receiver(post_init, sender=UserResource)
+def remember_aggregate_state(sender, instance, **kwargs):
+    instance._aggregate_state = aggregate_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=LearningGoal)
+@receiver(post_save, sender=LearningSession)
+@receiver(post_save, sender=UserResource)
+def aggregate_saved_instance(sender, instance, created, raw=False, **kwargs):
+    """Connected first, so the Progress rebuild is queued before the ETag bump"""
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_aggregate_state', None)
+    for changed, _removed in AGGREGATE_HANDLERS[sender]:
+        changed(instance, previous)
+    instance._aggregate_state = aggregate_state(instance)
+
+
+@receiver(post_delete, sender=LearningGoal)
+@receiver(post_delete, sender=LearningSession)
+@receiver(post_delete, sender=UserResource)
+def aggregate_deleted_instance(sender, instance, **kwargs):
+    for _changed, removed in AGGREGATE_HANDLERS[sender]:
+        if removed is not None:
+            removed(instance)
+
+
+@receiver([post_save, post_delete], sender=LearningPreference)
+@receiver([post_save, post_delete], sender=LearningGoal)
+@receiver([post_save, post_delete], sender=LearningSession)
+@receiver([post_save, post_delete], sender=UserResource)
+@receiver([post_save, post_delete], sender=Progress)
+def rebuild_user_dashboard(sender, instance, **kwargs):
+    """Rebuild only the dashboard sections that show the changed model.
+
+    Connected before the ETag receiver so the rebuild commits first: a client
+    seeing the new ETag never gets the old snapshot.
+    """
+    rebuild_dashboard_sections(instance.user_id, SECTION_DEPENDENCIES[sender])
+
+
+@receiver([post_save, post_delete], sender=LearningPreference)
+@receiver([post_save, post_delete], sender=LearningGoal)
+@receiver([post_save, post_delete], sender=LearningSession)
+@receiver([post_save, post_delete], sender=UserResource)
+@receiver([post_save, post_delete], sender=Progress)
+def bump_user_data_version(sender, instance, **kwargs):
+    """Per-user learning data invalidates the owner's ETags"""
+    bump_data_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=Topic)
+@receiver([post_save, post_delete], sender=Resource)
+def bump_catalog_data_version(sender, instance, **kwargs):
+    """The shared catalog invalidates every ETag"""
+    bump_data_version()
+
+
+@receiver(post_save, sender=Resource)
+def update_recommender(sender, instance, raw=False, **kwargs):
+    """New and edited resources enter this process's recommender matrix once committed"""
+    if not raw:
+        transaction.on_commit(lambda: recommender.resource_changed(instance))
+
+
+@receiver(post_delete, sender=Resource)
+def remove_from_recommender(sender, instance, **kwargs):
+    """Other processes drop the resource through its tombstone"""
+    resource_id = instance.pk
+    recommender.record_deletion(resource_id)
+    transaction.on_commit(lambda: recommender.resource_removed(resource_id))
+
+
+@receiver([post_save, post_delete], sender=Resource)
+def invalidate_recommendations(sender, instance, **kwargs):
+    """Catalog changes reach every user; their recommendations are rebuilt on next read.
+
+    Once per change, by the writing process after commit; other processes'
+    recommenders pick the change up within RECOMMENDER_SYNC_SECONDS.
+    """
+    transaction.on_commit(lambda: invalidate_dashboards(sections=['recommended_resources']))
+
+
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=Topic)
+def invalidate_catalog_names(sender, instance, created=False, **kwargs):
+    """Subject and topic names are copied into most sections"""
+    if not created:
+        invalidate_dashboards()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_dashboard(sender, instance, created=False, update_fields=None, **kwargs):
+    """Sections carry user_email; logins (last_login only) leave them alone"""
+    if not created and set(update_fields or ()) != {'last_login'}:
+        invalidate_dashboards(user_ids=[instance.pk])
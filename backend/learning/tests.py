@@ -0,0 +1,464 @@
+import io
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from roadmap.etags import bump_data_version
+
+from .models import (
+    DashboardSnapshot, LearningGoal, LearningPreference, LearningSession, Progress, Resource, SessionRollup, Subject, Topic,
+    UserResource,
+)
+from .recommender import ResourceRecommender, get_recommender, reset_recommender, start_warm_up, warm_recommender
+from .search import fts_query
+
+
+class DashboardSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='dash', email='dash@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.subject = Subject.objects.create(name='Mathematics')
+        self.topic = Topic.objects.create(subject=self.subject, name='Algebra')
+        LearningPreference.objects.create(
+            user=self.user, subject=self.subject, topic=self.topic, proficiency_level='beginner',
+            weekly_hours=5, deadline='2030-01-01',
+        )
+        self.goal = LearningGoal.objects.create(
+            user=self.user, title='Groups', description='', subject=self.subject, topic=self.topic, target_date='2030-01-01',
+        )
+        for index in range(3):
+            LearningSession.objects.create(user=self.user, goal=self.goal, start_time=f'2020-01-0{index + 1}T10:00:00Z')
+        Resource.objects.create(
+            title='Intro', description='', resource_type='video', subject=self.subject, topic=self.topic,
+            difficulty_level='beginner',
+        )
+        reset_recommender()
+        get_recommender()
+
+    def dashboard(self):
+        return self.client.get('/api/learning/dashboard/').json()
+
+    def test_miss_builds_every_section_then_reads_are_one_query(self):
+        # data version, snapshot rows, one select_related query per section
+        # (recommendations first read the preference, goals and history), one snapshot INSERT
+        with self.assertNumQueries(11):
+            first = self.dashboard()
+        self.assertEqual(first['preferences']['subject_name'], 'Mathematics')
+        self.assertEqual(first['goals'][0]['topic_name'], 'Algebra')
+        self.assertEqual(len(first['recent_sessions']), 3)
+        self.assertEqual(first['recent_sessions'][0]['goal_title'], 'Groups')
+        self.assertEqual([resource['title'] for resource in first['recommended_resources']], ['Intro'])
+        self.assertEqual(DashboardSnapshot.objects.filter(user=self.user).count(), 5)
+
+        # data version, snapshot rows
+        with self.assertNumQueries(2):
+            self.assertEqual(self.dashboard(), first)
+
+    def test_writes_rebuild_only_their_sections(self):
+        self.dashboard()
+        built = dict(DashboardSnapshot.objects.filter(user=self.user).values_list('section', 'built_at'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/learning/sessions/{LearningSession.objects.first().id}/end/')
+
+        rebuilt = dict(DashboardSnapshot.objects.filter(user=self.user).values_list('section', 'built_at'))
+        changed = {section for section in built if built[section] != rebuilt[section]}
+        # The ended session also adds its minutes to the progress counters
+        self.assertEqual(changed, {'recent_sessions', 'progress'})
+        self.assertTrue(any(session['end_time'] for session in self.dashboard()['recent_sessions']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.goal.title = 'Rings'
+            self.goal.save()
+        dashboard = self.dashboard()
+        self.assertEqual(dashboard['goals'][0]['title'], 'Rings')
+        self.assertEqual(dashboard['recent_sessions'][0]['goal_title'], 'Rings')
+
+    def test_catalog_changes_drop_snapshots_for_every_user(self):
+        self.dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.create(
+                title='Exercises', description='', resource_type='exercise', subject=self.subject, topic=self.topic,
+                difficulty_level='beginner',
+            )
+        self.assertFalse(DashboardSnapshot.objects.filter(section='recommended_resources').exists())
+        self.assertEqual(len(self.dashboard()['recommended_resources']), 2)
+
+        self.subject.name = 'Maths'
+        self.subject.save()
+        self.assertFalse(DashboardSnapshot.objects.exists())
+        self.assertEqual(self.dashboard()['goals'][0]['subject_name'], 'Maths')
+
+    def test_users_without_a_snapshot_are_not_rebuilt(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            LearningSession.objects.create(user=self.user, goal=self.goal, start_time='2020-02-01T10:00:00Z')
+        self.assertFalse(DashboardSnapshot.objects.exists())
+
+
+class ProgressAggregationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='agg', email='agg@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.subject = Subject.objects.create(name='Physics')
+        self.topic = Topic.objects.create(subject=self.subject, name='Optics')
+        self.goal = LearningGoal.objects.create(
+            user=self.user, title='Lenses', description='', subject=self.subject, topic=self.topic, target_date='2030-01-01',
+        )
+        self.resource = Resource.objects.create(
+            title='Snell', description='', resource_type='article', subject=self.subject, topic=self.topic,
+            difficulty_level='beginner',
+        )
+
+    def progress(self):
+        return Progress.objects.get(user=self.user, subject=self.subject, topic=self.topic)
+
+    def test_events_move_the_counters(self):
+        self.assertEqual((self.progress().goals_total, self.progress().overall_progress), (1, 0))
+
+        started = timezone.now() - timedelta(minutes=45)
+        session = LearningSession.objects.create(user=self.user, goal=self.goal, start_time=started)
+        self.client.post(f'/api/learning/sessions/{session.id}/end/')
+        self.assertEqual(self.progress().time_spent_minutes, 45)
+
+        user_resource = UserResource.objects.create(user=self.user, resource=self.resource)
+        self.client.post(f'/api/learning/user-resources/{user_resource.id}/progress/', {'progress_percentage': 100}, format='json')
+        self.client.post(f'/api/learning/user-resources/{user_resource.id}/progress/', {'progress_percentage': 100}, format='json')
+        self.assertEqual(self.progress().resources_completed, 1)
+
+        self.client.patch(f'/api/learning/goals/{self.goal.id}/', {'status': 'completed'}, format='json')
+        progress = self.progress()
+        self.assertEqual((progress.goals_completed, progress.overall_progress), (1, 100))
+
+        LearningGoal.objects.create(
+            user=self.user, title='Prisms', description='', subject=self.subject, topic=self.topic, target_date='2030-01-01',
+        )
+        self.assertEqual(self.progress().overall_progress, 50)
+
+        self.client.delete(f'/api/learning/goals/{self.goal.id}/')
+        progress = self.progress()
+        self.assertEqual((progress.goals_total, progress.goals_completed, progress.time_spent_minutes), (1, 0, 0))
+
+    def test_counter_update_is_one_statement(self):
+        user_resource = UserResource.objects.create(user=self.user, resource=self.resource)
+        user_resource.status = 'completed'
+        with CaptureQueriesContext(connection) as queries:
+            user_resource.save()
+        writes = [query['sql'] for query in queries.captured_queries if 'learning_progress' in query['sql']]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('UPDATE'))
+
+    def test_reconcile_rebuilds_drifted_counters(self):
+        LearningSession.objects.create(user=self.user, goal=self.goal, start_time=timezone.now(), duration_minutes=30)
+        other = Subject.objects.create(name='Chemistry')
+        other_topic = Topic.objects.create(subject=other, name='Bonds')
+        Progress.objects.update(time_spent_minutes=999, goals_total=7)
+        LearningGoal.objects.bulk_create([LearningGoal(
+            user=self.user, title='Ions', description='', subject=other, topic=other_topic,
+            target_date='2030-01-01', status='completed',
+        )])
+
+        out = io.StringIO()
+        call_command('reconcile_progress', '--dry-run', stdout=out)
+        self.assertIn('1 progress row(s) would be corrected and 1 would be created', out.getvalue())
+        self.assertEqual(self.progress().time_spent_minutes, 999)
+
+        # sessions, resources, goals grouped once each, plus the existing rows
+        with CaptureQueriesContext(connection) as queries:
+            call_command('reconcile_progress', stdout=io.StringIO())
+        self.assertEqual(sum(query['sql'].startswith('SELECT') for query in queries.captured_queries), 4)
+        progress = self.progress()
+        self.assertEqual((progress.time_spent_minutes, progress.goals_total), (30, 1))
+        other_progress = Progress.objects.get(subject=other)
+        self.assertEqual((other_progress.goals_completed, other_progress.overall_progress), (1, 100))
+
+
+class SessionRollupTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='rollup', email='rollup@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.subject = Subject.objects.create(name='History')
+        self.topic = Topic.objects.create(subject=self.subject, name='Rome')
+        self.goal = LearningGoal.objects.create(
+            user=self.user, title='Republic', description='', subject=self.subject, topic=self.topic, target_date='2030-01-01',
+        )
+        self.url = '/api/learning/sessions/time-series/'
+
+    def session(self, start, minutes):
+        return LearningSession.objects.create(
+            user=self.user, goal=self.goal, start_time=f'{start}T09:00:00Z', duration_minutes=minutes,
+        )
+
+    def test_ending_a_session_updates_day_and_week(self):
+        session = LearningSession.objects.create(user=self.user, goal=self.goal, start_time=timezone.now() - timedelta(minutes=20))
+        self.assertFalse(SessionRollup.objects.exists())
+
+        self.client.post(f'/api/learning/sessions/{session.id}/end/')
+        rollups = {row.period: row for row in SessionRollup.objects.all()}
+        self.assertEqual(set(rollups), {'day', 'week'})
+        self.assertEqual((rollups['day'].minutes, rollups['day'].session_count), (20, 1))
+        self.assertEqual(rollups['week'].bucket_start.weekday(), 0)
+
+        self.client.delete(f'/api/learning/sessions/{session.id}/')
+        self.assertEqual(set(SessionRollup.objects.values_list('minutes', 'session_count')), {(0, 0)})
+
+    def test_range_is_bucketed_and_zero_filled(self):
+        self.session('2024-01-01', 30)  # Monday
+        self.session('2024-01-03', 15)
+        self.session('2024-01-10', 45)
+        self.session('2024-02-05', 60)
+
+        days = self.client.get(self.url, {'start': '2024-01-01', 'end': '2024-01-07'}).json()
+        self.assertEqual([row['minutes'] for row in days['buckets']], [30, 0, 15, 0, 0, 0, 0])
+        self.assertEqual(days['total_minutes'], 45)
+
+        weeks = self.client.get(self.url, {'start': '2024-01-03', 'end': '2024-01-14', 'bucket': 'week'}).json()
+        self.assertEqual([(row['start'], row['minutes']) for row in weeks['buckets']], [('2024-01-01', 45), ('2024-01-08', 45)])
+
+        # A year of months: one grouped query over the daily rollups
+        with self.assertNumQueries(2):
+            months = self.client.get(self.url, {'start': '2024-01-01', 'end': '2024-12-31', 'bucket': 'month'}).json()
+        self.assertEqual(len(months['buckets']), 12)
+        self.assertEqual([row['minutes'] for row in months['buckets'][:3]], [90, 60, 0])
+        self.assertEqual(months['buckets'][0]['sessions'], 3)
+
+    def test_invalid_ranges(self):
+        self.assertEqual(self.client.get(self.url, {'bucket': 'hour'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': '2024-02-01', 'end': '2024-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': 'yesterday'}).status_code, 400)
+        with self.settings(SESSION_ROLLUP_MAX_BUCKETS=10):
+            self.assertEqual(self.client.get(self.url, {'start': '2024-01-01', 'end': '2024-01-31'}).status_code, 400)
+
+    def test_backfill_matches_incremental_rollups(self):
+        for start, minutes in [('2024-03-04', 10), ('2024-03-04', 20), ('2024-03-06', 5), ('2024-03-12', 40)]:
+            self.session(start, minutes)
+        LearningSession.objects.create(user=self.user, goal=self.goal, start_time='2024-03-05T09:00:00Z')
+        incremental = set(SessionRollup.objects.values_list('period', 'bucket_start', 'minutes', 'session_count'))
+
+        SessionRollup.objects.update(minutes=0)
+        call_command('backfill_session_rollups', stdout=io.StringIO())
+        self.assertEqual(set(SessionRollup.objects.values_list('period', 'bucket_start', 'minutes', 'session_count')), incremental)
+        self.assertEqual(SessionRollup.objects.get(period='week', bucket_start='2024-03-04').minutes, 35)
+
+    def test_default_range_revalidates_when_the_day_changes(self):
+        with patch('django.utils.timezone.localdate', return_value=date(2024, 3, 10)):
+            first = self.client.get(self.url)
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertNotIn('Last-Modified', first)
+        with patch('django.utils.timezone.localdate', return_value=date(2024, 3, 11)):
+            next_day = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(next_day.status_code, 200)
+        self.assertEqual(next_day.data['end'], '2024-03-11')
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        subject = Subject.objects.create(name='Computing')
+        topic = Topic.objects.create(subject=subject, name='Languages')
+        self.resources = {}
+        for title, description in [
+            ('Python basics', 'Variables, loops and functions'),
+            ('Advanced Python', 'Python generators, Python descriptors and Python metaclasses'),
+            ('Rust ownership', 'Borrowing without a garbage collector'),
+            ('Café culture', 'Programming in cafés'),
+        ]:
+            self.resources[title] = Resource.objects.create(
+                title=title, description=description, resource_type='article', subject=subject, topic=topic,
+                difficulty_level='beginner',
+            )
+
+    def search(self, text, **params):
+        return self.client.get('/api/learning/resources/', {'search': text, **params}).json()
+
+    def titles(self, text):
+        return [row['title'] for row in self.search(text)['results']]
+
+    def test_query_is_quoted_and_prefixed(self):
+        self.assertEqual(fts_query('pyth'), '"pyth"*')
+        self.assertEqual(fts_query('rust OR "x" NEAR(a'), '"rust" "OR" "x" "NEAR" "a"*')
+        self.assertIsNone(fts_query('*** ()'))
+
+    def test_results_are_bm25_ranked_with_prefix_matching(self):
+        self.assertEqual(self.titles('pyth'), ['Advanced Python', 'Python basics'])
+        self.assertEqual(self.titles('python loops'), ['Python basics'])
+        self.assertEqual(self.titles('cafe'), ['Café culture'])
+        self.assertEqual(self.titles('garbage'), ['Rust ownership'])
+
+    def test_index_follows_updates_and_deletes(self):
+        rust = self.resources['Rust ownership']
+        Resource.objects.filter(pk=rust.pk).update(title='Rust lifetimes')
+        self.assertEqual(self.titles('lifetimes'), ['Rust lifetimes'])
+        self.assertEqual(self.titles('ownership'), [])
+        rust.delete()
+        self.assertEqual(self.titles('lifetimes'), [])
+
+    def test_ranked_results_page_in_rank_order(self):
+        first = self.search('python', page_size=1)
+        self.assertEqual([row['title'] for row in first['results']], ['Advanced Python'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['title'] for row in second['results']], ['Python basics'])
+        self.assertIsNone(second['next'])
+        previous = self.client.get(second['previous']).json()
+        self.assertEqual([row['title'] for row in previous['results']], ['Advanced Python'])
+
+    def test_goal_search_is_scoped_to_the_user(self):
+        owner = get_user_model().objects.create_user(username='searcher', email='searcher@example.com', password='pass12345')
+        other = get_user_model().objects.create_user(username='other', email='other@example.com', password='pass12345')
+        resource = self.resources['Python basics']
+        for user in (owner, other):
+            LearningGoal.objects.create(
+                user=user, title='Learn Python', description='', subject=resource.subject, topic=resource.topic,
+                target_date='2030-01-01',
+            )
+        self.client.force_authenticate(owner)
+        results = self.client.get('/api/learning/goals/', {'search': 'pyt'}).json()['results']
+        self.assertEqual([row['user'] for row in results], [owner.pk])
+
+    def test_falls_back_to_like_without_an_index(self):
+        with patch('learning.search.search_index_available', return_value=False):
+            self.assertEqual(sorted(self.titles('python')), ['Advanced Python', 'Python basics'])
+            self.assertEqual(self.titles('pyth basics'), ['Python basics'])
+
+
+class ResourceRecommenderTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='rec', email='rec@example.com', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.maths = Subject.objects.create(name='Mathematics')
+        self.algebra = Topic.objects.create(subject=self.maths, name='Algebra')
+        self.geometry = Topic.objects.create(subject=self.maths, name='Geometry')
+        self.history = Subject.objects.create(name='History')
+        self.rome = Topic.objects.create(subject=self.history, name='Rome')
+        LearningPreference.objects.create(
+            user=self.user, subject=self.maths, topic=self.algebra, proficiency_level='beginner',
+            weekly_hours=5, deadline='2030-01-01',
+        )
+        self.near = self.resource('Linear equations', 'Solving linear equations step by step', self.maths, self.algebra, 'intermediate')
+        self.related = self.resource('Triangle proofs', 'Proofs about triangles', self.maths, self.geometry, 'advanced')
+        self.unrelated = self.resource('Roman emperors', 'Lives of the Roman emperors', self.history, self.rome, 'advanced')
+        reset_recommender()
+
+    def resource(self, title, description, subject, topic, level):
+        return Resource.objects.create(
+            title=title, description=description, resource_type='article', subject=subject, topic=topic, difficulty_level=level,
+        )
+
+    def test_recommends_without_an_exact_match(self):
+        # No resource matches subject, topic and difficulty at once
+        titles = [resource['title'] for resource in self.client.get('/api/learning/dashboard/').json()['recommended_resources']]
+        self.assertEqual(titles[0], 'Linear equations')
+        self.assertNotIn('Roman emperors', titles)
+
+    def test_goals_steer_the_ranking(self):
+        LearningGoal.objects.create(
+            user=self.user, title='Triangle proofs', description='Proofs about triangles', subject=self.maths,
+            topic=self.geometry, target_date='2030-01-01',
+        )
+        self.assertEqual(get_recommender().recommend(self.user.id)[0], self.related.id)
+
+    def test_resources_the_user_has_are_left_out(self):
+        UserResource.objects.create(user=self.user, resource=self.near, status='completed')
+        self.assertNotIn(self.near.id, get_recommender().recommend(self.user.id))
+
+    def test_new_and_deleted_resources_update_the_matrix_in_place(self):
+        recommender = get_recommender()
+        with self.captureOnCommitCallbacks(execute=True):
+            added = self.resource('Quadratic equations', 'Solving quadratic equations', self.maths, self.algebra, 'beginner')
+        self.assertIs(get_recommender(), recommender)
+        self.assertEqual(recommender.recommend(self.user.id)[0], added.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added.delete()
+        self.assertNotIn(added.id, recommender.recommend(self.user.id))
+
+    @override_settings(RECOMMENDER_SYNC_SECONDS=0)
+    def test_edits_made_by_other_processes_are_synced(self):
+        self.client.get('/api/learning/dashboard/')
+        recommender = get_recommender()
+        self.assertNotEqual(recommender.recommend(self.user.id)[0], self.unrelated.id)
+
+        # Another process edits a resource: this one sees only the catalog version move
+        Resource.objects.filter(pk=self.unrelated.pk).update(
+            title='Linear equations drills', description='Solving linear equations', subject=self.maths,
+            topic=self.algebra, difficulty_level='beginner', updated_at=timezone.now(),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version()
+        self.assertIs(get_recommender(), recommender)
+        self.assertEqual(recommender.recommend(self.user.id)[0], self.unrelated.id)
+        # Readers leave the stored sections to the writer
+        self.assertTrue(DashboardSnapshot.objects.filter(section='recommended_resources').exists())
+
+    @override_settings(RECOMMENDER_SYNC_SECONDS=0)
+    def test_deletions_by_other_processes_are_synced_from_tombstones(self):
+        recommender = get_recommender()
+        deleted_id = self.near.id
+        # Another process deletes a resource; its on-commit callbacks never run here
+        with self.captureOnCommitCallbacks(execute=False):
+            self.near.delete()
+        self.assertIn(deleted_id, recommender.row_of)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version()
+        # Version, edits since the last sync, deletions since the last sync
+        with self.assertNumQueries(3):
+            self.assertIs(get_recommender(), recommender)
+        self.assertNotIn(deleted_id, recommender.row_of)
+        self.assertIn(self.related.id, recommender.row_of)
+
+    @override_settings(RECOMMENDER_SYNC_SECONDS=0, RECOMMENDER_TOMBSTONE_HOURS=0)
+    def test_sync_older_than_the_tombstones_reloads_the_catalog(self):
+        recommender = get_recommender()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version()
+        self.assertIsNot(get_recommender(), recommender)
+
+    def test_catalog_changes_invalidate_recommendations_once_committed(self):
+        self.client.get('/api/learning/dashboard/')
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.resource('Quadratic equations', 'Solving quadratic equations', self.maths, self.algebra, 'beginner')
+        self.assertTrue(DashboardSnapshot.objects.filter(section='recommended_resources').exists())
+        for callback in callbacks:
+            callback()
+        self.assertFalse(DashboardSnapshot.objects.filter(section='recommended_resources').exists())
+
+    def test_warm_up_loads_the_catalog_once(self):
+        warm_recommender()
+        recommender = get_recommender()
+        self.assertEqual(recommender.size, 3)
+        warm_recommender()
+        self.assertIs(get_recommender(), recommender)
+
+    @patch('learning.recommender.warm_in_background')
+    def test_warm_up_runs_only_in_server_processes(self, warm):
+        self.assertIsNone(start_warm_up(['gunicorn']))
+        with self.settings(RECOMMENDER_WARM_ON_START=True):
+            self.assertIsNone(start_warm_up(['manage.py', 'test']))
+            self.assertIsNone(start_warm_up(['manage.py', 'migrate']))
+            start_warm_up(['gunicorn', 'learning_roadmap_django.wsgi']).join()
+            start_warm_up(['manage.py', 'runserver', '--noreload']).join()
+        self.assertEqual(warm.call_count, 2)
+
+    def test_batched_users_share_one_product(self):
+        other = get_user_model().objects.create_user(username='rec2', email='rec2@example.com', password='pass12345')
+        LearningPreference.objects.create(
+            user=other, subject=self.history, topic=self.rome, proficiency_level='advanced', weekly_hours=5, deadline='2030-01-01',
+        )
+        recommender = get_recommender()
+        # Preferences, goals and history of both users
+        with self.assertNumQueries(3):
+            ranked = recommender.recommend_many([self.user.id, other.id], k=1)
+        self.assertEqual(ranked, {self.user.id: [self.near.id], other.id: [self.unrelated.id]})
+
+    def test_top_k_on_an_empty_catalog(self):
+        recommender = ResourceRecommender(dimensions=16)
+        self.assertEqual(recommender.recommend(self.user.id), [])
@@ -21,6 +21,7 @@ urlpatterns = [
     path('sessions/', views.LearningSessionListView.as_view(), name='sessions'),
     path('sessions/<int:pk>/', views.LearningSessionDetailView.as_view(), name='session_detail'),
     path('sessions/<int:session_id>/end/', views.end_learning_session, name='end_session'),
+    path('sessions/time-series/', views.session_time_series, name='session_time_series'),
     
     # Resources endpoints
     path('resources/', views.ResourceListView.as_view(), name='resources'),
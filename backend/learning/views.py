@@ -1,5 +1,5 @@
 from django.shortcuts import render
-from rest_framework import status, generics, permissions, filters
+from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
@@ -15,18 +15,26 @@ from .serializers import (
     LearningGoalDetailSerializer, ResourceDetailSerializer, UserResourceDetailSerializer
 )
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from datetime import timedelta
+from learning_roadmap_django.pagination import KeysetPagination
+from roadmap.etags import ConditionalUserDataMixin, conditional_on_user_data
+from .dashboard import get_dashboard
+from .rollups import BUCKETS, bucket_count, session_minutes
+from .search import FullTextSearchFilter
 
 # Create your views here.
 
 # Subject and Topic Views
-class SubjectListView(generics.ListAPIView):
+class SubjectListView(ConditionalUserDataMixin, generics.ListAPIView):
     """List all subjects"""
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class TopicListView(generics.ListAPIView):
+class TopicListView(ConditionalUserDataMixin, generics.ListAPIView):
     """List topics by subject"""
     serializer_class = TopicSerializer
     permission_classes = [permissions.AllowAny]
@@ -38,7 +46,7 @@ class TopicListView(generics.ListAPIView):
         return Topic.objects.all()
 
 
-class TopicDetailView(generics.RetrieveAPIView):
+class TopicDetailView(ConditionalUserDataMixin, generics.RetrieveAPIView):
     """Get detailed topic information"""
     queryset = Topic.objects.all()
     serializer_class = TopicDetailSerializer
@@ -46,7 +54,7 @@ class TopicDetailView(generics.RetrieveAPIView):
 
 
 # Learning Preferences Views
-class LearningPreferenceView(generics.RetrieveUpdateAPIView):
+class LearningPreferenceView(ConditionalUserDataMixin, generics.RetrieveUpdateAPIView):
     """Get or update user's learning preferences"""
     serializer_class = LearningPreferenceSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -76,11 +84,12 @@ def create_learning_preference(request):
 
 
 # Learning Goals Views
-class LearningGoalListView(generics.ListCreateAPIView):
+class LearningGoalListView(ConditionalUserDataMixin, generics.ListCreateAPIView):
     """List and create learning goals"""
     serializer_class = LearningGoalSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['title', 'description']
     
     def get_queryset(self):
@@ -90,7 +99,7 @@ class LearningGoalListView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class LearningGoalDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LearningGoalDetailView(ConditionalUserDataMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a learning goal"""
     serializer_class = LearningGoalDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -100,10 +109,11 @@ class LearningGoalDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Learning Sessions Views
-class LearningSessionListView(generics.ListCreateAPIView):
+class LearningSessionListView(ConditionalUserDataMixin, generics.ListCreateAPIView):
     """List and create learning sessions"""
     serializer_class = LearningSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         return LearningSession.objects.filter(user=self.request.user)
@@ -112,7 +122,7 @@ class LearningSessionListView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class LearningSessionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LearningSessionDetailView(ConditionalUserDataMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a learning session"""
     serializer_class = LearningSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -125,19 +135,58 @@ class LearningSessionDetailView(generics.RetrieveUpdateDestroyAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def end_learning_session(request, session_id):
     """End a learning session"""
-    session = get_object_or_404(LearningSession, id=session_id, user=request.user)
+    session = get_object_or_404(LearningSession.objects.select_related('goal'), id=session_id, user=request.user)
     session.end_time = timezone.now()
     session.duration_minutes = (session.end_time - session.start_time).total_seconds() / 60
     session.save()
     return Response(LearningSessionSerializer(session).data)
 
 
+def default_range_day(request):
+    """Today, when the range defaults to a window ending today; the URL alone then does not pin the response"""
+    return '' if 'end' in request.query_params else timezone.localdate().isoformat()
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@conditional_on_user_data(lambda request: request.user.pk, default_range_day)
+def session_time_series(request):
+    """Study minutes per day, week or month over a date range, read from the session rollups"""
+    bucket = request.query_params.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return Response({'error': f"bucket must be one of {', '.join(BUCKETS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        end = parse_date(request.query_params['end']) if 'end' in request.query_params else timezone.localdate()
+        start = parse_date(request.query_params['start']) if 'start' in request.query_params else end - timedelta(days=29)
+        subject_id = int(request.query_params['subject_id']) if 'subject_id' in request.query_params else None
+        goal_id = int(request.query_params['goal_id']) if 'goal_id' in request.query_params else None
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        return Response({'error': 'start and end must be YYYY-MM-DD dates, ids integers'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = getattr(settings, 'SESSION_ROLLUP_MAX_BUCKETS', 1000)
+    if bucket_count(start, end, bucket) > limit:
+        return Response({'error': f'Range spans more than {limit} {bucket} buckets'}, status=status.HTTP_400_BAD_REQUEST)
+
+    buckets = session_minutes(request.user.pk, start, end, bucket, subject_id=subject_id, goal_id=goal_id)
+    return Response({
+        'bucket': bucket,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total_minutes': sum(row['minutes'] for row in buckets),
+        'buckets': buckets,
+    })
+
+
 # Resources Views
-class ResourceListView(generics.ListAPIView):
+class ResourceListView(ConditionalUserDataMixin, generics.ListAPIView):
     """List learning resources with filtering"""
     serializer_class = ResourceSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [filters.SearchFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['title', 'description']
     
     def get_queryset(self):
@@ -162,7 +211,7 @@ class ResourceListView(generics.ListAPIView):
         return queryset
 
 
-class ResourceDetailView(generics.RetrieveAPIView):
+class ResourceDetailView(ConditionalUserDataMixin, generics.RetrieveAPIView):
     """Get detailed resource information"""
     queryset = Resource.objects.all()
     serializer_class = ResourceDetailSerializer
@@ -170,10 +219,11 @@ class ResourceDetailView(generics.RetrieveAPIView):
 
 
 # User Resources Views
-class UserResourceListView(generics.ListCreateAPIView):
+class UserResourceListView(ConditionalUserDataMixin, generics.ListCreateAPIView):
     """List and create user resources"""
     serializer_class = UserResourceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         return UserResource.objects.filter(user=self.request.user)
@@ -182,7 +232,7 @@ class UserResourceListView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class UserResourceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UserResourceDetailView(ConditionalUserDataMixin, generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a user resource"""
     serializer_class = UserResourceDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -195,7 +245,7 @@ class UserResourceDetailView(generics.RetrieveUpdateDestroyAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def update_resource_progress(request, user_resource_id):
     """Update progress for a user resource"""
-    user_resource = get_object_or_404(UserResource, id=user_resource_id, user=request.user)
+    user_resource = get_object_or_404(UserResource.objects.select_related('resource'), id=user_resource_id, user=request.user)
     progress = request.data.get('progress_percentage', 0)
     
     if progress >= 100:
@@ -209,64 +259,29 @@ def update_resource_progress(request, user_resource_id):
 
 
 # Progress Views
-class ProgressListView(generics.ListAPIView):
+class ProgressListView(ConditionalUserDataMixin, generics.ListAPIView):
     """List user's progress records"""
     serializer_class = ProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        return Progress.objects.filter(user=self.request.user)
+        # Counters are maintained on write; names come from the same query
+        return Progress.objects.filter(user=self.request.user).select_related('subject', 'topic', 'user')
 
 
-class ProgressDetailView(generics.RetrieveAPIView):
+class ProgressDetailView(ConditionalUserDataMixin, generics.RetrieveAPIView):
     """Get detailed progress information"""
     serializer_class = ProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Progress.objects.filter(user=self.request.user)
+        return Progress.objects.filter(user=self.request.user).select_related('subject', 'topic', 'user')
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_on_user_data(lambda request: request.user.pk)
 def dashboard_data(request):
-    """Get dashboard data for the user"""
-    user = request.user
-    
-    # Get user's learning preferences
-    try:
-        preferences = LearningPreference.objects.get(user=user)
-        preferences_data = LearningPreferenceSerializer(preferences).data
-    except LearningPreference.DoesNotExist:
-        preferences_data = None
-    
-    # Get user's goals
-    goals = LearningGoal.objects.filter(user=user)
-    goals_data = LearningGoalSerializer(goals, many=True).data
-    
-    # Get recent sessions
-    recent_sessions = LearningSession.objects.filter(user=user).order_by('-start_time')[:5]
-    sessions_data = LearningSessionSerializer(recent_sessions, many=True).data
-    
-    # Get progress summary
-    progress_records = Progress.objects.filter(user=user)
-    progress_data = ProgressSerializer(progress_records, many=True).data
-    
-    # Get recommended resources
-    if preferences_data:
-        recommended_resources = Resource.objects.filter(
-            subject=preferences_data['subject'],
-            topic=preferences_data['topic'],
-            difficulty_level=preferences_data['proficiency_level']
-        )[:5]
-        resources_data = ResourceSerializer(recommended_resources, many=True).data
-    else:
-        resources_data = []
-    
-    return Response({
-        'preferences': preferences_data,
-        'goals': goals_data,
-        'recent_sessions': sessions_data,
-        'progress': progress_data,
-        'recommended_resources': resources_data,
-    })
+    """Get dashboard data for the user, served from the materialized snapshot"""
+    return Response(get_dashboard(request.user.pk))
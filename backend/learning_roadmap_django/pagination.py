@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on (created_at, id), newest first.
+
+    The cursor holds the (created_at, id) of the last row served, and the
+    next page is a WHERE on that pair instead of an OFFSET. Every page is
+    an index range scan of page_size rows, however deep it is. Pages size
+    with ?page_size=, capped at API_MAX_PAGE_SIZE.
+
+    Querysets annotated with a search rank (full-text search) page by
+    (rank, id) instead, best match first.
+    """
+    ordering_field = 'created_at'
+    tiebreak_field = 'id'
+    rank_annotation = 'search_rank'
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'API_PAGE_SIZE', 50)
+        maximum = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            size = default
+        return max(1, min(size, maximum))
+
+    def get_ordering(self, queryset):
+        """(ordering field, descending) for queryset"""
+        if self.rank_annotation in queryset.query.annotations:
+            return self.rank_annotation, False
+        return self.ordering_field, True
+
+    def encode_cursor(self, reverse, obj):
+        position = [reverse, getattr(obj, self.field), getattr(obj, self.tiebreak_field)]
+        token = base64.urlsafe_b64encode(json.dumps(position, cls=DjangoJSONEncoder).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            reverse, position, pk = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            if self.field == self.rank_annotation:
+                position = float(position)
+            else:
+                position = model._meta.get_field(self.field).to_python(position)
+            pk = model._meta.get_field(self.tiebreak_field).to_python(pk)
+        except (TypeError, ValueError, UnicodeEncodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if position is None or pk is None:
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), position, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        self.page_size = self.get_page_size(request)
+        self.field, descending = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request, queryset.model)
+        field, tiebreak = self.field, self.tiebreak_field
+        forward = ('-', 'lt') if descending else ('', 'gt')
+        backward = ('', 'gt') if descending else ('-', 'lt')
+
+        if cursor is None:
+            reverse = False
+            sign, _lookup = forward
+            queryset = queryset.order_by(f'{sign}{field}', f'{sign}{tiebreak}')
+        else:
+            reverse, position, pk = cursor
+            # Previous page: rows just before the cursor, read backwards then flipped back
+            sign, lookup = backward if reverse else forward
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': position}) | Q(**{field: position, f'{tiebreak}__{lookup}': pk})
+            ).order_by(f'{sign}{field}', f'{sign}{tiebreak}')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = True if reverse else has_more
+        self.has_previous = has_more if reverse else cursor is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.page_size,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'page_size': {'type': 'integer'},
+                'results': schema,
+            },
+        }
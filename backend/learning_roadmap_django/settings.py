@@ -119,6 +119,67 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Keyset pagination of list endpoints
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 200))
+
+# Roadmap generation cache (shared by all workers through the database)
+ROADMAP_CACHE_TTL_SECONDS = int(os.getenv("ROADMAP_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+ROADMAP_CACHE_MAX_ENTRIES = int(os.getenv("ROADMAP_CACHE_MAX_ENTRIES", 5000))
+
+# Identical concurrent generations wait on one upstream call
+ROADMAP_SINGLEFLIGHT_WAIT_SECONDS = int(os.getenv("ROADMAP_SINGLEFLIGHT_WAIT_SECONDS", 60))
+ROADMAP_GENERATION_LOCK_TTL_SECONDS = int(os.getenv("ROADMAP_GENERATION_LOCK_TTL_SECONDS", 150))
+
+# Batch roadmap generation limits
+ROADMAP_BATCH_MAX_ITEMS = int(os.getenv("ROADMAP_BATCH_MAX_ITEMS", 100))
+ROADMAP_BATCH_MAX_CONCURRENCY = int(os.getenv("ROADMAP_BATCH_MAX_CONCURRENCY", 8))
+
+# Pooled keep-alive HTTP client used for every LLM call
+LLM_HTTP_POOL_CONNECTIONS = int(os.getenv("LLM_HTTP_POOL_CONNECTIONS", 10))
+LLM_HTTP_POOL_MAXSIZE = int(os.getenv("LLM_HTTP_POOL_MAXSIZE", 20))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 30))
+
+# Circuit breaker, retry backoff and latency budget for LLM calls
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 5))
+LLM_BREAKER_RESET_SECONDS = int(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", 0.5))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", 4))
+LLM_REQUEST_BUDGET_SECONDS = float(os.getenv("LLM_REQUEST_BUDGET_SECONDS", 45))
+
+# Queue study plan generation for the roadmap_worker command instead of blocking the request
+ROADMAP_ASYNC_GENERATION = os.getenv("ROADMAP_ASYNC_GENERATION", "False") == "True"
+ROADMAP_JOB_LEASE_SECONDS = int(os.getenv("ROADMAP_JOB_LEASE_SECONDS", 300))
+ROADMAP_JOB_MAX_ATTEMPTS = int(os.getenv("ROADMAP_JOB_MAX_ATTEMPTS", 3))
+
+# LLM backend: "groq", "mock" (local run_mock_llm server) or "cassette" (record/replay)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+LLM_MOCK_BASE_URL = os.getenv("LLM_MOCK_BASE_URL", "http://127.0.0.1:8765/v1")
+LLM_CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", str(BASE_DIR / "cassettes"))
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "replay")  # record, replay or auto
+LLM_CASSETTE_INNER_PROVIDER = os.getenv("LLM_CASSETTE_INNER_PROVIDER", "groq")
+
+# Storage of UserRoadmap.roadmap_data: "json" (plain) or "compact" (key-interned, compressed, versioned)
+ROADMAP_DATA_CODEC = os.getenv("ROADMAP_DATA_CODEC", "json")
+
+# Most buckets one study time range request may return
+SESSION_ROLLUP_MAX_BUCKETS = int(os.getenv("SESSION_ROLLUP_MAX_BUCKETS", 1000))
+
+# Resources linked to each roadmap node by the title token index
+ROADMAP_NODE_RESOURCES = int(os.getenv("ROADMAP_NODE_RESOURCES", 5))
+# Title tokens in more than this share of the catalog are too common to link nodes on
+ROADMAP_INDEX_COMMON_TERM_SHARE = float(os.getenv("ROADMAP_INDEX_COMMON_TERM_SHARE", 0.02))
+
+# Dashboard recommender: hashed feature dimensions, and how often a process picks up catalog changes made elsewhere
+RECOMMENDER_DIMENSIONS = int(os.getenv("RECOMMENDER_DIMENSIONS", 128))
+RECOMMENDER_SYNC_SECONDS = float(os.getenv("RECOMMENDER_SYNC_SECONDS", 5))
+# Load the recommender in the background when a server process starts instead of on the first dashboard
+# request. Off by default; management commands other than runserver (tests, migrate) never warm it.
+RECOMMENDER_WARM_ON_START = os.getenv("RECOMMENDER_WARM_ON_START", "False") == "True"
+# How long deleted resources are remembered for other processes; a process that synced longer ago reloads the catalog
+RECOMMENDER_TOMBSTONE_HOURS = float(os.getenv("RECOMMENDER_TOMBSTONE_HOURS", 24))
+
 # JWT Settings (not currently used - using Token auth instead)
 # from datetime import timedelta
 
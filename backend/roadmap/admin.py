@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Topic, UserProgress
+from .models import Topic, UserProgress, RoadmapCacheEntry, MetricCounter, RoadmapJob, CircuitBreakerState, PregeneratedRoadmap, RoadmapNode, RoadmapTemplate, IndexTerm, NodeResource
 
 @admin.register(Topic)
 class TopicAdmin(admin.ModelAdmin):
@@ -8,3 +8,53 @@ class TopicAdmin(admin.ModelAdmin):
 @admin.register(UserProgress)
 class UserProgressAdmin(admin.ModelAdmin):
     list_display = ('user', 'topic', 'time_spent', 'target_time', 'completed', 'date')
+
+
+@admin.register(RoadmapCacheEntry)
+class RoadmapCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('fingerprint', 'purpose', 'model_name', 'prompt_version', 'hit_count', 'last_accessed_at', 'expires_at')
+    list_filter = ('purpose', 'model_name', 'prompt_version')
+    readonly_fields = ('created_at',)
+
+@admin.register(MetricCounter)
+class MetricCounterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value', 'updated_at')
+    search_fields = ('name',)
+
+@admin.register(RoadmapJob)
+class RoadmapJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'study_plan', 'status', 'priority', 'attempts', 'source', 'locked_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'source')
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(CircuitBreakerState)
+class CircuitBreakerStateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'state', 'consecutive_failures', 'trip_count', 'opened_at', 'last_failure_at')
+
+@admin.register(PregeneratedRoadmap)
+class PregeneratedRoadmapAdmin(admin.ModelAdmin):
+    list_display = ('topic', 'purpose', 'model_name', 'prompt_version', 'latency_ms', 'completion_tokens', 'hit_count', 'updated_at')
+    list_filter = ('purpose', 'model_name', 'prompt_version')
+    search_fields = ('topic',)
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(RoadmapNode)
+class RoadmapNodeAdmin(admin.ModelAdmin):
+    list_display = ('user_roadmap', 'template', 'node_id', 'title', 'depth', 'path', 'estimated_hours')
+    search_fields = ('title', 'node_id')
+
+@admin.register(RoadmapTemplate)
+class RoadmapTemplateAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'node_count', 'total_hours', 'created_at')
+    search_fields = ('content_hash',)
+    readonly_fields = ('content_hash', 'roadmap_data', 'node_count', 'total_hours', 'created_at')
+
+@admin.register(IndexTerm)
+class IndexTermAdmin(admin.ModelAdmin):
+    list_display = ('text', 'resource_count')
+    search_fields = ('text',)
+
+@admin.register(NodeResource)
+class NodeResourceAdmin(admin.ModelAdmin):
+    list_display = ('node', 'resource', 'score')
+    raw_id_fields = ('node', 'resource')
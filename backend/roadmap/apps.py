@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class RoadmapConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'roadmap'
+
+    def ready(self):
+        # Register the ETag invalidation receivers
+        import roadmap.signals  # noqa: F401
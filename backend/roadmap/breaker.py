@@ -0,0 +1,125 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CircuitBreakerState
+
+# Consecutive upstream failures that open the circuit
+LLM_BREAKER_FAILURE_THRESHOLD = getattr(settings, 'LLM_BREAKER_FAILURE_THRESHOLD', 5)
+# Seconds the circuit stays open before one probe request is let through
+LLM_BREAKER_RESET_SECONDS = getattr(settings, 'LLM_BREAKER_RESET_SECONDS', 30)
+# Retry backoff: full jitter on an exponential ceiling
+LLM_RETRY_BASE_DELAY = getattr(settings, 'LLM_RETRY_BASE_DELAY', 0.5)
+LLM_RETRY_MAX_DELAY = getattr(settings, 'LLM_RETRY_MAX_DELAY', 4.0)
+# Wall-clock budget for all attempts of one generation
+LLM_REQUEST_BUDGET_SECONDS = getattr(settings, 'LLM_REQUEST_BUDGET_SECONDS', 45)
+
+
+class UpstreamError(ValueError):
+    """The LLM API answered with an error status (counts against the breaker)"""
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Seconds to sleep before retry number attempt (0-based), with full jitter"""
+    base = LLM_RETRY_BASE_DELAY if base is None else base
+    cap = LLM_RETRY_MAX_DELAY if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open probe after the reset timeout.
+
+    State lives in a CircuitBreakerState row so every worker trips and recovers
+    together; transitions are conditional UPDATEs so only one worker probes.
+    A broken breaker table never blocks generation (fails open).
+    """
+
+    def __init__(self, name, failure_threshold=None, reset_seconds=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or LLM_BREAKER_FAILURE_THRESHOLD
+        self.reset_seconds = reset_seconds if reset_seconds is not None else LLM_BREAKER_RESET_SECONDS
+
+    def _state(self):
+        state, _ = CircuitBreakerState.objects.get_or_create(name=self.name)
+        return state
+
+    def _rows(self):
+        return CircuitBreakerState.objects.filter(name=self.name)
+
+    def allow_request(self):
+        """Whether a call may go upstream now"""
+        try:
+            state = self._state()
+            if state.state == 'closed':
+                return True
+
+            now = timezone.now()
+            retry_after = now - timedelta(seconds=self.reset_seconds)
+            if state.state == 'open' and state.opened_at and state.opened_at <= retry_after:
+                # First worker to flip open -> half_open sends the probe
+                return bool(self._rows().filter(state='open', opened_at=state.opened_at).update(
+                    state='half_open', probe_started_at=now
+                ))
+            if state.state == 'half_open' and state.probe_started_at and state.probe_started_at <= retry_after:
+                # The probe never reported back; let another one through
+                return bool(self._rows().filter(state='half_open', probe_started_at=state.probe_started_at).update(
+                    probe_started_at=now
+                ))
+            return False
+        except DatabaseError as e:
+            print(f"⚠️ Circuit breaker unavailable, allowing request: {e}")
+            return True
+
+    def record_success(self):
+        try:
+            self._rows().exclude(state='closed', consecutive_failures=0).update(
+                state='closed', consecutive_failures=0, opened_at=None, probe_started_at=None
+            )
+        except DatabaseError as e:
+            print(f"⚠️ Circuit breaker update failed: {e}")
+
+    def record_failure(self, error):
+        try:
+            now = timezone.now()
+            self._state()
+            self._rows().update(
+                consecutive_failures=F('consecutive_failures') + 1,
+                last_failure_at=now,
+                last_error=str(error)[:1000],
+            )
+            # A failed probe re-opens at once; a closed circuit opens at the threshold
+            tripped = self._rows().filter(state='half_open').update(
+                state='open', opened_at=now, probe_started_at=None, trip_count=F('trip_count') + 1
+            ) or self._rows().filter(state='closed', consecutive_failures__gte=self.failure_threshold).update(
+                state='open', opened_at=now, trip_count=F('trip_count') + 1
+            )
+            if tripped:
+                print(f"🔌 Circuit '{self.name}' opened after {error}")
+        except DatabaseError as e:
+            print(f"⚠️ Circuit breaker update failed: {e}")
+
+    def status(self):
+        state = self._state()
+        retry_at = None
+        if state.state == 'open' and state.opened_at:
+            retry_at = state.opened_at + timedelta(seconds=self.reset_seconds)
+        return {
+            'name': self.name,
+            'state': state.state,
+            'consecutive_failures': state.consecutive_failures,
+            'failure_threshold': self.failure_threshold,
+            'trip_count': state.trip_count,
+            'opened_at': state.opened_at,
+            'retry_at': retry_at,
+            'last_failure_at': state.last_failure_at,
+            'last_error': state.last_error or None,
+        }
+
+
+def get_llm_breaker(name='groq'):
+    """Breaker for one LLM provider; each provider trips independently"""
+    return CircuitBreaker(name)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RoadmapCacheEntry, PregeneratedRoadmap, MetricCounter
+
+# Cache sizing, overridable from settings
+ROADMAP_CACHE_TTL_SECONDS = getattr(settings, 'ROADMAP_CACHE_TTL_SECONDS', 7 * 24 * 60 * 60)
+ROADMAP_CACHE_MAX_ENTRIES = getattr(settings, 'ROADMAP_CACHE_MAX_ENTRIES', 5000)
+
+COUNTER_PREFIX = 'roadmap_cache.'
+
+
+def normalize_topics(topics):
+    """Canonical form of a topic list: trimmed, single-spaced, case-folded, order kept"""
+    if isinstance(topics, str):
+        topics = [topics]
+    return [" ".join(str(topic).split()).casefold() for topic in topics or [] if str(topic).strip()]
+
+
+def roadmap_fingerprint(topics, purpose, model, prompt_version):
+    """Content address of a generation request.
+
+    Only inputs that change the model output take part; total_hours is
+    applied after lookup so it never splits cache entries.
+    """
+    canonical = json.dumps({
+        'topics': normalize_topics(topics),
+        'purpose': (purpose or '').strip().lower(),
+        'model': model,
+        'prompt_version': prompt_version,
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def get_cached_roadmap(fingerprint, record_stats=True, stored_after=None):
+    """Return the cached roadmap for fingerprint, or None on a miss.
+
+    Pass record_stats=False for internal polling so it does not skew hit/miss counts.
+    stored_after only finds entries stored or refreshed since then, e.g. by
+    a generation that was in flight when a cache-bypassing request arrived.
+    """
+    now = timezone.now()
+    entries = RoadmapCacheEntry.objects.filter(fingerprint=fingerprint, expires_at__gt=now)
+    if stored_after is not None:
+        # Every store sets expires_at to the store time plus the TTL
+        entries = entries.filter(expires_at__gte=stored_after + timedelta(seconds=ROADMAP_CACHE_TTL_SECONDS))
+    try:
+        entry = entries.only('id', 'roadmap_data').first()
+        if entry is None:
+            if record_stats:
+                MetricCounter.increment(COUNTER_PREFIX + 'misses')
+            return None
+        if not record_stats:
+            return entry.roadmap_data
+
+        RoadmapCacheEntry.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1,
+            last_accessed_at=now,
+        )
+        MetricCounter.increment(COUNTER_PREFIX + 'hits')
+        return entry.roadmap_data
+    except DatabaseError as e:
+        print(f"⚠️ Roadmap cache lookup failed: {e}")
+        return None
+
+
+def get_pregenerated_roadmap(fingerprint):
+    """Return the pregenerated roadmap for fingerprint, or None when it was not pregenerated"""
+    try:
+        entry = PregeneratedRoadmap.objects.filter(fingerprint=fingerprint).only('id', 'roadmap_data').first()
+        if entry is None:
+            return None
+        PregeneratedRoadmap.objects.filter(pk=entry.pk).update(hit_count=F('hit_count') + 1)
+        MetricCounter.increment(COUNTER_PREFIX + 'pregenerated_hits')
+        return entry.roadmap_data
+    except DatabaseError as e:
+        print(f"⚠️ Pregenerated roadmap lookup failed: {e}")
+        return None
+
+
+def store_cached_roadmap(fingerprint, topics, purpose, model, prompt_version, roadmap_data):
+    """Insert or refresh a cache entry, then enforce TTL and size limits"""
+    now = timezone.now()
+    defaults = {
+        'topics': normalize_topics(topics),
+        'purpose': purpose or '',
+        'model_name': model,
+        'prompt_version': prompt_version,
+        'roadmap_data': roadmap_data,
+        'last_accessed_at': now,
+        'expires_at': now + timedelta(seconds=ROADMAP_CACHE_TTL_SECONDS),
+    }
+    try:
+        try:
+            with transaction.atomic():
+                RoadmapCacheEntry.objects.update_or_create(fingerprint=fingerprint, defaults=defaults)
+        except IntegrityError:
+            # Another worker stored the same fingerprint first; keep theirs
+            pass
+        MetricCounter.increment(COUNTER_PREFIX + 'stores')
+        evict_roadmap_cache()
+    except DatabaseError as e:
+        print(f"⚠️ Roadmap cache store failed: {e}")
+
+
+def evict_roadmap_cache(max_entries=None):
+    """Drop expired entries, then the least recently used ones above max_entries"""
+    if max_entries is None:
+        max_entries = ROADMAP_CACHE_MAX_ENTRIES
+
+    evicted, _ = RoadmapCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    overflow = RoadmapCacheEntry.objects.count() - max_entries
+    if overflow > 0:
+        stale_ids = list(
+            RoadmapCacheEntry.objects.order_by('last_accessed_at', 'id').values_list('id', flat=True)[:overflow]
+        )
+        evicted += RoadmapCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+
+    if evicted:
+        MetricCounter.increment(COUNTER_PREFIX + 'evictions', evicted)
+    return evicted
+
+
+def roadmap_cache_stats():
+    """Hit/miss counters and current size of the roadmap cache"""
+    counters = MetricCounter.values(COUNTER_PREFIX)
+    hits = counters.get(COUNTER_PREFIX + 'hits', 0)
+    misses = counters.get(COUNTER_PREFIX + 'misses', 0)
+    lookups = hits + misses
+    return {
+        'entries': RoadmapCacheEntry.objects.count(),
+        'max_entries': ROADMAP_CACHE_MAX_ENTRIES,
+        'ttl_seconds': ROADMAP_CACHE_TTL_SECONDS,
+        'hits': hits,
+        'misses': misses,
+        'stores': counters.get(COUNTER_PREFIX + 'stores', 0),
+        'pregenerated_entries': PregeneratedRoadmap.objects.count(),
+        'pregenerated_hits': counters.get(COUNTER_PREFIX + 'pregenerated_hits', 0),
+        'evictions': counters.get(COUNTER_PREFIX + 'evictions', 0),
+        'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,226 @@
+import base64
+import json
+import time
+import zlib
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+CODEC_KEY = '_codec'
+CODEC_NAME = 'rmc'
+CODEC_VERSION = 1
+
+
+def roadmap_codec():
+    """Storage codec for new writes: 'json' (plain) or 'compact'"""
+    return getattr(settings, 'ROADMAP_DATA_CODEC', 'json')
+
+
+def is_encoded(value):
+    return isinstance(value, dict) and value.get(CODEC_KEY) == CODEC_NAME
+
+
+def roadmap_summary(data):
+    """Small summary of a roadmap dict, kept uncompressed next to the encoded tree"""
+    items = data.get('roadmap') if isinstance(data, dict) else None
+    items = items if isinstance(items, list) else []
+    node_count, total_hours = 0, 0.0
+    stack = list(items)
+    while stack:
+        item = stack.pop()
+        if not isinstance(item, dict):
+            continue
+        node_count += 1
+        try:
+            total_hours += float(item.get('estimated_time_hours') or 0)
+        except (TypeError, ValueError):
+            pass
+        stack.extend(item.get('subtopics') or [])
+    return {
+        'main_topics': [str(item.get('topic', '')) for item in items if isinstance(item, dict)],
+        'node_count': node_count,
+        'total_hours': round(total_hours, 2),
+    }
+
+
+def intern_keys(value, tokens):
+    """Replace every dict key by a short token, registering new keys in tokens (key -> token)"""
+    if isinstance(value, dict):
+        interned = {}
+        for key, item in value.items():
+            token = tokens.get(key)
+            if token is None:
+                token = tokens[key] = format(len(tokens), 'x')
+            interned[token] = intern_keys(item, tokens)
+        return interned
+    if isinstance(value, list):
+        return [intern_keys(item, tokens) for item in value]
+    return value
+
+
+def encode_roadmap(data):
+    """Envelope for data: version, plain summary, and the key-interned tree zlib-compressed.
+
+    The envelope is still JSON so it lives in the same column, and its
+    summary can be read (even in SQL) without touching the compressed tree.
+    """
+    tokens = {}
+    payload = json.dumps(intern_keys(data, tokens), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return {
+        CODEC_KEY: CODEC_NAME,
+        'v': CODEC_VERSION,
+        'summary': roadmap_summary(data),
+        'keys': list(tokens),
+        'data': base64.b64encode(zlib.compress(payload, 9)).decode('ascii'),
+    }
+
+
+def decode_roadmap(envelope):
+    if envelope.get('v') != CODEC_VERSION:
+        raise ValueError(f"Unsupported roadmap codec version: {envelope.get('v')}")
+    keys = {format(index, 'x'): key for index, key in enumerate(envelope['keys'])}
+    # Keys are expanded by the parser itself, one pass over the tree
+    return json.loads(
+        zlib.decompress(base64.b64decode(envelope['data'])),
+        object_hook=lambda obj: {keys[token]: item for token, item in obj.items()},
+    )
+
+
+class EncodedRoadmapData:
+    """An encoded roadmap as loaded from the database, decoded only when needed"""
+
+    def __init__(self, envelope):
+        self.envelope = envelope
+
+    @property
+    def summary(self):
+        return self.envelope.get('summary') or {}
+
+    def decode(self):
+        return decode_roadmap(self.envelope)
+
+    def __repr__(self):
+        return f"<EncodedRoadmapData v{self.envelope.get('v')} {self.summary.get('node_count', '?')} nodes>"
+
+
+class LazyRoadmapAttribute(DeferredAttribute):
+    """Decodes an encoded roadmap on first attribute access and keeps the result"""
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if isinstance(value, EncodedRoadmapData):
+            value = instance.__dict__[self.field.attname] = value.decode()
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+def decoded(value):
+    return value.decode() if isinstance(value, EncodedRoadmapData) else value
+
+
+def decoding_iterable(iterable_class):
+    """values()/values_list() iterable class whose rows carry decoded roadmaps instead of EncodedRoadmapData"""
+    if getattr(iterable_class, 'decodes_roadmaps', False):
+        return iterable_class
+
+    class DecodingIterable(iterable_class):
+        decodes_roadmaps = True
+
+        def __iter__(self):
+            for row in super().__iter__():
+                if isinstance(row, dict):
+                    yield {key: decoded(value) for key, value in row.items()}
+                elif hasattr(row, '_fields'):
+                    yield type(row)(*map(decoded, row))
+                elif isinstance(row, tuple):
+                    yield tuple(map(decoded, row))
+                else:
+                    yield decoded(row)
+
+    return DecodingIterable
+
+
+class RoadmapDataQuerySet(models.QuerySet):
+    """QuerySet of models with a CompactRoadmapField: values() and values_list() rows hold the plain dict too"""
+
+    def values(self, *fields, **expressions):
+        clone = super().values(*fields, **expressions)
+        clone._iterable_class = decoding_iterable(clone._iterable_class)
+        return clone
+
+    def values_list(self, *fields, flat=False, named=False):
+        clone = super().values_list(*fields, flat=flat, named=named)
+        clone._iterable_class = decoding_iterable(clone._iterable_class)
+        return clone
+
+
+class CompactRoadmapField(models.JSONField):
+    """JSONField that writes through the compact codec when ROADMAP_DATA_CODEC is 'compact'.
+
+    Plain and encoded rows both read back as the plain dict, so rows can be
+    migrated in either direction at any time.
+    """
+    descriptor_class = LazyRoadmapAttribute
+
+    def from_db_value(self, value, expression, connection):
+        """Encoded rows load as EncodedRoadmapData, decoded by the model attribute on first access.
+
+        values() and values_list() rows are not model instances; the models'
+        RoadmapDataQuerySet decodes them. Reaching the column through a
+        relation from another model's values() yields the wrapper, whose
+        decode() gives the dict.
+        """
+        value = super().from_db_value(value, expression, connection)
+        return EncodedRoadmapData(value) if is_encoded(value) else value
+
+    def pre_save(self, model_instance, add):
+        # A roadmap that was never read is written back as stored, without decoding it
+        return model_instance.__dict__.get(self.attname)
+
+    def get_prep_value(self, value):
+        if isinstance(value, EncodedRoadmapData):
+            value = value.envelope
+        elif roadmap_codec() == 'compact' and isinstance(value, dict) and not is_encoded(value):
+            value = encode_roadmap(value)
+        return super().get_prep_value(value)
+
+
+def stored_roadmap_summary(instance, attname='roadmap_data'):
+    """Summary of a loaded roadmap; encoded rows answer from their envelope without decoding"""
+    value = instance.__dict__.get(attname)
+    if isinstance(value, EncodedRoadmapData):
+        return value.summary
+    return roadmap_summary(getattr(instance, attname))
+
+
+def benchmark_codec(roadmaps, repeat=20):
+    """Compare storage size and read time of plain JSON and the compact codec.
+
+    roadmaps are roadmap dicts ({"roadmap": [...]}); times are per roadmap, in
+    microseconds, averaged over repeat runs.
+    """
+    plain = [json.dumps(data) for data in roadmaps]
+    compact = [json.dumps(encode_roadmap(data)) for data in roadmaps]
+    runs = max(1, repeat) * max(1, len(roadmaps))
+
+    def timed(read, texts):
+        started = time.perf_counter()
+        for _ in range(max(1, repeat)):
+            for text in texts:
+                read(text)
+        return round((time.perf_counter() - started) / runs * 1e6, 2)
+
+    plain_bytes = sum(len(text.encode('utf-8')) for text in plain)
+    compact_bytes = sum(len(text.encode('utf-8')) for text in compact)
+    return {
+        'roadmaps': len(roadmaps),
+        'json_bytes': plain_bytes,
+        'compact_bytes': compact_bytes,
+        'size_ratio': round(compact_bytes / plain_bytes, 3) if plain_bytes else None,
+        'json_decode_us': timed(json.loads, plain),
+        'compact_decode_us': timed(lambda text: decode_roadmap(json.loads(text)), compact),
+        'summary_read_us': timed(lambda text: json.loads(text)['summary'], compact),
+    }
@@ -0,0 +1,114 @@
+import hashlib
+from functools import wraps
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import MetricCounter
+
+VERSION_PREFIX = 'data_version:'
+GLOBAL_SCOPE = 'global'
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+
+def version_name(user_id=None):
+    return f"{VERSION_PREFIX}user:{user_id}" if user_id is not None else VERSION_PREFIX + GLOBAL_SCOPE
+
+
+def bump_data_version(user_id=None):
+    """Invalidate every ETag of a user (catalog data when user_id is None) once the transaction commits.
+
+    Bumping after commit means a reader can never see the new version with
+    the old rows; at worst it re-downloads a page it already had.
+    """
+    transaction.on_commit(lambda: MetricCounter.increment(version_name(user_id)))
+
+
+def bump_data_versions(user_ids):
+    """bump_data_version for many users at once: one UPDATE plus one INSERT for new counters"""
+    names = {version_name(user_id) for user_id in user_ids}
+    if not names:
+        return
+
+    def bump():
+        now = timezone.now()
+        MetricCounter.objects.filter(name__in=names).update(value=F('value') + 1, updated_at=now)
+        existing = set(MetricCounter.objects.filter(name__in=names).values_list('name', flat=True))
+        # A counter created concurrently has just been bumped by its creator
+        MetricCounter.objects.bulk_create([
+            MetricCounter(name=name, value=1) for name in sorted(names - existing)
+        ], ignore_conflicts=True)
+
+    transaction.on_commit(bump)
+
+
+def data_versions(user_id=None):
+    """(version key, last modified) of the catalog and, when given, the user's data; one query"""
+    names = [version_name(), version_name(user_id)] if user_id is not None else [version_name()]
+    rows = {name: (value, updated_at) for name, value, updated_at in MetricCounter.objects.filter(
+        name__in=names,
+    ).values_list('name', 'value', 'updated_at')}
+    versions = [rows.get(name, (0, None)) for name in names]
+    modified = [updated_at for _value, updated_at in versions if updated_at is not None]
+    return ':'.join(str(value) for value, _updated_at in versions), max(modified, default=None)
+
+
+def user_data_etag(request, user_id=None, variant=''):
+    """Strong ETag for this URL as seen by this user, plus its Last-Modified timestamp (or None).
+
+    variant carries inputs the URL does not show, such as a date range
+    defaulting to today. Such responses get no Last-Modified: a timestamp
+    cannot tell that the implied inputs moved.
+    """
+    version, last_modified = data_versions(user_id)
+    digest = hashlib.sha256(f"{user_id}|{version}|{request.get_full_path()}|{variant}".encode('utf-8')).hexdigest()[:32]
+    if variant:
+        last_modified = None
+    return quote_etag(digest), (int(last_modified.timestamp()) if last_modified else None)
+
+
+def conditional_get(request, user_id, render, variant=''):
+    """Answer GET/HEAD with 304 when the client's validators still match, else call render()"""
+    if request.method not in CONDITIONAL_METHODS:
+        return render()
+    etag, last_modified = user_data_etag(request, user_id, variant)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Browsers keep the body and revalidate with If-None-Match on every read
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_on_user_data(get_user_id, get_variant=None):
+    """Decorator for @api_view functions: 304 before the view builds a queryset or serializes.
+
+    get_variant(request), when given, returns the inputs of the response
+    that are not in its URL (see user_data_etag).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in CONDITIONAL_METHODS:
+                return view(request, *args, **kwargs)
+            variant = get_variant(request) if get_variant is not None else ''
+            return conditional_get(request, get_user_id(request), lambda: view(request, *args, **kwargs), variant)
+        return wrapped
+    return decorator
+
+
+class ConditionalUserDataMixin:
+    """Generic view mixin: GET is answered with 304 from the requesting user's data version"""
+
+    def get(self, request, *args, **kwargs):
+        user_id = request.user.pk if request.user.is_authenticated else None
+        return conditional_get(request, user_id, lambda: super(ConditionalUserDataMixin, self).get(request, *args, **kwargs))
@@ -0,0 +1,134 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import RoadmapJob
+from .nodes import roadmap_data_of
+
+# A running job whose heartbeat is older than this is assumed to belong to a dead worker
+ROADMAP_JOB_LEASE_SECONDS = getattr(settings, 'ROADMAP_JOB_LEASE_SECONDS', 300)
+ROADMAP_JOB_MAX_ATTEMPTS = getattr(settings, 'ROADMAP_JOB_MAX_ATTEMPTS', 3)
+ROADMAP_JOB_RETRY_BASE_SECONDS = getattr(settings, 'ROADMAP_JOB_RETRY_BASE_SECONDS', 15)
+
+
+class RetryJob(Exception):
+    """Raised by a job handler to give the job another attempt later"""
+
+
+def enqueue_roadmap_job(plan, priority=0):
+    return RoadmapJob.objects.create(
+        user=plan.user,
+        study_plan=plan,
+        priority=priority,
+        max_attempts=ROADMAP_JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim_next_job(worker_id):
+    """Atomically move the next runnable job to 'running' for worker_id.
+
+    The conditional UPDATE is the lock: when two workers race for the same
+    row only one sees a rowcount of 1, the other moves on to the next candidate.
+    """
+    now = timezone.now()
+    candidates = (RoadmapJob.objects
+                  .filter(status='queued', available_at__lte=now)
+                  .order_by('-priority', 'available_at', 'id')
+                  .values_list('id', flat=True)[:20])
+    for job_id in candidates:
+        claimed = RoadmapJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return RoadmapJob.objects.select_related('study_plan', 'user').get(id=job_id)
+    return None
+
+
+def heartbeat_jobs(job_ids, worker_id):
+    """Extend the lease on jobs this worker is still running"""
+    if job_ids:
+        RoadmapJob.objects.filter(id__in=job_ids, status='running', locked_by=worker_id).update(
+            locked_at=timezone.now()
+        )
+
+
+def complete_job(job, user_roadmap, source):
+    RoadmapJob.objects.filter(id=job.id).update(
+        status='succeeded',
+        user_roadmap=user_roadmap,
+        source=source,
+        error='',
+        locked_by='',
+        finished_at=timezone.now(),
+    )
+
+
+def fail_job(job, error):
+    """Requeue with jittered exponential backoff, or mark failed once attempts run out"""
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        delay = ROADMAP_JOB_RETRY_BASE_SECONDS * (2 ** (job.attempts - 1))
+        delay = random.uniform(delay / 2, delay)
+        RoadmapJob.objects.filter(id=job.id).update(
+            status='queued',
+            error=str(error),
+            locked_by='',
+            locked_at=None,
+            available_at=now + timedelta(seconds=delay),
+        )
+        return 'queued'
+
+    RoadmapJob.objects.filter(id=job.id).update(
+        status='failed',
+        error=str(error),
+        locked_by='',
+        finished_at=now,
+    )
+    return 'failed'
+
+
+def recover_stale_jobs(lease_seconds=None):
+    """Requeue running jobs whose worker stopped sending heartbeats"""
+    if lease_seconds is None:
+        lease_seconds = ROADMAP_JOB_LEASE_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=lease_seconds)
+    stale = RoadmapJob.objects.filter(status='running', locked_at__lt=cutoff)
+
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed',
+        error='Worker stopped responding',
+        locked_by='',
+        finished_at=timezone.now(),
+    )
+    requeued = stale.update(status='queued', locked_by='', locked_at=None, available_at=timezone.now())
+    return requeued, failed
+
+
+def roadmap_job_payload(job, include_roadmap=False):
+    data = {
+        'id': job.id,
+        'status': job.status,
+        'study_plan_id': job.study_plan_id,
+        'priority': job.priority,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'source': job.source or None,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'status_url': reverse('roadmap_job_status', args=[job.id]),
+    }
+    if include_roadmap and job.status == 'succeeded' and job.user_roadmap_id:
+        data['roadmap'] = {
+            'main_topic': job.study_plan.main_topic,
+            'roadmap': (roadmap_data_of(job.user_roadmap) or {}).get('roadmap', []),
+            'user_roadmap_id': job.user_roadmap_id,
+        }
+    return data
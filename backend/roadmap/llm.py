@@ -0,0 +1,103 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+# Connection pool sizing and timeouts, overridable from settings
+LLM_HTTP_POOL_CONNECTIONS = getattr(settings, 'LLM_HTTP_POOL_CONNECTIONS', 10)
+LLM_HTTP_POOL_MAXSIZE = getattr(settings, 'LLM_HTTP_POOL_MAXSIZE', 20)
+LLM_CONNECT_TIMEOUT = getattr(settings, 'LLM_CONNECT_TIMEOUT', 5)
+LLM_READ_TIMEOUT = getattr(settings, 'LLM_READ_TIMEOUT', 30)
+
+
+class LLMClient:
+    """Shared HTTP client for LLM APIs.
+
+    One requests.Session per process keeps TCP/TLS connections alive per host,
+    so retries and later generations skip the handshake.
+    """
+
+    def __init__(self, pool_connections=None, pool_maxsize=None, connect_timeout=None, read_timeout=None):
+        self.pool_connections = pool_connections or LLM_HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or LLM_HTTP_POOL_MAXSIZE
+        self.timeout = (connect_timeout or LLM_CONNECT_TIMEOUT, read_timeout or LLM_READ_TIMEOUT)
+        self.pid = os.getpid()
+
+        self.adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,  # Hosts kept in the pool manager
+            pool_maxsize=self.pool_maxsize,  # Idle keep-alive connections kept per host
+            max_retries=0,  # Retries are handled by the generation loop
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers['Connection'] = 'keep-alive'
+
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.request_errors = 0
+
+    def post(self, url, json=None, headers=None, stream=False, timeout=None):
+        """POST through the pooled session; timeout is (connect, read) or a read timeout"""
+        if timeout is None:
+            timeout = self.timeout
+        elif not isinstance(timeout, tuple):
+            timeout = (self.timeout[0], timeout)
+
+        with self._lock:
+            self.requests_sent += 1
+        try:
+            return self.session.post(url, json=json, headers=headers, stream=stream, timeout=timeout)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self.request_errors += 1
+            raise
+
+    def pool_stats(self):
+        """Per-host connection reuse figures from the urllib3 pools"""
+        pools = self.adapter.poolmanager.pools
+        hosts = []
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened = pool.num_connections
+            served = pool.num_requests
+            hosts.append({
+                'host': f"{key.key_scheme}://{key.key_host}:{key.key_port or ''}".rstrip(':'),
+                'connections_opened': opened,
+                'requests': served,
+                'idle_connections': pool.pool.qsize() if pool.pool is not None else 0,
+                'reuse_rate': round(1 - opened / served, 4) if served else 0.0,
+            })
+        return {
+            'pid': self.pid,
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'connect_timeout': self.timeout[0],
+            'read_timeout': self.timeout[1],
+            'requests_sent': self.requests_sent,
+            'request_errors': self.request_errors,
+            'hosts': hosts,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Process-wide LLMClient, rebuilt after a fork so workers never share sockets"""
+    global _client
+    client = _client
+    if client is not None and client.pid == os.getpid():
+        return client
+    with _client_lock:
+        if _client is None or _client.pid != os.getpid():
+            _client = LLMClient()
+        return _client
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from learning.models import Resource, Subject, Topic
+from roadmap.models import NodeResource, ResourceTerm, RoadmapNode, RoadmapTemplate
+from roadmap.resource_index import index_nodes, index_resources, rebuild_resource_index, resource_terms_removed
+
+WORDS = (
+    'python javascript sql data web api testing design security networks linux cloud databases react django '
+    'algorithms structures machine learning statistics algebra calculus functions classes objects async '
+    'performance deployment containers git queries models graphs trees sorting search optimization'
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time the roadmap node / resource index on a synthetic Zipf-distributed catalog (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=20000, help="Synthetic resources")
+        parser.add_argument('--nodes', type=int, default=2000, help="Synthetic roadmap nodes")
+        parser.add_argument('--saves', type=int, default=5, help="Resource saves and deletes timed")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def titles(self, rng, count, length):
+        # Word frequencies follow Zipf's law, as in real catalogs: a few words ("python", "data") are everywhere
+        vocabulary = WORDS + [f'term{index}' for index in range(5000)]
+        weights = [1.0 / rank for rank in range(1, len(vocabulary) + 1)]
+        for _ in range(count):
+            yield ' '.join(rng.choices(vocabulary, weights, k=length))
+
+    def timed(self, run):
+        started = time.perf_counter()
+        run()
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        saves = max(1, options['saves'])
+        try:
+            with transaction.atomic():
+                subject = Subject.objects.create(name='Benchmark subject')
+                topic = Topic.objects.create(subject=subject, name='Benchmark topic')
+                Resource.objects.bulk_create([
+                    Resource(title=title, description='', resource_type='article', subject=subject, topic=topic, difficulty_level='beginner')
+                    for title in self.titles(rng, options['resources'], 4)
+                ], batch_size=2000)
+                templates = [
+                    RoadmapTemplate.objects.create(content_hash=hashlib.sha256(f'benchmark {index}'.encode()).hexdigest(), roadmap_data={'roadmap': []})
+                    for index in range(max(1, options['nodes'] // 50))
+                ]
+                RoadmapNode.objects.bulk_create([
+                    RoadmapNode(template=templates[index % len(templates)], node_id=str(index), position=index, path=f'{index:04d}.', title=title)
+                    for index, title in enumerate(self.titles(rng, options['nodes'], 3))
+                ], batch_size=2000)
+
+                started = time.perf_counter()
+                rebuild_resource_index()
+                rebuild_seconds = round(time.perf_counter() - started, 1)
+
+                save_ms, retitle_ms, delete_ms = [], [], []
+                for title, new_title in zip(self.titles(rng, saves, 4), self.titles(rng, saves, 4)):
+                    resource = Resource.objects.create(
+                        title=title, description='', resource_type='article', subject=subject, topic=topic, difficulty_level='beginner',
+                    )
+                    save_ms.append(self.timed(lambda: index_resources([resource.pk])))
+                    Resource.objects.filter(pk=resource.pk).update(title=new_title)
+                    retitle_ms.append(self.timed(lambda: index_resources([resource.pk])))
+                    # What the pre_delete receiver keeps
+                    term_ids = list(ResourceTerm.objects.filter(resource=resource).values_list('term_id', flat=True))
+                    node_ids = list(NodeResource.objects.filter(resource=resource).values_list('node_id', flat=True))
+                    resource.delete()
+                    delete_ms.append(self.timed(lambda: resource_terms_removed(term_ids, node_ids)))
+
+                roadmap = RoadmapTemplate.objects.create(content_hash=hashlib.sha256(b'benchmark new').hexdigest(), roadmap_data={'roadmap': []})
+                nodes = RoadmapNode.objects.bulk_create([
+                    RoadmapNode(template=roadmap, node_id=str(index), position=index, path=f'{index:04d}.', title=title)
+                    for index, title in enumerate(self.titles(rng, 44, 3))
+                ])
+                new_roadmap_ms = self.timed(lambda: index_nodes(nodes))
+                results = {
+                    'resources': options['resources'], 'nodes': options['nodes'], 'links': NodeResource.objects.count(),
+                    'rebuild_seconds': rebuild_seconds, 'new_44_node_roadmap_ms': new_roadmap_ms,
+                    'resource_save_ms': max(save_ms), 'resource_retitle_ms': max(retitle_ms), 'resource_delete_ms': max(delete_ms),
+                }
+                raise Rollback
+        except Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{results['resources']} resources, {results['nodes']} nodes, {results['links']} links (rolled back)\n"
+            f"  rebuild            {results['rebuild_seconds']:>9} s\n"
+            f"  new 44-node roadmap {results['new_44_node_roadmap_ms']:>8} ms\n"
+            f"  resource save      {results['resource_save_ms']:>9} ms (slowest of {saves})\n"
+            f"  resource retitle   {results['resource_retitle_ms']:>9} ms\n"
+            f"  resource delete    {results['resource_delete_ms']:>9} ms"
+        )
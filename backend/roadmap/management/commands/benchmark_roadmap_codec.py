@@ -0,0 +1,37 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from roadmap.codec import benchmark_codec
+from roadmap.pregenerate import load_matrix
+
+DEFAULT_MATRIX = Path(__file__).resolve().parents[2] / 'pregenerate_matrix.json'
+
+
+class Command(BaseCommand):
+    help = "Compare size and decode time of plain JSON and the compact codec on fallback roadmaps"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--matrix', default=str(DEFAULT_MATRIX), help="Topic x purpose matrix (JSON or CSV)")
+        parser.add_argument('--repeat', type=int, default=20, help="Decode runs per roadmap")
+        parser.add_argument('--json', action='store_true', help="Print the raw result as JSON")
+
+    def handle(self, *args, **options):
+        from roadmap.views import get_fallback_roadmap
+
+        try:
+            matrix = load_matrix(options['matrix'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read matrix: {e}")
+        roadmaps = [get_fallback_roadmap([topic], purpose) for topic, purpose in matrix]
+        result = benchmark_codec(roadmaps, repeat=options['repeat'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+            return
+        self.stdout.write(f"{result['roadmaps']} fallback roadmap(s), {options['repeat']} run(s) each")
+        self.stdout.write(f"  storage  json {result['json_bytes']} B, compact {result['compact_bytes']} B "
+                          f"(x{result['size_ratio']})")
+        self.stdout.write(f"  decode   json {result['json_decode_us']} us, compact {result['compact_decode_us']} us")
+        self.stdout.write(f"  summary  compact envelope only {result['summary_read_us']} us")
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from roadmap.codec import EncodedRoadmapData, roadmap_codec
+from roadmap.models import RoadmapTemplate, UserRoadmap
+
+
+class Command(BaseCommand):
+    help = "Rewrite stored roadmap_data rows (templates and owned roadmaps) in the ROADMAP_DATA_CODEC format"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Rows rewritten per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the rows that would change")
+
+    def rewrite(self, model, want_encoded, batch_size, dry_run):
+        scanned = changed = 0
+        last_id = 0
+
+        while True:
+            # Keyset over ids so every batch is one range scan, however far along
+            batch = list(model.objects.filter(
+                id__gt=last_id, roadmap_data__isnull=False,
+            ).order_by('id').only('id', 'roadmap_data')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            scanned += len(batch)
+
+            stale = [
+                row for row in batch
+                if isinstance(row.__dict__['roadmap_data'], EncodedRoadmapData) != want_encoded
+            ]
+            changed += len(stale)
+            if stale and not dry_run:
+                for row in stale:
+                    # Reading decodes; the write re-encodes in the configured codec
+                    row.__dict__['roadmap_data'] = row.roadmap_data
+                with transaction.atomic():
+                    # Raw bulk UPDATE: templates refuse save(), and no other column changes
+                    model.objects.bulk_update(stale, ['roadmap_data'], batch_size=batch_size)
+        return scanned, changed
+
+    def handle(self, *args, **options):
+        codec = roadmap_codec()
+        want_encoded = codec == 'compact'
+        batch_size = max(1, options['batch_size'])
+        verb = "would be rewritten" if options['dry_run'] else "rewritten"
+
+        for model, label in ((RoadmapTemplate, 'template(s)'), (UserRoadmap, 'roadmap(s)')):
+            scanned, changed = self.rewrite(model, want_encoded, batch_size, options['dry_run'])
+            self.stdout.write(self.style.SUCCESS(f"{changed} of {scanned} {label} {verb} as {codec}"))
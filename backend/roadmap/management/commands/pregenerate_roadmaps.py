@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from roadmap.cache import roadmap_fingerprint
+from roadmap.models import PregeneratedRoadmap
+from roadmap.pregenerate import Checkpoint, load_matrix, pregenerate_roadmap, store_pregenerated, summarize_results
+from roadmap.providers import get_llm_provider
+
+
+class Command(BaseCommand):
+    help = "Pregenerate roadmaps for a topic x purpose matrix so study plans skip the LLM call"
+
+    def add_arguments(self, parser):
+        parser.add_argument('matrix', help="JSON or CSV file listing topics and purposes")
+        parser.add_argument('--concurrency', type=int, default=4, help="Roadmaps generated in parallel")
+        parser.add_argument('--checkpoint', help="Progress file used to resume (default: <matrix>.checkpoint.json)")
+        parser.add_argument('--force', action='store_true', help="Regenerate entries that already exist")
+
+    def handle(self, *args, **options):
+        from roadmap.views import ROADMAP_PROMPT_VERSION
+
+        try:
+            matrix = load_matrix(options['matrix'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read matrix: {e}")
+
+        provider = get_llm_provider()
+        if not provider.is_configured():
+            raise CommandError(f"LLM provider '{provider.name}' is not configured")
+
+        checkpoint = Checkpoint(options['checkpoint'] or f"{options['matrix']}.checkpoint.json")
+        existing = set(PregeneratedRoadmap.objects.filter(
+            model_name=provider.model, prompt_version=ROADMAP_PROMPT_VERSION,
+        ).values_list('fingerprint', flat=True))
+
+        # The stored rows decide what is done; the checkpoint only reports entries that went missing since
+        results, pending, missing = [], [], 0
+        for topic, purpose in matrix:
+            fingerprint = roadmap_fingerprint([topic], purpose, provider.model, ROADMAP_PROMPT_VERSION)
+            if not options['force'] and fingerprint in existing:
+                results.append({'topic': topic, 'purpose': purpose, 'fingerprint': fingerprint, 'status': 'skipped'})
+            else:
+                pending.append((topic, purpose))
+                missing += fingerprint in checkpoint and fingerprint not in existing
+
+        concurrency = max(1, min(options['concurrency'], len(pending) or 1))
+        self.stdout.write(
+            f"Pregenerating {len(pending)} of {len(matrix)} roadmap(s) with {provider.name} "
+            f"({provider.model}), concurrency {concurrency}; {len(results)} already done"
+        )
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"{missing} checkpointed roadmap(s) are no longer stored and will be generated again"
+            ))
+
+        def run(topic, purpose):
+            try:
+                return pregenerate_roadmap(topic, purpose, provider, ROADMAP_PROMPT_VERSION)
+            finally:
+                # Each pool thread holds its own connection
+                connection.close()
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='pregenerate')
+        futures = [executor.submit(run, topic, purpose) for topic, purpose in pending]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                results.append(result)
+                # Only this thread writes, so pool threads never contend for the database write lock
+                if result['status'] == 'generated' and store_pregenerated(result, provider.model, ROADMAP_PROMPT_VERSION):
+                    checkpoint.mark(result['fingerprint'], result)
+                    line = f"✅ {result['topic']} ({result['purpose']}) in {result['latency_ms']}ms"
+                else:
+                    line = f"❌ {result['topic']} ({result['purpose']}): {result['error']}"
+                self.stdout.write(f"[{done}/{len(pending)}] {line}")
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            self.stdout.write(self.style.WARNING("Interrupted; rerun the command to resume with the entries not yet stored"))
+        finally:
+            executor.shutdown(wait=True)
+
+        summary = summarize_results(results)
+        self.stdout.write(
+            f"Generated {summary['generated']}, skipped {summary['skipped']}, failed {summary['failed']}; "
+            f"tokens in/out {summary['prompt_tokens']}/{summary['completion_tokens']}"
+        )
+        if 'latency_ms_p50' in summary:
+            self.stdout.write(
+                f"Latency p50 {summary['latency_ms_p50']}ms, p95 {summary['latency_ms_p95']}ms, "
+                f"max {summary['latency_ms_max']}ms, mean {summary['latency_ms_mean']}ms"
+            )
+        if summary['failed']:
+            self.stdout.write(self.style.WARNING("Failed entries were not checkpointed and are retried on the next run"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Pregeneration complete"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from roadmap.resource_index import rebuild_resource_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the roadmap node to learning resource index (after bulk catalog imports or first deploy)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="Resources or nodes indexed per batch")
+
+    def handle(self, *args, **options):
+        resources, nodes = rebuild_resource_index(max(1, options['batch_size']), stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {resources} resources and linked {nodes} roadmap nodes"))
@@ -0,0 +1,101 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from roadmap.jobs import (
+    ROADMAP_JOB_LEASE_SECONDS, RetryJob, claim_next_job, complete_job,
+    fail_job, heartbeat_jobs, recover_stale_jobs,
+)
+
+
+def run_roadmap_job(job):
+    """Generate and persist the roadmap for one claimed job"""
+    from roadmap.views import build_plan_roadmap, save_plan_roadmap
+
+    plan = job.study_plan
+    try:
+        print(f"🚀 Job {job.id}: attempt {job.attempts}/{job.max_attempts} for '{plan.main_topic}' ({plan.purpose_of_study})")
+        roadmap_data, source = build_plan_roadmap(plan.main_topic, plan.available_time, plan.purpose_of_study)
+
+        # Nobody is waiting on the HTTP request, so spend remaining attempts on a real AI roadmap
+        if source == 'fallback' and job.attempts < job.max_attempts:
+            raise RetryJob("AI generation unavailable, retrying before settling for the fallback roadmap")
+
+        # Rows and job state commit together so a crash never leaves a duplicate roadmap behind
+        with transaction.atomic():
+            user_roadmap = save_plan_roadmap(plan, roadmap_data)
+            complete_job(job, user_roadmap, source)
+        print(f"✅ Job {job.id}: saved UserRoadmap {user_roadmap.id} ({source})")
+    except Exception as e:
+        outcome = fail_job(job, e)
+        print(f"⚠️ Job {job.id}: {e} -> {outcome}")
+
+
+def run_in_pool_thread(job):
+    try:
+        run_roadmap_job(job)
+    finally:
+        # Each pool thread holds its own connection
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Process queued study plan roadmap generations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Jobs generated in parallel")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds between queue polls when idle")
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is drained")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        heartbeat_interval = max(1.0, ROADMAP_JOB_LEASE_SECONDS / 3)
+
+        stopping = []
+
+        def request_stop(signum, frame):
+            self.stdout.write("Stopping after in-flight jobs finish...")
+            stopping.append(signum)
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        requeued, failed = recover_stale_jobs()
+        if requeued or failed:
+            self.stdout.write(f"Recovered {requeued} stale job(s), {failed} marked failed")
+
+        self.stdout.write(f"Roadmap worker {worker_id} started with concurrency {concurrency}")
+        in_flight = {}
+        last_heartbeat = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='roadmap-job') as executor:
+            while True:
+                if time.monotonic() - last_heartbeat >= heartbeat_interval:
+                    heartbeat_jobs(list(in_flight.values()), worker_id)
+                    recover_stale_jobs()
+                    last_heartbeat = time.monotonic()
+
+                while not stopping and len(in_flight) < concurrency:
+                    job = claim_next_job(worker_id)
+                    if job is None:
+                        break
+                    in_flight[executor.submit(run_in_pool_thread, job)] = job.id
+
+                if not in_flight:
+                    if stopping or options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.pop(future)
+
+        self.stdout.write(self.style.SUCCESS("Roadmap worker stopped"))
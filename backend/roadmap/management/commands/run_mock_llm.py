@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from roadmap.mock_llm import MockLLMConfig, make_mock_llm_server
+
+
+class Command(BaseCommand):
+    help = "Serve a local OpenAI-compatible mock LLM for load tests (use with LLM_PROVIDER=mock)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+        parser.add_argument('--jitter', type=float, default=0.0, help="Extra random latency, up to this many seconds")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+        parser.add_argument('--truncate-rate', type=float, default=0.0,
+                            help="Fraction of answers cut off as if max_tokens was hit")
+        parser.add_argument('--chunk-chars', type=int, default=48, help="Characters per streamed delta")
+        parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible error/truncation rolls")
+
+    def handle(self, *args, **options):
+        config = MockLLMConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            truncate_rate=options['truncate_rate'],
+            chunk_chars=options['chunk_chars'],
+            seed=options['seed'],
+        )
+        server = make_mock_llm_server(options['host'], options['port'], config)
+        host, port = server.server_address[:2]
+        self.stdout.write(f"Mock LLM listening on http://{host}:{port}/v1/chat/completions")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(self.style.SUCCESS(f"Mock LLM stopped after {config.requests_served} request(s)"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0013_roadmapjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoadmapGenerationLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('owner', models.CharField(max_length=150)),
+                ('acquired_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(help_text='Lock is considered abandoned after this time')),
+            ],
+        ),
+    ]
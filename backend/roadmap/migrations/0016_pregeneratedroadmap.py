@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0015_circuitbreakerstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PregeneratedRoadmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64, unique=True)),
+                ('topic', models.CharField(max_length=200)),
+                ('purpose', models.CharField(max_length=50)),
+                ('model_name', models.CharField(max_length=100)),
+                ('prompt_version', models.CharField(max_length=20)),
+                ('roadmap_data', models.JSONField()),
+                ('latency_ms', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=1)),
+                ('prompt_tokens', models.PositiveIntegerField(default=0)),
+                ('completion_tokens', models.PositiveIntegerField(default=0)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
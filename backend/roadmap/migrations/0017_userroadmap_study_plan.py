@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0016_pregeneratedroadmap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userroadmap',
+            name='study_plan',
+            field=models.ForeignKey(blank=True, help_text='Study plan this roadmap was generated for', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='user_roadmaps', to='roadmap.studyplan'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:56
+
+from django.db import migrations
+
+
+def link_roadmaps_to_plans(apps, schema_editor):
+    """Link existing roadmaps to the plan they were generated for.
+
+    Plans used to find their roadmap by title substring; the same rule is
+    applied once here. Newest plans claim first, exact "<topic> - Study Plan"
+    titles win over substring matches, and a roadmap is linked to one plan only.
+    """
+    StudyPlan = apps.get_model('roadmap', 'StudyPlan')
+    UserRoadmap = apps.get_model('roadmap', 'UserRoadmap')
+
+    roadmaps_by_user = {}
+    for roadmap in UserRoadmap.objects.filter(study_plan__isnull=True).order_by('-created_at', '-id'):
+        roadmaps_by_user.setdefault(roadmap.user_id, []).append(roadmap)
+
+    linked = []
+    for plan in StudyPlan.objects.order_by('-created_at', '-id'):
+        candidates = roadmaps_by_user.get(plan.user_id, [])
+        topic = plan.main_topic.lower()
+        match = next((r for r in candidates if r.title.lower() == f"{topic} - study plan"), None)
+        if match is None:
+            match = next((r for r in candidates if topic in r.title.lower()), None)
+        if match is None:
+            continue
+        candidates.remove(match)
+        match.study_plan_id = plan.id
+        linked.append(match)
+
+    UserRoadmap.objects.bulk_update(linked, ['study_plan'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0017_userroadmap_study_plan'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_roadmaps_to_plans, migrations.RunPython.noop),
+    ]
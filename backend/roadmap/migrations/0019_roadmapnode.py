@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0018_backfill_userroadmap_study_plan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoadmapNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_id', models.CharField(help_text='Roadmap item id such as "1.2"', max_length=50)),
+                ('depth', models.PositiveSmallIntegerField(default=0)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('path', models.CharField(max_length=255)),
+                ('title', models.CharField(max_length=255)),
+                ('estimated_hours', models.FloatField(default=0)),
+                ('attributes', models.JSONField(blank=True, default=dict)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='roadmap.roadmapnode')),
+                ('user_roadmap', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nodes', to='roadmap.userroadmap')),
+            ],
+            options={
+                'ordering': ['user_roadmap', 'path'],
+                'indexes': [models.Index(fields=['user_roadmap', 'path'], name='roadmap_node_path_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user_roadmap', 'node_id'), name='roadmap_node_unique_id')],
+            },
+        ),
+    ]
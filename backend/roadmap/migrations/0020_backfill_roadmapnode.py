@@ -0,0 +1,99 @@
+from django.db import migrations
+
+# Frozen copies of the roadmap.nodes helpers as of this migration, so later changes there cannot break it
+ITEM_FIELDS = ('id', 'topic', 'estimated_time_hours', 'subtopics')
+BATCH_SIZE = 200
+
+
+def hours_value(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_node_levels(roadmap_items, RoadmapNode, user_roadmap_id):
+    """Unsaved nodes of one roadmap as [[(node, parent_node), ...] per depth]"""
+    levels = []
+    seen_ids = set()
+
+    def walk(items, parent, parent_path, parent_position_id, depth):
+        for position, item in enumerate(items or [], start=1):
+            if not isinstance(item, dict):
+                continue
+            positional_id = f"{parent_position_id}.{position}" if parent_position_id else str(position)
+            node_id = str(item.get('id') or positional_id)
+            if node_id in seen_ids:
+                node_id = positional_id
+            while node_id in seen_ids:
+                node_id += "'"
+            seen_ids.add(node_id)
+
+            node = RoadmapNode(
+                user_roadmap_id=user_roadmap_id,
+                node_id=node_id[:50],
+                depth=depth,
+                position=position,
+                path=parent_path + f"{position:04d}.",
+                title=str(item.get('topic') or 'Untitled')[:255],
+                estimated_hours=hours_value(item.get('estimated_time_hours')),
+                attributes={key: value for key, value in item.items() if key not in ITEM_FIELDS},
+            )
+            if len(levels) <= depth:
+                levels.append([])
+            levels[depth].append((node, parent))
+            walk(item.get('subtopics'), node, node.path, positional_id, depth + 1)
+
+    walk(roadmap_items, None, '', '', 0)
+    return levels
+
+
+def insert_node_levels(roadmap_levels, RoadmapNode):
+    """Insert the nodes of several roadmaps one depth at a time, parents first"""
+    merged = []
+    for levels in roadmap_levels:
+        for depth, level in enumerate(levels):
+            if len(merged) <= depth:
+                merged.append([])
+            merged[depth].extend(level)
+
+    for level in merged:
+        for node, parent in level:
+            node.parent_id = parent.pk if parent is not None else None
+        RoadmapNode.objects.bulk_create([node for node, _parent in level], batch_size=500)
+        if level and level[0][0].pk is None:
+            pks = {
+                (roadmap_id, node_id): pk for roadmap_id, node_id, pk in RoadmapNode.objects.filter(
+                    user_roadmap_id__in={node.user_roadmap_id for node, _parent in level}, depth=level[0][0].depth,
+                ).values_list('user_roadmap_id', 'node_id', 'pk')
+            }
+            for node, _parent in level:
+                node.pk = pks[(node.user_roadmap_id, node.node_id)]
+
+
+def create_roadmap_nodes(apps, schema_editor):
+    """Build node rows for every roadmap saved before the node table existed"""
+    UserRoadmap = apps.get_model('roadmap', 'UserRoadmap')
+    RoadmapNode = apps.get_model('roadmap', 'RoadmapNode')
+
+    roadmaps = UserRoadmap.objects.only('id', 'roadmap_data').order_by('id')
+    batch = []
+    for roadmap in roadmaps.iterator(chunk_size=BATCH_SIZE):
+        data = roadmap.roadmap_data if isinstance(roadmap.roadmap_data, dict) else {}
+        batch.append(build_node_levels(data.get('roadmap') or [], RoadmapNode, roadmap.id))
+        if len(batch) == BATCH_SIZE:
+            insert_node_levels(batch, RoadmapNode)
+            batch = []
+    if batch:
+        insert_node_levels(batch, RoadmapNode)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0019_roadmapnode'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_roadmap_nodes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:59
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def store_roadmap_totals(apps, schema_editor):
+    """Fill node_count and total_hours from the node rows of existing roadmaps"""
+    UserRoadmap = apps.get_model('roadmap', 'UserRoadmap')
+    RoadmapNode = apps.get_model('roadmap', 'RoadmapNode')
+
+    totals = RoadmapNode.objects.values('user_roadmap_id').annotate(count=Count('id'), hours=Sum('estimated_hours'))
+    roadmaps = []
+    for row in totals.iterator():
+        roadmaps.append(UserRoadmap(id=row['user_roadmap_id'], node_count=row['count'], total_hours=row['hours'] or 0))
+    UserRoadmap.objects.bulk_update(roadmaps, ['node_count', 'total_hours'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0020_backfill_roadmapnode'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='roadmapnode',
+            options={'ordering': ['path']},
+        ),
+        migrations.AddField(
+            model_name='roadmapnode',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='roadmapnode',
+            name='is_completed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='userroadmap',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userroadmap',
+            name='completed_hours',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userroadmap',
+            name='node_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userroadmap',
+            name='total_hours',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(store_roadmap_totals, migrations.RunPython.noop),
+    ]
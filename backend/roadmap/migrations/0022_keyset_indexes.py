@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0021_roadmap_progress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studyplan',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='studyplan_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userroadmap',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='userroadmap_user_keyset_idx'),
+        ),
+    ]
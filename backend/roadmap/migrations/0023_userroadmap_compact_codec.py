@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:09
+
+import roadmap.codec
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0022_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userroadmap',
+            name='roadmap_data',
+            field=roadmap.codec.CompactRoadmapField(),
+        ),
+    ]
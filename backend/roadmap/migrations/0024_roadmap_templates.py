@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:13
+
+import django.db.models.deletion
+import roadmap.codec
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0023_userroadmap_compact_codec'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoadmapTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('roadmap_data', roadmap.codec.CompactRoadmapField()),
+                ('node_count', models.PositiveIntegerField(default=0)),
+                ('total_hours', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userroadmap',
+            name='overlay',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='roadmapnode',
+            name='user_roadmap',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='nodes', to='roadmap.userroadmap'),
+        ),
+        migrations.AlterField(
+            model_name='userroadmap',
+            name='roadmap_data',
+            field=roadmap.codec.CompactRoadmapField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='roadmapnode',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='nodes', to='roadmap.roadmaptemplate'),
+        ),
+        migrations.AddField(
+            model_name='userroadmap',
+            name='template',
+            field=models.ForeignKey(blank=True, help_text='Shared roadmap content; roadmap_data is unused while set', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='user_roadmaps', to='roadmap.roadmaptemplate'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapnode',
+            index=models.Index(fields=['template', 'path'], name='template_node_path_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='roadmapnode',
+            constraint=models.UniqueConstraint(fields=('template', 'node_id'), name='template_node_unique_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='roadmapnode',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('template__isnull', True), ('user_roadmap__isnull', False)), models.Q(('template__isnull', False), ('user_roadmap__isnull', True)), _connector='OR'), name='roadmap_node_one_owner'),
+        ),
+    ]
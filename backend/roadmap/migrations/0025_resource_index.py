@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0007_search_index'),
+        ('roadmap', '0024_roadmap_templates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=64, unique=True)),
+                ('resource_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NodeResource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_links', to='roadmap.roadmapnode')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roadmap_node_links', to='learning.resource')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['node', '-score'], name='node_resource_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('node', 'resource'), name='node_resource_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='NodeTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_postings', to='roadmap.roadmapnode')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='node_postings', to='roadmap.indexterm')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'node'), name='node_term_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResourceTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_postings', to='learning.resource')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_postings', to='roadmap.indexterm')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'resource'), name='resource_term_unique')],
+            },
+        ),
+    ]
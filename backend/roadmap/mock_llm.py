@@ -0,0 +1,142 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOPIC_LINE = re.compile(r"^TOPIC:\s*(.+)$", re.MULTILINE)
+PURPOSE_LINE = re.compile(r"^PURPOSE:.*\(([^)]*)\)\s*$", re.MULTILINE)
+
+
+class MockLLMConfig:
+    """Behaviour knobs for the mock server, shared by all handler threads"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, truncate_rate=0.0, chunk_chars=48, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.chunk_chars = chunk_chars
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests_served = 0
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def delay(self):
+        with self.lock:
+            return self.latency + self.random.uniform(0, self.jitter)
+
+
+def mock_roadmap_content(prompt):
+    """Deterministic roadmap JSON for the TOPIC/PURPOSE lines of a roadmap prompt"""
+    from .views import get_fallback_roadmap
+
+    topic_match = TOPIC_LINE.search(prompt)
+    purpose_match = PURPOSE_LINE.search(prompt)
+    topics = [topic_match.group(1).strip()] if topic_match else ["General Topic"]
+    purpose = purpose_match.group(1).strip() if purpose_match else "General"
+    return json.dumps(get_fallback_roadmap(topics, purpose), indent=2)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible /v1/chat/completions endpoint, streaming and non-streaming"""
+    protocol_version = 'HTTP/1.1'
+    config = MockLLMConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status_code, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+            return
+
+        config = self.config
+        with config.lock:
+            config.requests_served += 1
+        time.sleep(config.delay())
+
+        if config.roll(config.error_rate):
+            self.send_json(503, {'error': {'message': 'mock upstream unavailable'}})
+            return
+
+        prompt = "\n".join(m.get('content', '') for m in request.get('messages', []))
+        content = mock_roadmap_content(prompt)
+        finish_reason = 'stop'
+        if config.roll(config.truncate_rate):
+            content = content[:len(content) * 2 // 3]
+            finish_reason = 'length'
+
+        usage = {
+            'prompt_tokens': len(prompt) // 4,
+            'completion_tokens': len(content) // 4,
+            'total_tokens': (len(prompt) + len(content)) // 4,
+        }
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        model = request.get('model', 'mock-roadmap')
+
+        if request.get('stream'):
+            self.stream(completion_id, model, content, finish_reason)
+            return
+
+        self.send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': finish_reason,
+            }],
+            'usage': usage,
+        })
+
+    def stream(self, completion_id, model, content, finish_reason):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def send_event(data):
+            payload = f"data: {data}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(payload):x}\r\n".encode('ascii') + payload + b"\r\n")
+
+        step = self.config.chunk_chars
+        for start in range(0, len(content), step):
+            send_event(json.dumps({
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': content[start:start + step]}, 'finish_reason': None}],
+            }))
+        send_event(json.dumps({
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'model': model,
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish_reason}],
+        }))
+        send_event('[DONE]')
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def make_mock_llm_server(host='127.0.0.1', port=8765, config=None):
+    """Build (not start) a mock server; port 0 picks a free port"""
+    handler = type('ConfiguredMockLLMHandler', (MockLLMHandler,), {'config': config or MockLLMConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q
 from django.conf import settings
+from django.utils import timezone
+from .codec import CompactRoadmapField, RoadmapDataQuerySet
 
 class Topic(models.Model):
     name = models.CharField(max_length=200)
@@ -42,6 +45,11 @@ class StudyPlan(models.Model):
     )
     created_at = models.DateField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='studyplan_user_keyset_idx'),
+        ]
+
     def __str__(self):
         return f"{self.main_topic} ({self.get_purpose_of_study_display()})"
 
@@ -57,8 +65,35 @@ class RoadmapTopic(models.Model):
         return f"{self.title} ({'Completed' if self.is_completed else 'In Progress'})"
 
 
+class RoadmapTemplate(models.Model):
+    """Immutable roadmap content shared by every UserRoadmap that received the same roadmap.
+
+    Identified by the SHA-256 of its canonical JSON, so identical AI or
+    fallback roadmaps are stored once however many users get them.
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    roadmap_data = CompactRoadmapField()
+    node_count = models.PositiveIntegerField(default=0)
+    total_hours = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = RoadmapDataQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Roadmap templates are immutable; per-user changes belong in UserRoadmap.overlay")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Template {self.content_hash[:12]} ({self.node_count} nodes)"
+
+
 class UserRoadmap(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    study_plan = models.ForeignKey(
+        StudyPlan, on_delete=models.SET_NULL, null=True, blank=True, related_name='user_roadmaps',
+        help_text="Study plan this roadmap was generated for"
+    )
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     subject = models.CharField(max_length=200, default='General')
@@ -69,13 +104,263 @@ class UserRoadmap(models.Model):
     ], default='Beginner')
     weekly_hours = models.IntegerField(default=10)
     deadline = models.DateField(null=True, blank=True)
-    roadmap_data = models.JSONField()  # Store the generated roadmap JSON
+    roadmap_data = CompactRoadmapField(null=True, blank=True)  # Own roadmap JSON; None when template-backed
+    template = models.ForeignKey(
+        RoadmapTemplate, on_delete=models.PROTECT, null=True, blank=True, related_name='user_roadmaps',
+        help_text="Shared roadmap content; roadmap_data is unused while set"
+    )
+    # Per-user state over the template: {"completed": {node_id: iso time}, "nodes": {node_id: {field: value}}}
+    overlay = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_completed = models.BooleanField(default=False)
+    # Maintained from the node table: totals on sync, completed_* incrementally on progress updates
+    node_count = models.PositiveIntegerField(default=0)
+    total_hours = models.FloatField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    completed_hours = models.FloatField(default=0)
+
+    objects = RoadmapDataQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='userroadmap_user_keyset_idx'),
+        ]
+
+    @property
+    def completion_percentage(self):
+        """Share of estimated hours completed; node count when no node has hours"""
+        if self.total_hours > 0:
+            return round(min(100.0, 100.0 * self.completed_hours / self.total_hours), 2)
+        if self.node_count:
+            return round(100.0 * self.completed_count / self.node_count, 2)
+        return 0.0
 
     def __str__(self):
         return f"{self.title} - {self.user.username if self.user else 'Anonymous'}"
+
+
+class RoadmapCacheEntry(models.Model):
+    """AI-generated roadmap shared by every request with the same fingerprint"""
+    fingerprint = models.CharField(max_length=64, unique=True)
+    topics = models.JSONField(default=list)
+    purpose = models.CharField(max_length=50)
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    roadmap_data = models.JSONField()  # Unscaled roadmap, hours are scaled per request
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{', '.join(self.topics)} ({self.purpose}) - {self.hit_count} hits"
+
+
+class MetricCounter(models.Model):
+    """Named counter shared by every worker process"""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def increment(cls, name, amount=1):
+        """Atomically add amount to the named counter, creating it on first use"""
+        updated = cls.objects.filter(name=name).update(value=F('value') + amount, updated_at=timezone.now())
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, value=amount)
+        except IntegrityError:
+            # Another worker created the row between our update and insert
+            cls.objects.filter(name=name).update(value=F('value') + amount, updated_at=timezone.now())
+
+    @classmethod
+    def values(cls, prefix):
+        """Return {name: value} for every counter whose name starts with prefix"""
+        return dict(cls.objects.filter(name__startswith=prefix).values_list('name', 'value'))
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class RoadmapJob(models.Model):
+    """Queued study plan roadmap generation, processed by the roadmap_worker command"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='roadmap_jobs')
+    study_plan = models.ForeignKey(StudyPlan, on_delete=models.CASCADE, related_name='generation_jobs')
+    user_roadmap = models.ForeignKey(UserRoadmap, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=0, help_text="Higher priority jobs are claimed first")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Not claimed before this time (retry backoff)")
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True, help_text="Last heartbeat of the worker running this job")
+    source = models.CharField(max_length=20, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'available_at'], name='roadmap_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} - {self.study_plan.main_topic} ({self.status})"
+
+
+class RoadmapGenerationLock(models.Model):
+    """Cross-process lock held by the worker currently generating a fingerprint"""
+    fingerprint = models.CharField(max_length=64, unique=True)
+    owner = models.CharField(max_length=150)
+    acquired_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(help_text="Lock is considered abandoned after this time")
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]} held by {self.owner}"
+
+
+class CircuitBreakerState(models.Model):
+    """Circuit breaker for an upstream API, shared by every worker process"""
+    STATE_CHOICES = [
+        ('closed', 'Closed'),
+        ('open', 'Open'),
+        ('half_open', 'Half Open'),
+    ]
+
+    name = models.CharField(max_length=100, unique=True)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='closed')
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    trip_count = models.PositiveIntegerField(default=0, help_text="Times the circuit has opened")
+    opened_at = models.DateTimeField(null=True, blank=True)
+    probe_started_at = models.DateTimeField(null=True, blank=True)
+    last_failure_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.state})"
+
+
+class PregeneratedRoadmap(models.Model):
+    """Roadmap produced ahead of time by the pregenerate_roadmaps command; never expires"""
+    fingerprint = models.CharField(max_length=64, unique=True)
+    topic = models.CharField(max_length=200)
+    purpose = models.CharField(max_length=50)
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    roadmap_data = models.JSONField()  # Unscaled roadmap, hours are scaled per request
+    latency_ms = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=1)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.topic} ({self.purpose}) - {self.model_name}"
+
+
+class RoadmapNode(models.Model):
+    """One topic or subtopic of a UserRoadmap or of a shared RoadmapTemplate.
+
+    path holds the zero-padded position at every level ("0001.0003."), so
+    ordering by path gives document order and a subtree is a path prefix.
+    Template nodes are never completed or edited; that state lives in the
+    overlay of each UserRoadmap using the template.
+    """
+    user_roadmap = models.ForeignKey(UserRoadmap, on_delete=models.CASCADE, null=True, blank=True, related_name='nodes')
+    template = models.ForeignKey(RoadmapTemplate, on_delete=models.CASCADE, null=True, blank=True, related_name='nodes')
+    node_id = models.CharField(max_length=50, help_text="Roadmap item id such as \"1.2\"")
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    depth = models.PositiveSmallIntegerField(default=0)
+    position = models.PositiveIntegerField(default=0)
+    path = models.CharField(max_length=255)
+    title = models.CharField(max_length=255)
+    estimated_hours = models.FloatField(default=0)
+    attributes = models.JSONField(default=dict, blank=True)  # Remaining item fields (prerequisites, resources, ...)
+    is_completed = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['path']
+        constraints = [
+            models.UniqueConstraint(fields=['user_roadmap', 'node_id'], name='roadmap_node_unique_id'),
+            models.UniqueConstraint(fields=['template', 'node_id'], name='template_node_unique_id'),
+            models.CheckConstraint(
+                condition=Q(user_roadmap__isnull=False, template__isnull=True) | Q(user_roadmap__isnull=True, template__isnull=False),
+                name='roadmap_node_one_owner',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user_roadmap', 'path'], name='roadmap_node_path_idx'),
+            models.Index(fields=['template', 'path'], name='template_node_path_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.node_id} {self.title}"
+
+
+class IndexTerm(models.Model):
+    """A title token of the roadmap node / learning resource inverted index.
+
+    resource_count is the number of resources whose title has the token,
+    kept incrementally; rare tokens weigh more when ranking resources.
+    """
+    text = models.CharField(max_length=64, unique=True)
+    resource_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.text} ({self.resource_count} resources)"
+
+
+class ResourceTerm(models.Model):
+    """Posting: the title of resource contains term"""
+    term = models.ForeignKey(IndexTerm, on_delete=models.CASCADE, related_name='resource_postings')
+    resource = models.ForeignKey('learning.Resource', on_delete=models.CASCADE, related_name='index_postings')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'resource'], name='resource_term_unique'),
+        ]
+
+
+class NodeTerm(models.Model):
+    """Posting: the title of node contains term; finds the nodes a resource change can affect"""
+    term = models.ForeignKey(IndexTerm, on_delete=models.CASCADE, related_name='node_postings')
+    node = models.ForeignKey(RoadmapNode, on_delete=models.CASCADE, related_name='index_postings')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'node'], name='node_term_unique'),
+        ]
+
+
+class NodeResource(models.Model):
+    """Precomputed best resources of a roadmap node, from the tokens their titles share"""
+    node = models.ForeignKey(RoadmapNode, on_delete=models.CASCADE, related_name='resource_links')
+    resource = models.ForeignKey('learning.Resource', on_delete=models.CASCADE, related_name='roadmap_node_links')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['node', 'resource'], name='node_resource_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['node', '-score'], name='node_resource_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.node_id} -> {self.resource_id} ({self.score:.2f})"
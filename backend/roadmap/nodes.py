@@ -0,0 +1,446 @@
+import copy
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .etags import bump_data_version
+from .models import RoadmapNode, UserRoadmap
+from .resource_index import index_nodes_on_commit
+
+ITEM_FIELDS = ('id', 'topic', 'estimated_time_hours', 'subtopics')
+# Item fields a user may change on a node; stored in the overlay of template-backed roadmaps
+EDITABLE_NODE_FIELDS = ('topic', 'notes')
+NODE_NOTES_MAX_LENGTH = 5000
+PATH_SEPARATOR = '.'
+
+
+def path_segment(position):
+    return f"{position:04d}{PATH_SEPARATOR}"
+
+
+def subtree_bounds(path):
+    """(lower, upper) path bounds of the subtree rooted at path.
+
+    A range scan instead of LIKE 'prefix%' so the (user_roadmap, path) index
+    is used on every backend; '/' sorts right after the '.' separator.
+    """
+    return path, path[:-1] + '/'
+
+
+def hours_value(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_node_levels(roadmap_items, node_model=RoadmapNode, user_roadmap_id=None):
+    """Unsaved nodes for a nested roadmap, grouped by depth so parents can be inserted first.
+
+    Returns [[(node, parent_node), ...] per depth]. Missing or repeated item
+    ids are replaced by the positional id ("2.3") so node_id stays unique.
+    """
+    levels = []
+    seen_ids = set()
+
+    def walk(items, parent, parent_path, parent_position_id, depth):
+        for position, item in enumerate(items or [], start=1):
+            if not isinstance(item, dict):
+                continue
+            positional_id = f"{parent_position_id}.{position}" if parent_position_id else str(position)
+            node_id = str(item.get('id') or positional_id)
+            if node_id in seen_ids:
+                node_id = positional_id
+            while node_id in seen_ids:
+                node_id += "'"
+            seen_ids.add(node_id)
+
+            node = node_model(
+                user_roadmap_id=user_roadmap_id,
+                node_id=node_id[:50],
+                depth=depth,
+                position=position,
+                path=parent_path + path_segment(position),
+                title=str(item.get('topic') or 'Untitled')[:255],
+                estimated_hours=hours_value(item.get('estimated_time_hours')),
+                attributes={key: value for key, value in item.items() if key not in ITEM_FIELDS},
+            )
+            if len(levels) <= depth:
+                levels.append([])
+            levels[depth].append((node, parent))
+            walk(item.get('subtopics'), node, node.path, positional_id, depth + 1)
+
+    walk(roadmap_items, None, '', '', 0)
+    return levels
+
+
+def insert_node_levels(levels, node_model=RoadmapNode):
+    """Insert nodes one depth at a time; one batched INSERT per level"""
+    for level in levels:
+        for node, parent in level:
+            node.parent_id = parent.pk if parent is not None else None
+        node_model.objects.bulk_create([node for node, _parent in level], batch_size=500)
+        if level and level[0][0].pk is None:
+            # Backend cannot return ids from bulk inserts; children need their parents' ids
+            owner = 'template_id' if getattr(level[0][0], 'template_id', None) is not None else 'user_roadmap_id'
+            pks = {
+                (owner_id, node_id): pk for owner_id, node_id, pk in node_model.objects.filter(**{
+                    f'{owner}__in': {getattr(node, owner) for node, _parent in level},
+                    'depth': level[0][0].depth,
+                }).values_list(owner, 'node_id', 'pk')
+            }
+            for node, _parent in level:
+                node.pk = pks[(getattr(node, owner), node.node_id)]
+
+
+def merge_node_levels(*roadmap_levels):
+    """Combine the levels of several roadmaps so they insert in one statement per depth"""
+    merged = []
+    for levels in roadmap_levels:
+        for depth, level in enumerate(levels):
+            if len(merged) <= depth:
+                merged.append([])
+            merged[depth].extend(level)
+    return merged
+
+
+def level_nodes(levels):
+    return [node for level in levels for node, _parent in level]
+
+
+def level_totals(levels):
+    """(node_count, total_hours) of one roadmap's levels, for the stored UserRoadmap totals"""
+    nodes = level_nodes(levels)
+    return len(nodes), sum(node.estimated_hours for node in nodes)
+
+
+def assign_user_roadmap(levels, user_roadmap_id):
+    for level in levels:
+        for node, _parent in level:
+            node.user_roadmap_id = user_roadmap_id
+    return levels
+
+
+def assign_template(levels, template_id):
+    for level in levels:
+        for node, _parent in level:
+            node.template_id = template_id
+    return levels
+
+
+def node_scope(user_roadmap):
+    """Node rows of a roadmap: the shared template's nodes, or its own"""
+    if user_roadmap.template_id is not None:
+        return RoadmapNode.objects.filter(template_id=user_roadmap.template_id)
+    return RoadmapNode.objects.filter(user_roadmap=user_roadmap)
+
+
+def merge_overlay(data, overlay):
+    """Template roadmap data with the user's node edits applied; the template itself is not modified"""
+    edits = (overlay or {}).get('nodes') or {}
+    if not edits or not isinstance(data, dict):
+        return data
+    data = copy.deepcopy(data)
+
+    def walk(items):
+        for item in items or []:
+            if isinstance(item, dict):
+                item.update(edits.get(str(item.get('id')), {}))
+                walk(item.get('subtopics'))
+
+    walk(data.get('roadmap'))
+    return data
+
+
+def roadmap_data_of(user_roadmap):
+    """Roadmap JSON as the user sees it, merging template and overlay on read"""
+    if user_roadmap.template_id is not None:
+        return merge_overlay(user_roadmap.template.roadmap_data, user_roadmap.overlay)
+    return user_roadmap.roadmap_data
+
+
+def overlay_nodes(user_roadmap, nodes):
+    """Nodes with this user's completion and edits applied in memory (template-backed roadmaps)"""
+    if user_roadmap.template_id is None:
+        return nodes
+    completed = user_roadmap.overlay.get('completed') or {}
+    edits = user_roadmap.overlay.get('nodes') or {}
+    nodes = list(nodes)
+    for node in nodes:
+        stamp = completed.get(node.node_id)
+        node.is_completed = stamp is not None
+        node.completed_at = parse_datetime(stamp) if stamp else None
+        node_edits = edits.get(node.node_id)
+        if node_edits:
+            node.title = node_edits.get('topic', node.title)
+            node.attributes = {**node.attributes, **{key: value for key, value in node_edits.items() if key != 'topic'}}
+    return nodes
+
+
+def completed_node_ids(user_roadmap):
+    """Completed node ids in document order"""
+    nodes = node_scope(user_roadmap)
+    if user_roadmap.template_id is not None:
+        nodes = nodes.filter(node_id__in=list(user_roadmap.overlay.get('completed') or {}))
+    else:
+        nodes = nodes.filter(is_completed=True)
+    return list(nodes.order_by('path').values_list('node_id', flat=True))
+
+
+def clean_node_changes(changes):
+    """EDITABLE_NODE_FIELDS of changes as stored on either path; raises ValueError for non-text values"""
+    cleaned = {}
+    for key, value in changes.items():
+        if key not in EDITABLE_NODE_FIELDS:
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f"'{key}' must be a string")
+        if key == 'topic':
+            value = value.strip()[:255]
+            if not value:
+                raise ValueError("'topic' must not be empty")
+        else:
+            value = value[:NODE_NOTES_MAX_LENGTH]
+        cleaned[key] = value
+    return cleaned
+
+
+def edit_roadmap_node(user_roadmap, node, changes):
+    """Apply EDITABLE_NODE_FIELDS changes: into the overlay when template-backed, else onto the node row.
+
+    Values are validated and truncated the same way on both paths; raises
+    ValueError for values that are not text.
+    """
+    changes = clean_node_changes(changes)
+    if not changes:
+        return
+    if user_roadmap.template_id is not None:
+        # Copy-on-write: the shared template never changes, the user's overlay grows by this node only
+        with transaction.atomic():
+            locked = UserRoadmap.objects.select_for_update().only('id', 'overlay').get(pk=user_roadmap.pk)
+            overlay = dict(locked.overlay or {})
+            overlay['nodes'] = {**(overlay.get('nodes') or {})}
+            overlay['nodes'][node.node_id] = {**overlay['nodes'].get(node.node_id, {}), **changes}
+            user_roadmap.overlay = overlay
+            user_roadmap.save(update_fields=['overlay', 'updated_at'])
+        return
+
+    if 'topic' in changes:
+        node.title = changes.pop('topic')
+        index_nodes_on_commit([node])
+    node.attributes = {**node.attributes, **changes}
+    node.save(update_fields=['title', 'attributes'])
+    refresh_roadmap_data(user_roadmap)
+
+
+def sync_roadmap_nodes(user_roadmap):
+    """Rebuild the node rows of user_roadmap from its roadmap_data, keeping completion by node id"""
+    if user_roadmap.template_id is not None:
+        # Template nodes are built once with the template; only the user's totals can be stale
+        recompute_roadmap_progress(user_roadmap)
+        return
+    data = user_roadmap.roadmap_data if isinstance(user_roadmap.roadmap_data, dict) else {}
+    levels = build_node_levels(data.get('roadmap') or [], user_roadmap_id=user_roadmap.pk)
+    with transaction.atomic():
+        existing = RoadmapNode.objects.filter(user_roadmap=user_roadmap)
+        completed = dict(existing.filter(is_completed=True).values_list('node_id', 'completed_at'))
+        existing.delete()
+        for level in levels:
+            for node, _parent in level:
+                if node.node_id in completed:
+                    node.is_completed, node.completed_at = True, completed[node.node_id]
+        insert_node_levels(levels)
+        index_nodes_on_commit(level_nodes(levels))
+        recompute_roadmap_progress(user_roadmap)
+
+
+def ensure_roadmap_nodes(user_roadmap):
+    """Create node rows for roadmaps saved before the node table existed"""
+    if not node_scope(user_roadmap).exists():
+        sync_roadmap_nodes(user_roadmap)
+
+
+def node_to_item(node):
+    """Roadmap item dict for a node, without its subtopics"""
+    return {
+        'id': node.node_id,
+        'topic': node.title,
+        'estimated_time_hours': node.estimated_hours,
+        **node.attributes,
+    }
+
+
+def render_roadmap_items(nodes):
+    """Nest nodes (any order) back into the roadmap_data item structure"""
+    nodes = sorted(nodes, key=lambda node: node.path)
+    items_by_pk = {}
+    roots = []
+    for node in nodes:
+        item = node_to_item(node)
+        items_by_pk[node.pk] = item
+        parent_item = items_by_pk.get(node.parent_id)
+        if parent_item is None:
+            roots.append(item)
+        else:
+            parent_item.setdefault('subtopics', []).append(item)
+    return roots
+
+
+def refresh_roadmap_data(user_roadmap):
+    """Write node changes back to roadmap_data so clients reading the JSON see them"""
+    if user_roadmap.template_id is not None:
+        # Shared nodes never change; edits are merged from the overlay on read
+        return roadmap_data_of(user_roadmap)
+    data = dict(user_roadmap.roadmap_data) if isinstance(user_roadmap.roadmap_data, dict) else {}
+    data['roadmap'] = render_roadmap_items(RoadmapNode.objects.filter(user_roadmap=user_roadmap))
+    user_roadmap.roadmap_data = data
+    user_roadmap.save(update_fields=['roadmap_data', 'updated_at'])
+    return data
+
+
+def subtree_nodes(user_roadmap, node=None, max_depth=None):
+    """Nodes of the subtree rooted at node (whole roadmap when node is None), in document order"""
+    nodes = node_scope(user_roadmap)
+    if node is not None:
+        lower, upper = subtree_bounds(node.path)
+        nodes = nodes.filter(path__gte=lower, path__lt=upper)
+    if max_depth is not None:
+        nodes = nodes.filter(depth__lte=max_depth)
+    return nodes.order_by('path')
+
+
+def subtree_hours(user_roadmap, node=None):
+    """Total estimated hours of a subtree, summed in the database"""
+    return subtree_nodes(user_roadmap, node).aggregate(total=Sum('estimated_hours'))['total'] or 0
+
+
+def progress_payload(user_roadmap):
+    return {
+        'roadmap_id': user_roadmap.pk,
+        'node_count': user_roadmap.node_count,
+        'completed_count': user_roadmap.completed_count,
+        'total_hours': round(user_roadmap.total_hours, 2),
+        'completed_hours': round(user_roadmap.completed_hours, 2),
+        'completion_percentage': user_roadmap.completion_percentage,
+        'is_completed': user_roadmap.is_completed,
+    }
+
+
+def recompute_roadmap_progress(user_roadmap):
+    """Recount every stored total from the node rows (sync and reconciliation only)"""
+    if user_roadmap.template_id is not None:
+        template = user_roadmap.template
+        completed = node_scope(user_roadmap).filter(
+            node_id__in=list(user_roadmap.overlay.get('completed') or {}),
+        ).aggregate(count=Count('id'), hours=Sum('estimated_hours'))
+        totals = {
+            'node_count': template.node_count,
+            'total_hours': template.total_hours,
+            'completed_count': completed['count'],
+            'completed_hours': completed['hours'],
+        }
+    else:
+        totals = RoadmapNode.objects.filter(user_roadmap=user_roadmap).aggregate(
+            node_count=Count('id'),
+            total_hours=Sum('estimated_hours'),
+            completed_count=Count('id', filter=Q(is_completed=True)),
+            completed_hours=Sum('estimated_hours', filter=Q(is_completed=True)),
+        )
+    for field, value in totals.items():
+        setattr(user_roadmap, field, value or 0)
+    user_roadmap.is_completed = bool(user_roadmap.node_count) and user_roadmap.completed_count == user_roadmap.node_count
+    UserRoadmap.objects.filter(pk=user_roadmap.pk).update(is_completed=user_roadmap.is_completed, **{
+        field: getattr(user_roadmap, field) for field in totals
+    })
+    bump_data_version(user_roadmap.user_id)
+    return user_roadmap
+
+
+def apply_progress_delta(user_roadmap, count_delta, hours_delta, **fields):
+    """Move the stored completion totals by a delta (with any other column updates) and refresh them"""
+    UserRoadmap.objects.filter(pk=user_roadmap.pk).update(
+        completed_count=F('completed_count') + count_delta,
+        completed_hours=F('completed_hours') + hours_delta,
+        **fields,
+    )
+    user_roadmap.refresh_from_db(fields=['node_count', 'total_hours', 'completed_count', 'completed_hours', 'is_completed'])
+    is_completed = bool(user_roadmap.node_count) and user_roadmap.completed_count >= user_roadmap.node_count
+    if is_completed != user_roadmap.is_completed:
+        user_roadmap.is_completed = is_completed
+        UserRoadmap.objects.filter(pk=user_roadmap.pk).update(is_completed=is_completed)
+    bump_data_version(user_roadmap.user_id)
+
+
+def set_nodes_completed(user_roadmap, changes):
+    """Apply {node_id: completed} to the node rows and adjust the stored totals by the delta.
+
+    Only nodes whose state actually changes are written, and the roadmap
+    totals move by their hours; nothing walks the tree. Returns the node ids
+    that do not exist in the roadmap.
+    """
+    changes = {str(node_id): bool(completed) for node_id, completed in changes.items()}
+    if user_roadmap.template_id is not None:
+        return set_overlay_completed(user_roadmap, changes)
+    nodes = RoadmapNode.objects.filter(user_roadmap=user_roadmap)
+    known = set(nodes.filter(node_id__in=changes).values_list('node_id', flat=True))
+    unknown = sorted(set(changes) - known)
+
+    now = timezone.now()
+    with transaction.atomic():
+        count_delta, hours_delta, raced = 0, 0.0, False
+        for completed in (True, False):
+            node_ids = [node_id for node_id, value in changes.items() if value is completed and node_id in known]
+            if not node_ids:
+                continue
+            flipping = list(nodes.select_for_update().filter(
+                node_id__in=node_ids, is_completed=not completed,
+            ).values_list('pk', 'estimated_hours'))
+            if not flipping:
+                continue
+            updated = nodes.filter(pk__in=[pk for pk, _hours in flipping], is_completed=not completed).update(
+                is_completed=completed, completed_at=now if completed else None,
+            )
+            # A concurrent update flipped some of these rows first; fall back to a recount
+            raced = raced or updated != len(flipping)
+            sign = 1 if completed else -1
+            count_delta += sign * len(flipping)
+            hours_delta += sign * sum(hours for _pk, hours in flipping)
+
+        if raced:
+            recompute_roadmap_progress(user_roadmap)
+        elif count_delta or hours_delta:
+            apply_progress_delta(user_roadmap, count_delta, hours_delta)
+    return unknown
+
+
+def set_overlay_completed(user_roadmap, changes):
+    """set_nodes_completed for template-backed roadmaps: completion lives in the user's overlay"""
+    hours_by_id = dict(node_scope(user_roadmap).filter(node_id__in=changes).values_list('node_id', 'estimated_hours'))
+    unknown = sorted(set(changes) - set(hours_by_id))
+
+    now = timezone.now()
+    with transaction.atomic():
+        # The row lock serializes overlay writers, so the delta is exact
+        locked = UserRoadmap.objects.select_for_update().only('id', 'overlay').get(pk=user_roadmap.pk)
+        overlay = dict(locked.overlay or {})
+        completed = dict(overlay.get('completed') or {})
+        count_delta, hours_delta, flipped = 0, 0.0, False
+        for node_id, value in changes.items():
+            if node_id not in hours_by_id or (node_id in completed) == value:
+                continue
+            flipped = True
+            if value:
+                completed[node_id] = now.isoformat()
+            else:
+                del completed[node_id]
+            sign = 1 if value else -1
+            count_delta += sign
+            hours_delta += sign * hours_by_id[node_id]
+
+        if flipped:
+            overlay['completed'] = completed
+            user_roadmap.overlay = overlay
+            apply_progress_delta(user_roadmap, count_delta, hours_delta, overlay=overlay, updated_at=now)
+    return unknown
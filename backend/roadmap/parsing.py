@@ -0,0 +1,208 @@
+import json
+import re
+
+FENCE_OPEN = re.compile(r"^```[a-zA-Z]*\n?")
+FENCE_CLOSE = re.compile(r"\n?```$")
+CLOSERS = {'{': '}', '[': ']'}
+
+
+def strip_trailing_commas(text):
+    """Remove commas directly before a closing bracket, ignoring string contents"""
+    out = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '}]':
+            # Drop the comma (and any whitespace after it) left before this closer
+            end = len(out)
+            while end and out[end - 1].isspace():
+                end -= 1
+            if end and out[end - 1] == ',':
+                del out[end - 1]
+        out.append(char)
+    return ''.join(out)
+
+
+def repair_truncated_json(text):
+    """Cut text at the last point where every value is complete and close what is still open.
+
+    Safe cut points are just after an opening or closing bracket and just
+    before a comma, so an unfinished string, key or number is dropped along
+    with the incomplete trailing node.
+    """
+    stack = []
+    in_string = escape = False
+    safe_end, safe_stack = 0, []
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append(char)
+            safe_end, safe_stack = i + 1, list(stack)
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            safe_end, safe_stack = i + 1, list(stack)
+            if not stack:
+                return strip_trailing_commas(text[:i + 1])
+        elif char == ',':
+            safe_end, safe_stack = i, list(stack)
+
+    closing = ''.join(CLOSERS[opener] for opener in reversed(safe_stack))
+    return strip_trailing_commas(text[:safe_end] + closing)
+
+
+def extract_json_body(text):
+    """Strip markdown fences and any chatter before the first brace"""
+    text = FENCE_CLOSE.sub("", FENCE_OPEN.sub("", text.strip()))
+    first_brace = text.find("{")
+    return text[first_brace:] if first_brace != -1 else text
+
+
+def parse_roadmap_document(text):
+    """Parse model output into a roadmap document, salvaging truncated answers.
+
+    Returns (document, report). Complete output is parsed as-is (trailing
+    commas allowed). Truncated output keeps every main topic whose object was
+    closed and drops the unfinished one. Raises json.JSONDecodeError only
+    when not a single topic can be recovered.
+    """
+    body = extract_json_body(text)
+    report = {
+        'input_chars': len(text),
+        'truncated': False,
+        'topics_salvaged': 0,
+        'partial_topic_dropped': False,
+    }
+
+    last_brace = body.rfind("}")
+    try:
+        document = json.loads(strip_trailing_commas(body[:last_brace + 1] if last_brace != -1 else body))
+        if isinstance(document, dict) and isinstance(document.get("roadmap"), list):
+            report['topics_salvaged'] = len(document["roadmap"])
+        return document, report
+    except json.JSONDecodeError as error:
+        parse_error = error
+
+    parser = RoadmapStreamParser()
+    parser.feed(body)
+    if not parser.items:
+        raise parse_error
+
+    try:
+        repaired = json.loads(repair_truncated_json(body))
+    except json.JSONDecodeError:
+        repaired = {}
+    if not isinstance(repaired, dict):
+        repaired = {}
+
+    document = {key: value for key, value in repaired.items() if key != "roadmap"}
+    document["roadmap"] = parser.items
+    report.update({
+        'truncated': True,
+        'topics_salvaged': len(parser.items),
+        'partial_topic_dropped': parser.item_start is not None,
+        'salvaged_chars': parser.last_item_end,
+    })
+    return document, report
+
+
+class RoadmapStreamParser:
+    """Incremental scanner that yields each main topic as soon as its JSON object closes.
+
+    Feed it model output in arbitrary chunks. It tracks string/escape state and
+    nesting depth across chunks, watches for the top-level "roadmap" array and
+    decodes every element of that array the moment its closing brace arrives.
+    Text outside the top-level object (markdown fences, chatter) is ignored.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_key = None
+        self.in_roadmap = False
+        self.item_start = None
+        self.roadmap_closed = False
+        self.items = []
+        self.last_item_end = 0
+
+    def feed(self, chunk):
+        """Consume a chunk of output and return the topics completed by it"""
+        self.text += chunk
+        completed = []
+        text = self.text
+
+        while self.pos < len(text):
+            char = text[self.pos]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.string_start is not None:
+                        self.last_key = text[self.string_start + 1:self.pos]
+                self.pos += 1
+                continue
+
+            if char == '"' and self.depth > 0:
+                self.in_string = True
+                self.string_start = self.pos
+            elif char == '{':
+                if self.in_roadmap and self.depth == 2:
+                    self.item_start = self.pos
+                self.depth += 1
+            elif char == '[':
+                if self.depth == 1 and self.last_key == 'roadmap' and not self.roadmap_closed:
+                    self.in_roadmap = True
+                self.depth += 1
+            elif char in '}]' and self.depth > 0:
+                self.depth -= 1
+                if char == '}' and self.in_roadmap and self.depth == 2 and self.item_start is not None:
+                    item = self._decode(text[self.item_start:self.pos + 1])
+                    self.item_start = None
+                    if item is not None:
+                        self.items.append(item)
+                        self.last_item_end = self.pos + 1
+                        completed.append(item)
+                elif char == ']' and self.in_roadmap and self.depth == 1:
+                    self.in_roadmap = False
+                    self.roadmap_closed = True
+            self.pos += 1
+
+        return completed
+
+    def _decode(self, fragment):
+        try:
+            item = json.loads(strip_trailing_commas(fragment))
+        except json.JSONDecodeError:
+            return None
+        return item if isinstance(item, dict) else None
+
+    @property
+    def finished(self):
+        """Whether the roadmap array has been closed by the model"""
+        return self.roadmap_closed
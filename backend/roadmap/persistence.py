@@ -0,0 +1,179 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .etags import bump_data_versions
+from .models import RoadmapTemplate, RoadmapTopic, UserRoadmap
+from .nodes import assign_template, build_node_levels, insert_node_levels, level_totals, level_nodes, merge_node_levels
+from .resource_index import index_nodes_on_commit
+
+# Rows per INSERT; Django further caps this to the backend's variable limit
+ROADMAP_TOPIC_BATCH_SIZE = getattr(settings, 'ROADMAP_TOPIC_BATCH_SIZE', 500)
+
+
+def flatten_roadmap_items(items):
+    """Depth-first (item, parent_item) pairs for every main topic and subtopic"""
+    flat = []
+
+    def walk(nodes, parent):
+        for item in nodes:
+            if not isinstance(item, dict):
+                continue
+            flat.append((item, parent))
+            walk(item.get('subtopics') or [], item)
+
+    walk(items, None)
+    return flat
+
+
+def bulk_create_roadmap_topics(plan, roadmap_items):
+    """Insert a RoadmapTopic per roadmap node and link prerequisites, in batched INSERTs.
+
+    Prerequisite ids refer to other nodes' "id" fields; unknown ids and
+    self references are ignored. Returns the created topics in roadmap order.
+    """
+    flat = flatten_roadmap_items(roadmap_items)
+    topics = RoadmapTopic.objects.bulk_create([
+        RoadmapTopic(
+            study_plan=plan,
+            title=item.get("topic", "Unknown Topic"),
+            description=f"Estimated time: {item.get('estimated_time_hours', 0)} hours (ID: {item.get('id', '')})"
+        )
+        for item, _parent in flat
+    ], batch_size=ROADMAP_TOPIC_BATCH_SIZE)
+
+    if topics and topics[0].pk is None:
+        # Backends that cannot return ids from a bulk insert; rows are ours, we hold the transaction
+        ids = list(RoadmapTopic.objects.filter(study_plan=plan).order_by('-id').values_list('id', flat=True)[:len(topics)])
+        for topic, pk in zip(topics, reversed(ids)):
+            topic.pk = pk
+
+    pk_by_item_id = {}
+    for (item, _parent), topic in zip(flat, topics):
+        if item.get('id') is not None:
+            pk_by_item_id.setdefault(str(item['id']), topic.pk)
+
+    Through = RoadmapTopic.prerequisites.through
+    links = set()
+    for (item, _parent), topic in zip(flat, topics):
+        for prerequisite_id in item.get('prerequisites') or []:
+            prerequisite_pk = pk_by_item_id.get(str(prerequisite_id))
+            if prerequisite_pk is not None and prerequisite_pk != topic.pk:
+                links.add((topic.pk, prerequisite_pk))
+    Through.objects.bulk_create([
+        Through(from_roadmaptopic_id=from_pk, to_roadmaptopic_id=to_pk) for from_pk, to_pk in sorted(links)
+    ], batch_size=ROADMAP_TOPIC_BATCH_SIZE, ignore_conflicts=True)
+
+    return topics
+
+
+def template_hash(roadmap_data):
+    """Content hash of a roadmap: SHA-256 of its canonical JSON"""
+    canonical = json.dumps(roadmap_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def get_or_create_templates(roadmaps):
+    """Shared templates for several roadmaps (lists of items), aligned with the input.
+
+    Existing templates are found with one query; missing ones are inserted
+    with one INSERT for the templates and one per depth for all their nodes.
+    """
+    hashes = [template_hash({'roadmap': items}) for items in roadmaps]
+    templates = {template.content_hash: template for template in RoadmapTemplate.objects.filter(content_hash__in=set(hashes))}
+
+    missing = {}
+    for content_hash, items in zip(hashes, roadmaps):
+        if content_hash not in templates and content_hash not in missing:
+            missing[content_hash] = (items, build_node_levels(items))
+    if missing:
+        try:
+            with transaction.atomic():
+                created = RoadmapTemplate.objects.bulk_create([
+                    RoadmapTemplate(
+                        content_hash=content_hash, roadmap_data={'roadmap': items},
+                        node_count=level_totals(levels)[0], total_hours=level_totals(levels)[1],
+                    )
+                    for content_hash, (items, levels) in missing.items()
+                ])
+                if created and created[0].pk is None:
+                    pks = dict(RoadmapTemplate.objects.filter(content_hash__in=missing).values_list('content_hash', 'pk'))
+                    for template in created:
+                        template.pk = pks[template.content_hash]
+                levels = merge_node_levels(*[
+                    assign_template(levels, template.pk) for (_items, levels), template in zip(missing.values(), created)
+                ])
+                insert_node_levels(levels)
+                index_nodes_on_commit(level_nodes(levels))
+        except IntegrityError:
+            # Another request stored one of these roadmaps first; fall back to one at a time
+            return [get_or_create_template(items)[0] for items in roadmaps]
+        templates.update((template.content_hash, template) for template in created)
+    return [templates[content_hash] for content_hash in hashes]
+
+
+def get_or_create_template(roadmap_items):
+    """Shared template (and its nodes) for a roadmap, created on first use; returns (template, created)"""
+    roadmap_data = {'roadmap': roadmap_items}
+    content_hash = template_hash(roadmap_data)
+    template = RoadmapTemplate.objects.filter(content_hash=content_hash).first()
+    if template is not None:
+        return template, False
+
+    node_levels = build_node_levels(roadmap_items)
+    node_count, total_hours = level_totals(node_levels)
+    try:
+        with transaction.atomic():
+            template = RoadmapTemplate.objects.create(
+                content_hash=content_hash, roadmap_data=roadmap_data, node_count=node_count, total_hours=total_hours,
+            )
+            insert_node_levels(assign_template(node_levels, template.pk))
+            index_nodes_on_commit(level_nodes(node_levels))
+    except IntegrityError:
+        # Another request stored the same roadmap first
+        return RoadmapTemplate.objects.get(content_hash=content_hash), False
+    return template, True
+
+
+def template_roadmap(template, **fields):
+    """Unsaved UserRoadmap referencing a template, with the template's stored totals"""
+    return UserRoadmap(template=template, roadmap_data=None, node_count=template.node_count,
+                       total_hours=template.total_hours, **fields)
+
+
+def assign_template_to_users(template, users, title=None, subject='General'):
+    """Give every user a roadmap of the template: one batched INSERT, no roadmap JSON or node copies"""
+    users = list(users)
+    with transaction.atomic():
+        created = UserRoadmap.objects.bulk_create([
+            template_roadmap(template, user=user, title=title or f"{subject} - Roadmap", subject=subject)
+            for user in users
+        ], batch_size=ROADMAP_TOPIC_BATCH_SIZE)
+        bump_data_versions([user.pk for user in users])
+    return created
+
+
+def save_plan_roadmap(plan, roadmap_data):
+    """Persist the roadmap (through its shared template) and its flattened topics for a study plan in one transaction"""
+    topic_name = plan.main_topic
+
+    with transaction.atomic():
+        # Identical roadmaps share one template; the user's roadmap only references it
+        template, _created = get_or_create_template(roadmap_data)
+        user_roadmap = template_roadmap(
+            template,
+            user=plan.user,
+            study_plan=plan,
+            title=f"{topic_name} - Study Plan",
+            subject=topic_name,
+        )
+        user_roadmap.save()
+
+        # Save flattened version for progress tracking
+        topics = bulk_create_roadmap_topics(plan, roadmap_data)
+
+    print(f"Saved roadmap: {len(roadmap_data)} main topics, {len(topics)} topic rows")
+    print(f"UserRoadmap ID: {user_roadmap.id}")
+    return user_roadmap
@@ -0,0 +1,158 @@
+import csv
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.db import DatabaseError
+
+from .cache import roadmap_fingerprint
+from .models import PregeneratedRoadmap, StudyPlan
+
+
+def load_matrix(path):
+    """Read the topic x purpose matrix to pregenerate; returns unique (topic, purpose) pairs in file order.
+
+    JSON files hold {"topics": [...], "purposes": [...]} (every combination)
+    and/or {"items": [{"topic": ..., "purpose": ...}]}; CSV files need
+    topic and purpose columns. Raises ValueError for malformed input.
+    """
+    path = Path(path)
+    pairs = []
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            if not reader.fieldnames or not {'topic', 'purpose'} <= set(reader.fieldnames):
+                raise ValueError("CSV matrix needs 'topic' and 'purpose' columns")
+            pairs = [(row['topic'], row['purpose']) for row in reader]
+    else:
+        with open(path, encoding='utf-8') as f:
+            spec = json.load(f)
+        if not isinstance(spec, dict):
+            raise ValueError("JSON matrix must be an object")
+        purposes = spec.get('purposes') or list(dict(StudyPlan.PURPOSE_CHOICES))
+        pairs = [(topic, purpose) for topic in spec.get('topics', []) for purpose in purposes]
+        pairs += [(item.get('topic'), item.get('purpose')) for item in spec.get('items', [])]
+
+    valid_purposes = dict(StudyPlan.PURPOSE_CHOICES)
+    matrix = []
+    for topic, purpose in pairs:
+        topic = " ".join(str(topic or '').split())
+        purpose = str(purpose or '').strip()
+        if not topic:
+            raise ValueError("Matrix entry without a topic")
+        if purpose not in valid_purposes:
+            raise ValueError(f"Unknown purpose '{purpose}' for topic '{topic}'")
+        if (topic, purpose) not in matrix:
+            matrix.append((topic, purpose))
+    return matrix
+
+
+class Checkpoint:
+    """Results of earlier runs, rewritten atomically after every item.
+
+    Progress reporting only: whether an entry is done is decided by its
+    PregeneratedRoadmap row.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.completed = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                self.completed = json.load(f).get('completed', {})
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self.completed
+
+    def mark(self, fingerprint, result):
+        with self.lock:
+            self.completed[fingerprint] = result
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'completed': self.completed}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def pregenerate_roadmap(topic, purpose, provider, prompt_version):
+    """Generate one matrix entry; returns its result record with the roadmap under 'roadmap_data'.
+
+    Partial (salvaged) and fallback roadmaps count as failures so the entry
+    is retried on the next run.
+    """
+    from .views import request_roadmap_from_groq
+
+    fingerprint = roadmap_fingerprint([topic], purpose, provider.model, prompt_version)
+    result = {'topic': topic, 'purpose': purpose, 'fingerprint': fingerprint}
+    stats = {}
+    started = time.monotonic()
+    try:
+        roadmap_data = request_roadmap_from_groq([topic], purpose, stats, provider=provider)
+    except Exception as e:
+        roadmap_data = None
+        stats['error'] = str(e)
+    usage = stats.get('usage') or {}
+    result.update({
+        'latency_ms': int((time.monotonic() - started) * 1000),
+        'attempts': stats.get('attempts', 0),
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'completion_tokens': usage.get('completion_tokens', 0),
+    })
+
+    if roadmap_data is None or stats.get('parse', {}).get('truncated'):
+        result['status'] = 'failed'
+        result['error'] = stats.get('error') or ('truncated output' if roadmap_data else 'generation failed')
+    else:
+        result['status'] = 'generated'
+        result['roadmap_data'] = roadmap_data
+    return result
+
+
+def store_pregenerated(result, model, prompt_version):
+    """Save a generated result to the lookup table; marks the result failed if the write fails"""
+    try:
+        PregeneratedRoadmap.objects.update_or_create(fingerprint=result['fingerprint'], defaults={
+            'topic': result['topic'],
+            'purpose': result['purpose'],
+            'model_name': model,
+            'prompt_version': prompt_version,
+            'roadmap_data': result.pop('roadmap_data'),
+            'latency_ms': result['latency_ms'],
+            'attempts': result['attempts'],
+            'prompt_tokens': result['prompt_tokens'],
+            'completion_tokens': result['completion_tokens'],
+        })
+        return True
+    except DatabaseError as e:
+        result.update({'status': 'failed', 'error': f"store failed: {e}"})
+        return False
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def summarize_results(results):
+    """Counts, latency percentiles and token totals for a pregeneration run"""
+    generated = [r for r in results if r['status'] == 'generated']
+    latencies = [r['latency_ms'] for r in results if r['status'] != 'skipped']
+    summary = {
+        'total': len(results),
+        'generated': len(generated),
+        'skipped': sum(1 for r in results if r['status'] == 'skipped'),
+        'failed': sum(1 for r in results if r['status'] == 'failed'),
+        'prompt_tokens': sum(r.get('prompt_tokens', 0) for r in generated),
+        'completion_tokens': sum(r.get('completion_tokens', 0) for r in generated),
+    }
+    if latencies:
+        summary.update({
+            'latency_ms_p50': percentile(latencies, 0.5),
+            'latency_ms_p95': percentile(latencies, 0.95),
+            'latency_ms_max': max(latencies),
+            'latency_ms_mean': int(sum(latencies) / len(latencies)),
+        })
+    return summary
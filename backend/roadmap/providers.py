@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from django.conf import settings
+
+from .breaker import UpstreamError
+from .llm import get_llm_client, LLM_READ_TIMEOUT
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+GROQ_MODEL = "llama-3.1-8b-instant"
+
+
+class LLMProvider(ABC):
+    """Chat completion backend used by roadmap generation.
+
+    chat_completion returns the decoded response body; stream_chat_completion
+    yields content deltas. Both raise UpstreamError for error responses and
+    let requests exceptions through for network failures.
+    """
+    name = 'base'
+    model = ''
+
+    def is_configured(self):
+        return True
+
+    @abstractmethod
+    def chat_completion(self, payload, timeout=None):
+        """Decoded response body of one chat completion"""
+
+    @abstractmethod
+    def stream_chat_completion(self, payload, timeout=None):
+        """Content deltas of one streamed chat completion"""
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any OpenAI-style /chat/completions endpoint: Groq or the local mock server"""
+
+    def __init__(self, name, base_url, api_key, model):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.model = model
+
+    @property
+    def url(self):
+        return f"{self.base_url}/chat/completions"
+
+    def is_configured(self):
+        # Check if API key is configured
+        if not self.api_key:
+            print(f"❌ {self.name.upper()} API key not configured. Using fallback roadmap.")
+            return False
+        if len(self.api_key) < 10:  # Basic validation
+            print(f"❌ {self.name.upper()} API key appears invalid. Using fallback roadmap.")
+            return False
+        return True
+
+    def headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def chat_completion(self, payload, timeout=None):
+        res = get_llm_client().post(
+            self.url,
+            headers=self.headers(),
+            json={**payload, "model": self.model},
+            timeout=timeout or LLM_READ_TIMEOUT
+        )
+        print(f"{self.name.upper()} API Response Status: {res.status_code}")
+        if res.status_code != 200:
+            print(f"{self.name.upper()} API Error Response: {res.text}")
+            raise UpstreamError(f"{self.name} API error {res.status_code}: {res.text}")
+        return res.json()
+
+    def stream_chat_completion(self, payload, timeout=None):
+        res = get_llm_client().post(
+            self.url,
+            headers=self.headers(),
+            json={**payload, "model": self.model, "stream": True},
+            stream=True,
+            timeout=timeout or LLM_READ_TIMEOUT  # Between chunks, not for the whole stream
+        )
+        try:
+            if res.status_code != 200:
+                raise UpstreamError(f"{self.name} API error {res.status_code}: {res.text}")
+
+            for line in res.iter_lines():
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+        finally:
+            res.close()
+
+
+class CassetteMiss(UpstreamError):
+    """Replay mode found no recording for the request"""
+
+
+class CassetteProvider(LLMProvider):
+    """Record/replay wrapper: one JSON file per distinct request payload.
+
+    'record' always calls the inner provider and saves successful answers
+    (errors are raised, never recorded), 'replay' only reads recordings,
+    'auto' replays when a recording exists and records otherwise. name and
+    model are prefixed with "cassette:" so recorded or replayed runs keep
+    their own circuit breaker and cache entries apart from live traffic.
+    """
+    STREAM_CHUNK_CHARS = 64
+
+    def __init__(self, inner, directory, mode='replay'):
+        if mode not in ('record', 'replay', 'auto'):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        self.inner = inner
+        self.directory = Path(directory)
+        self.mode = mode
+        self.name = f"cassette:{inner.name}"
+        self.model = f"cassette:{inner.model}"
+
+    def is_configured(self):
+        return self.mode == 'replay' or self.inner.is_configured()
+
+    def cassette_path(self, payload):
+        request = {key: value for key, value in payload.items() if key != 'stream'}
+        request['model'] = self.inner.model  # Recordings are keyed by the upstream model
+        key = hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+        return self.directory / f"{key[:32]}.json"
+
+    def _load(self, path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save(self, path, payload, recording):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'request': payload, **recording}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _play(self, recording):
+        if recording.get('status', 200) != 200:
+            raise UpstreamError(f"{self.name} API error {recording['status']}: {recording.get('error', '')} (replayed)")
+        return recording['response']
+
+    def chat_completion(self, payload, timeout=None):
+        path = self.cassette_path(payload)
+        if self.mode != 'record' and path.exists():
+            return self._play(self._load(path))
+        if self.mode == 'replay':
+            raise CassetteMiss(f"No cassette recorded at {path}")
+
+        response = self.inner.chat_completion(payload, timeout)
+        self._save(path, payload, {'status': 200, 'response': response})
+        return response
+
+    def stream_chat_completion(self, payload, timeout=None):
+        # Recordings hold the full completion; replay it in fixed-size chunks
+        response = self.chat_completion(payload, timeout)
+        content = (response.get("choices") or [{}])[0].get("message", {}).get("content", "")
+        for start in range(0, len(content), self.STREAM_CHUNK_CHARS):
+            yield content[start:start + self.STREAM_CHUNK_CHARS]
+
+
+def build_provider(name):
+    if name == 'groq':
+        api_key = getattr(settings, 'GROQ_API_KEY', os.environ.get('GROQ_API_KEY'))
+        return OpenAICompatibleProvider('groq', GROQ_BASE_URL, api_key, GROQ_MODEL)
+    if name == 'mock':
+        return OpenAICompatibleProvider(
+            'mock',
+            getattr(settings, 'LLM_MOCK_BASE_URL', 'http://127.0.0.1:8765/v1'),
+            'mock-local-api-key',
+            'mock-roadmap',
+        )
+    if name == 'cassette':
+        return CassetteProvider(
+            build_provider(getattr(settings, 'LLM_CASSETTE_INNER_PROVIDER', 'groq')),
+            getattr(settings, 'LLM_CASSETTE_DIR', Path(settings.BASE_DIR) / 'cassettes'),
+            getattr(settings, 'LLM_CASSETTE_MODE', 'replay'),
+        )
+    raise ValueError(f"Unknown LLM provider '{name}'")
+
+
+def get_llm_provider():
+    """Provider selected by settings.LLM_PROVIDER ('groq', 'mock' or 'cassette')"""
+    return build_provider(getattr(settings, 'LLM_PROVIDER', 'groq'))
@@ -0,0 +1,320 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FloatField, Q, Sum, Value, Window
+from django.db.models.functions import Cast, Greatest, Ln, RowNumber
+
+from learning.models import Resource
+from .etags import bump_data_versions
+from .models import IndexTerm, NodeResource, NodeTerm, ResourceTerm, RoadmapNode, UserRoadmap
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+# Words that say nothing about a node's subject; roadmap titles are full of them
+STOPWORDS = frozenset((
+    'a an and are as at be by for from in into is it of on or the to with your you '
+    'advanced basic basics beginner concepts foundations fundamental fundamentals guide intermediate '
+    'intro introduction overview part practical practice principles theoretical theory understanding'
+).split())
+LINK_BATCH_SIZE = 500
+# Small catalogs have no common tokens: a token must be in this many resources before it is left out of scores
+COMMON_TERM_MIN_RESOURCES = 50
+
+
+def title_terms(title):
+    """Distinct index tokens of a title"""
+    return {token[:64] for token in TERM_RE.findall((title or '').lower()) if len(token) > 1 and token not in STOPWORDS}
+
+
+def term_ids(texts):
+    """{text: IndexTerm id} for texts, creating missing terms; two queries"""
+    if not texts:
+        return {}
+    IndexTerm.objects.bulk_create([IndexTerm(text=text) for text in sorted(texts)], ignore_conflicts=True)
+    return dict(IndexTerm.objects.filter(text__in=texts).values_list('text', 'id'))
+
+
+def move_resource_counts(deltas):
+    """Apply {term id: delta} to IndexTerm.resource_count; one UPDATE per distinct delta"""
+    by_delta = {}
+    for term_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(term_id)
+    for delta, ids in by_delta.items():
+        IndexTerm.objects.filter(id__in=ids).update(resource_count=Greatest(F('resource_count') + delta, 0))
+
+
+def link_scoring():
+    """(IDF of a ResourceTerm's term, filter of the terms rare enough to link on).
+
+    Like stopwords, tokens found in more than ROADMAP_INDEX_COMMON_TERM_SHARE
+    of the catalog say little about a node, yet they dominate the cost of
+    scoring: every node with such a token would be matched against a large
+    part of the catalog. They are left out of link scores.
+    """
+    resources = Resource.objects.count()
+    common = max(COMMON_TERM_MIN_RESOURCES, int(resources * getattr(settings, 'ROADMAP_INDEX_COMMON_TERM_SHARE', 0.02)))
+    idf = Ln(Value(float(resources + 1)) / Cast(Greatest(F('term__resource_count'), 1), FloatField()))
+    return idf, Q(term__resource_count__lte=common)
+
+
+def stored_links(node_ids):
+    """{node pk: {resource id: score}} of the stored links of nodes; one query"""
+    links = {}
+    for node_id, resource_id, score in NodeResource.objects.filter(node_id__in=node_ids).values_list(
+        'node_id', 'resource_id', 'score',
+    ):
+        links.setdefault(node_id, {})[resource_id] = score
+    return links
+
+
+def ranking(links):
+    return sorted(links.items(), key=lambda link: (-link[1], link[0]))
+
+
+def save_links(ranked, stored):
+    """Replace the stored links of the nodes in ranked ({node pk: [(resource id, score), ...] best first}) where they differ.
+
+    Returns the nodes whose list of resources changed.
+    """
+    stale = [node_id for node_id, links in ranked.items() if ranking(stored.get(node_id, {})) != links]
+    if stale:
+        with transaction.atomic():
+            NodeResource.objects.filter(node_id__in=stale).delete()
+            NodeResource.objects.bulk_create([
+                NodeResource(node_id=node_id, resource_id=resource_id, score=score)
+                for node_id in stale for resource_id, score in ranked[node_id]
+            ], batch_size=LINK_BATCH_SIZE)
+    return [
+        node_id for node_id in stale
+        if [resource_id for resource_id, _score in ranking(stored.get(node_id, {}))] != [resource_id for resource_id, _score in ranked[node_id]]
+    ]
+
+
+def bump_link_owners(node_ids):
+    """New links invalidate the ETags of the users whose roadmaps show the nodes"""
+    node_ids = list(node_ids)
+    owners = set()
+    for start in range(0, len(node_ids), LINK_BATCH_SIZE):
+        nodes = RoadmapNode.objects.filter(id__in=node_ids[start:start + LINK_BATCH_SIZE])
+        owners.update(UserRoadmap.objects.filter(
+            Q(id__in=nodes.values('user_roadmap_id')) | Q(template__in=nodes.values('template_id')),
+        ).exclude(user=None).values_list('user_id', flat=True))
+    bump_data_versions(owners)
+
+
+def refresh_node_links(node_ids):
+    """Recompute the stored NodeResource rows of nodes from the postings.
+
+    A resource scores the IDF sum of the title tokens it shares with the
+    node. Scoring and the per-node top ROADMAP_NODE_RESOURCES cut run in
+    one windowed query per batch of nodes; only nodes whose links differ
+    are rewritten.
+    """
+    node_ids = sorted(set(node_ids))
+    if not node_ids:
+        return
+    limit = getattr(settings, 'ROADMAP_NODE_RESOURCES', 5)
+    idf, linkable = link_scoring()
+    changed = []
+    for start in range(0, len(node_ids), LINK_BATCH_SIZE):
+        batch = node_ids[start:start + LINK_BATCH_SIZE]
+        node = F('term__node_postings__node_id')
+        ranked = ResourceTerm.objects.filter(linkable, term__node_postings__node_id__in=batch).values(
+            'resource_id', node_ref=node,
+        ).annotate(score=Sum(idf)).annotate(
+            rank=Window(RowNumber(), partition_by=node, order_by=[F('score').desc(), F('resource_id').asc()]),
+        ).filter(rank__lte=limit).order_by('node_ref', 'rank')
+        links = {node_id: [] for node_id in batch}
+        for row in ranked:
+            links[row['node_ref']].append((row['resource_id'], row['score']))
+        changed += save_links(links, stored_links(batch))
+    bump_link_owners(changed)
+
+
+def link_resources(resource_ids, removed_terms):
+    """Merge changed resources into the stored links of the nodes sharing their tokens.
+
+    Each resource is scored against those nodes only and takes the place of
+    a weaker link, so a save costs in proportion to the affected nodes, not
+    to every resource they match. removed_terms maps resources to the term
+    ids their titles lost; nodes where such a resource was linked by a lost
+    token are recomputed with refresh_node_links instead. Scores of the
+    other stored links are not revisited as token counts drift;
+    rebuild_resource_index recomputes everything.
+    """
+    limit = getattr(settings, 'ROADMAP_NODE_RESOURCES', 5)
+    idf, linkable = link_scoring()
+    scores = {}
+    for row in ResourceTerm.objects.filter(
+        linkable, resource_id__in=resource_ids, term__node_postings__node_id__isnull=False,
+    ).values('resource_id', node_ref=F('term__node_postings__node_id')).annotate(score=Sum(idf)):
+        scores.setdefault(row['node_ref'], {})[row['resource_id']] = row['score']
+
+    relink = set()
+    lost_ids = set().union(*removed_terms.values())
+    if lost_ids:
+        for node_id, term_id, resource_id in NodeTerm.objects.filter(
+            term_id__in=lost_ids, node__resource_links__resource_id__in=resource_ids,
+        ).values_list('node_id', 'term_id', 'node__resource_links__resource_id'):
+            if term_id in removed_terms.get(resource_id, ()):
+                relink.add(node_id)
+
+    merge = sorted(node_id for node_id in scores if node_id not in relink)
+    changed = []
+    for start in range(0, len(merge), LINK_BATCH_SIZE):
+        batch = merge[start:start + LINK_BATCH_SIZE]
+        stored = stored_links(batch)
+        ranked = {node_id: ranking({**stored.get(node_id, {}), **scores[node_id]})[:limit] for node_id in batch}
+        changed += save_links(ranked, stored)
+    bump_link_owners(changed)
+    refresh_node_links(relink)
+
+
+def index_nodes(nodes):
+    """(Re)build the postings and resource links of node rows, e.g. after a roadmap is saved"""
+    terms = {node.pk: title_terms(node.title) for node in nodes if node.pk is not None}
+    if not terms:
+        return
+    ids = term_ids(set().union(*terms.values()))
+    with transaction.atomic():
+        NodeTerm.objects.filter(node_id__in=list(terms)).delete()
+        NodeTerm.objects.bulk_create([
+            NodeTerm(node_id=node_id, term_id=ids[text]) for node_id, texts in terms.items() for text in texts
+        ], batch_size=LINK_BATCH_SIZE)
+    refresh_node_links(terms)
+
+
+def index_nodes_on_commit(nodes):
+    """index_nodes once the roadmap is committed; saving a roadmap never waits on the catalog"""
+    nodes = list(nodes)
+    transaction.on_commit(lambda: index_nodes(nodes))
+
+
+def index_resources(resource_ids):
+    """Bring the postings of resources in line with their titles and relink the affected nodes.
+
+    Only the changed tokens are touched, and the resources are merged into
+    the links of the nodes sharing their tokens (link_resources). Resources
+    that no longer exist lose their postings.
+    """
+    resource_ids = set(resource_ids)
+    titles = dict(Resource.objects.filter(id__in=resource_ids).values_list('id', 'title'))
+    wanted = {resource_id: title_terms(titles.get(resource_id)) for resource_id in resource_ids}
+    current = {resource_id: {} for resource_id in resource_ids}
+    for resource_id, term_id, text in ResourceTerm.objects.filter(resource_id__in=resource_ids).values_list(
+        'resource_id', 'term_id', 'term__text',
+    ):
+        current[resource_id][text] = term_id
+
+    added = {resource_id: wanted[resource_id] - set(current[resource_id]) for resource_id in resource_ids}
+    removed = {resource_id: set(current[resource_id]) - wanted[resource_id] for resource_id in resource_ids}
+    ids = term_ids(set().union(*added.values()))
+    stale_ids = {current[resource_id][text] for resource_id in resource_ids for text in removed[resource_id]}
+    if not ids and not stale_ids:
+        return
+
+    deltas = Counter()
+    with transaction.atomic():
+        for resource_id in resource_ids:
+            if removed[resource_id]:
+                ResourceTerm.objects.filter(
+                    resource_id=resource_id, term_id__in=[current[resource_id][text] for text in removed[resource_id]],
+                ).delete()
+                deltas.update({current[resource_id][text]: -1 for text in removed[resource_id]})
+            deltas.update({ids[text]: 1 for text in added[resource_id]})
+        ResourceTerm.objects.bulk_create([
+            ResourceTerm(resource_id=resource_id, term_id=ids[text]) for resource_id in resource_ids for text in added[resource_id]
+        ], batch_size=LINK_BATCH_SIZE, ignore_conflicts=True)
+        move_resource_counts(deltas)
+    link_resources(resource_ids, {
+        resource_id: {current[resource_id][text] for text in removed[resource_id]} for resource_id in resource_ids
+    })
+
+
+def resource_terms_removed(term_ids, node_ids):
+    """After resources are deleted (their postings and links cascade), fix counts and refill the nodes they were linked to"""
+    move_resource_counts({term_id: -count for term_id, count in Counter(term_ids).items()})
+    refresh_node_links(node_ids)
+
+
+def node_resource_links(nodes):
+    """{node pk: [Resource, ...]} best first, from the stored links; one query"""
+    links = {}
+    for link in NodeResource.objects.filter(node__in=nodes).select_related(
+        'resource__subject', 'resource__topic',
+    ).order_by('node_id', '-score', 'resource_id'):
+        links.setdefault(link.node_id, []).append(link.resource)
+    return links
+
+
+def title_resource_links(titles):
+    """{key: [Resource, ...]} best first for titles ({key: title}) that have no node row of their own.
+
+    Template nodes renamed in a user's overlay keep the template's title in
+    the index; they are ranked on the overlay title here, scored as in
+    refresh_node_links. Three queries, whatever the number of titles.
+    """
+    terms = {key: title_terms(title) for key, title in titles.items()}
+    texts = set().union(*terms.values()) if terms else set()
+    if not texts:
+        return {key: [] for key in titles}
+    limit = getattr(settings, 'ROADMAP_NODE_RESOURCES', 5)
+    idf, linkable = link_scoring()
+    postings = {}
+    for text, resource_id, weight in ResourceTerm.objects.filter(linkable, term__text__in=texts).annotate(
+        weight=idf,
+    ).values_list('term__text', 'resource_id', 'weight'):
+        postings.setdefault(text, {})[resource_id] = weight
+
+    ranked = {}
+    for key, node_terms in terms.items():
+        scores = Counter()
+        for text in node_terms:
+            scores.update(postings.get(text, {}))
+        ranked[key] = [resource_id for resource_id, _score in ranking(scores)[:limit]]
+    resources = Resource.objects.select_related('subject', 'topic').in_bulk(
+        {resource_id for resource_ids in ranked.values() for resource_id in resource_ids},
+    )
+    return {key: [resources[resource_id] for resource_id in resource_ids] for key, resource_ids in ranked.items()}
+
+
+def rebuild_resource_index(batch_size=2000, stdout=None):
+    """Rebuild every posting and link from the catalog and the node table; returns (resources, nodes)"""
+    with transaction.atomic():
+        NodeResource.objects.all().delete()
+        NodeTerm.objects.all().delete()
+        ResourceTerm.objects.all().delete()
+        IndexTerm.objects.all().delete()
+
+    resource_count = 0
+    counts = Counter()
+    queryset = Resource.objects.order_by('id').values_list('id', 'title')
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        terms = {resource_id: title_terms(title) for resource_id, title in rows}
+        ids = term_ids(set().union(*terms.values()))
+        ResourceTerm.objects.bulk_create([
+            ResourceTerm(resource_id=resource_id, term_id=ids[text]) for resource_id, texts in terms.items() for text in texts
+        ], batch_size=LINK_BATCH_SIZE)
+        counts.update(ids[text] for texts in terms.values() for text in texts)
+        resource_count += len(rows)
+    move_resource_counts(counts)
+
+    node_count = 0
+    last_id = 0
+    while True:
+        nodes = list(RoadmapNode.objects.filter(id__gt=last_id).order_by('id').only('id', 'title')[:batch_size])
+        if not nodes:
+            break
+        last_id = nodes[-1].pk
+        index_nodes(nodes)
+        node_count += len(nodes)
+        if stdout is not None:
+            stdout.write(f"  {node_count} nodes linked")
+    return resource_count, node_count
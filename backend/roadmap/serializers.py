@@ -1,6 +1,7 @@
 # serializers.py
 from rest_framework import serializers
-from .models import StudyPlan, RoadmapTopic, UserRoadmap
+from .models import StudyPlan, RoadmapTopic, UserRoadmap, RoadmapNode
+from .nodes import roadmap_data_of
 
 class RoadmapSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,9 +23,30 @@ class StudyPlanSerializer(serializers.ModelSerializer):
         extra_kwargs = {'user': {'required': False}}
 
 class UserRoadmapSerializer(serializers.ModelSerializer):
+    # Own copy, or the shared template merged with this user's overlay
+    roadmap_data = serializers.SerializerMethodField()
+
     class Meta:
         model = UserRoadmap
         fields = ['id', 'title', 'description', 'subject', 'proficiency', 'weekly_hours', 
-                 'deadline', 'roadmap_data', 'created_at', 'updated_at', 'is_completed']
-        read_only_fields = ['created_at', 'updated_at']
+                 'deadline', 'roadmap_data', 'created_at', 'updated_at', 'is_completed', 'study_plan', 'template',
+                 'node_count', 'total_hours', 'completed_count', 'completed_hours', 'completion_percentage']
+        read_only_fields = ['created_at', 'updated_at', 'study_plan', 'template', 'node_count', 'total_hours',
+                            'completed_count', 'completed_hours', 'completion_percentage']
+
+    def get_roadmap_data(self, obj):
+        return roadmap_data_of(obj)
+
+class UserRoadmapSummarySerializer(serializers.ModelSerializer):
+    """List projection: stored counts and progress, without the roadmap_data JSON"""
+    class Meta:
+        model = UserRoadmap
+        fields = [field for field in UserRoadmapSerializer.Meta.fields if field != 'roadmap_data']
+        read_only_fields = fields
 
+class RoadmapNodeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RoadmapNode
+        fields = ['id', 'node_id', 'parent', 'depth', 'position', 'path', 'title', 'estimated_hours', 'attributes',
+                  'is_completed', 'completed_at']
+        read_only_fields = fields
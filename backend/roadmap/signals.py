@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from learning.models import Resource
+from .etags import bump_data_version
+from .models import NodeResource, ResourceTerm, StudyPlan, UserRoadmap
+from .resource_index import index_resources, resource_terms_removed
+
+
+@receiver([post_save, post_delete], sender=StudyPlan)
+@receiver([post_save, post_delete], sender=UserRoadmap)
+def bump_owner_data_version(sender, instance, **kwargs):
+    """Plans and roadmaps changed through the ORM invalidate their owner's ETags.
+
+    Bulk inserts and queryset updates (batch generation, node progress)
+    bump explicitly since they send no signals.
+    """
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=Resource)
+def index_saved_resource(sender, instance, raw=False, **kwargs):
+    """New and retitled resources reach the roadmap nodes sharing their title tokens"""
+    if not raw:
+        resource_id = instance.pk
+        transaction.on_commit(lambda: index_resources([resource_id]))
+
+
+@receiver(pre_delete, sender=Resource)
+def unindex_deleted_resource(sender, instance, **kwargs):
+    # Postings and links cascade with the resource; keep its term ids to fix counts and its nodes to refill
+    term_ids = list(ResourceTerm.objects.filter(resource=instance).values_list('term_id', flat=True))
+    node_ids = list(NodeResource.objects.filter(resource=instance).values_list('node_id', flat=True))
+    transaction.on_commit(lambda: resource_terms_removed(term_ids, node_ids))
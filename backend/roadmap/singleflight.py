@@ -0,0 +1,158 @@
+import copy
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RoadmapGenerationLock, MetricCounter
+
+# How long a duplicate request waits for the in-flight generation before using the fallback
+ROADMAP_SINGLEFLIGHT_WAIT_SECONDS = getattr(settings, 'ROADMAP_SINGLEFLIGHT_WAIT_SECONDS', 60)
+# Lock lifetime; must exceed the slowest generation or a second leader may start
+ROADMAP_GENERATION_LOCK_TTL_SECONDS = getattr(settings, 'ROADMAP_GENERATION_LOCK_TTL_SECONDS', 150)
+POLL_INTERVAL_SECONDS = 0.5
+
+COUNTER_PREFIX = 'singleflight.'
+
+
+class SingleFlightTimeout(Exception):
+    """The in-flight generation did not finish within the wait timeout"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(key, fn, timeout=None):
+    """Run fn once per key within this process; concurrent callers share its result.
+
+    Returns (result, shared) where shared is True for callers that waited on
+    another thread. Every caller gets its own deep copy so the shared result
+    can be mutated safely. Raises SingleFlightTimeout for waiters.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if not flight.done.wait(timeout):
+            raise SingleFlightTimeout(key)
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result), True
+
+    try:
+        flight.result = fn()
+        return copy.deepcopy(flight.result), False
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def _lock_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def acquire_generation_lock(fingerprint, owner, ttl=None):
+    """Take the cross-process lock for fingerprint; abandoned locks are taken over"""
+    if ttl is None:
+        ttl = ROADMAP_GENERATION_LOCK_TTL_SECONDS
+    now = timezone.now()
+    RoadmapGenerationLock.objects.filter(fingerprint=fingerprint, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            RoadmapGenerationLock.objects.create(
+                fingerprint=fingerprint,
+                owner=owner,
+                expires_at=now + timedelta(seconds=ttl),
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def release_generation_lock(fingerprint, owner):
+    RoadmapGenerationLock.objects.filter(fingerprint=fingerprint, owner=owner).delete()
+
+
+def generation_lock_held(fingerprint):
+    return RoadmapGenerationLock.objects.filter(fingerprint=fingerprint, expires_at__gt=timezone.now()).exists()
+
+
+def wait_for_generation(fingerprint, lookup, timeout):
+    """Poll lookup() until another process publishes a result or gives up"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        result = lookup()
+        if result is not None:
+            return result
+        if not generation_lock_held(fingerprint):
+            # Leader finished without publishing (its generation failed)
+            return lookup()
+    raise SingleFlightTimeout(fingerprint)
+
+
+def coalesce_generation(fingerprint, generate, lookup, wait_timeout=None):
+    """Make concurrent identical generations share one upstream call.
+
+    Threads of this process coalesce in memory; the thread that leads then
+    takes a DB lock so other processes wait on the shared cache (lookup)
+    instead of calling the API themselves. generate() must publish its result
+    where lookup() can find it.
+
+    Returns (result, coalesced). result is None when the leading generation
+    failed or waiting timed out; callers fall back in that case.
+    """
+    if wait_timeout is None:
+        wait_timeout = ROADMAP_SINGLEFLIGHT_WAIT_SECONDS
+
+    def lead():
+        owner = _lock_owner()
+        try:
+            acquired = acquire_generation_lock(fingerprint, owner)
+        except DatabaseError as e:
+            print(f"⚠️ Generation lock unavailable, generating without it: {e}")
+            return generate(), False
+
+        if not acquired:
+            print(f"⏳ Waiting for another worker generating {fingerprint[:12]}")
+            return wait_for_generation(fingerprint, lookup, wait_timeout), True
+
+        try:
+            # Another process may have finished between our cache miss and the lock
+            result = lookup()
+            if result is not None:
+                return result, True
+            return generate(), False
+        finally:
+            release_generation_lock(fingerprint, owner)
+
+    try:
+        (result, coalesced), shared = single_flight(fingerprint, lead, wait_timeout)
+    except SingleFlightTimeout:
+        print(f"⌛ Timed out waiting for in-flight generation {fingerprint[:12]}")
+        MetricCounter.increment(COUNTER_PREFIX + 'timeouts')
+        return None, True
+
+    coalesced = coalesced or shared
+    MetricCounter.increment(COUNTER_PREFIX + ('followers' if coalesced else 'leaders'))
+    return result, coalesced
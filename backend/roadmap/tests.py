@@ -1,6 +1,60 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework.test import APIClient
+from unittest.mock import patch, Mock
+
+from learning.models import Resource, Subject
+from learning.models import Topic as LearningTopic
+
+from .codec import EncodedRoadmapData, benchmark_codec, decode_roadmap, encode_roadmap, stored_roadmap_summary
+from .cache import roadmap_fingerprint, store_cached_roadmap, evict_roadmap_cache, roadmap_cache_stats
+from .jobs import claim_next_job, recover_stale_jobs
+from .management.commands.roadmap_worker import run_roadmap_job
+from .models import (
+    CircuitBreakerState, IndexTerm, NodeResource, PregeneratedRoadmap, RoadmapCacheEntry, RoadmapJob, RoadmapNode,
+    RoadmapTemplate, RoadmapTopic, StudyPlan, UserRoadmap,
+)
+from .nodes import node_scope, refresh_roadmap_data, roadmap_data_of, subtree_hours, subtree_nodes, sync_roadmap_nodes
+from .resource_index import index_resources, rebuild_resource_index, refresh_node_links
+from .persistence import assign_template_to_users, flatten_roadmap_items, save_plan_roadmap
+from .parsing import RoadmapStreamParser, parse_roadmap_document, repair_truncated_json
+from .llm import LLMClient
+from .mock_llm import MockLLMConfig, make_mock_llm_server
+from .providers import CassetteMiss, CassetteProvider, LLMProvider, build_provider
+from .breaker import CircuitBreaker, UpstreamError, backoff_delay
+from .singleflight import single_flight, coalesce_generation, acquire_generation_lock, release_generation_lock
+from .views import ROADMAP_PROMPT_VERSION, get_fallback_roadmap, generate_roadmap_with_source, get_default_user
+
+
+def read_sse_events(response):
+    events = []
+    for block in b''.join(response.streaming_content).decode().strip().split('\n\n'):
+        name, data = block.split('\n', 1)
+        events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def sum_roadmap_hours(items):
+    return sum(item.get('estimated_time_hours', 0) + sum_roadmap_hours(item.get('subtopics', [])) for item in items)
+
+
+TEST_GROQ_KEY = 'gsk_test_0123456789'
 
 class RoadmapGenerateTests(TestCase):
     def setUp(self):
@@ -10,3 +64,1132 @@ class RoadmapGenerateTests(TestCase):
         response = self.client.get('/roadmap/generate/')
         self.assertEqual(response.status_code, 400)
         self.assertIn('error', response.data)
+
+
+class RoadmapCacheTests(TestCase):
+    def setUp(self):
+        self.ai_roadmap = get_fallback_roadmap(['Python'], 'skill_development')
+
+    def test_fingerprint_ignores_case_and_whitespace(self):
+        a = roadmap_fingerprint(['  Machine   Learning '], 'research', 'm', '1')
+        b = roadmap_fingerprint(['machine learning'], 'Research', 'm', '1')
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, roadmap_fingerprint(['machine learning'], 'research', 'm', '2'))
+
+    def test_second_request_is_served_from_cache(self):
+        with patch('roadmap.views.request_roadmap_from_groq', return_value=self.ai_roadmap) as groq:
+            first, first_source = generate_roadmap_with_source(['Python'], 10, 'skill_development')
+            second, second_source = generate_roadmap_with_source(['python'], 40, 'skill_development')
+
+        self.assertEqual(groq.call_count, 1)
+        self.assertEqual((first_source, second_source), ('ai', 'cache'))
+        # Hours are scaled per request, after the lookup
+        self.assertAlmostEqual(sum_roadmap_hours(first['roadmap']), 10, delta=0.5)
+        self.assertAlmostEqual(sum_roadmap_hours(second['roadmap']), 40, delta=0.5)
+        stats = roadmap_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_fallback_roadmaps_are_not_cached(self):
+        with patch('roadmap.views.request_roadmap_from_groq', return_value=None):
+            _, source = generate_roadmap_with_source(['Python'], None, 'research')
+        self.assertEqual(source, 'fallback')
+        self.assertEqual(RoadmapCacheEntry.objects.count(), 0)
+
+    def test_test_groq_without_cache_makes_a_real_call(self):
+        provider = Mock(model='m', is_configured=Mock(return_value=True))
+        provider.name = 'groq'
+        fingerprint = roadmap_fingerprint(['Python'], 'skill_development', 'm', ROADMAP_PROMPT_VERSION)
+        store_cached_roadmap(fingerprint, ['Python'], 'skill_development', 'm', ROADMAP_PROMPT_VERSION, self.ai_roadmap)
+        fresh = get_fallback_roadmap(['Python', 'Fresh'], 'skill_development')
+
+        with patch('roadmap.views.get_llm_provider', return_value=provider), \
+                patch('roadmap.views.request_roadmap_from_groq', return_value=fresh) as groq:
+            cached = APIClient().post('/api/roadmap/test-groq/', {'topic': 'Python'}, format='json')
+            bypassed = APIClient().post('/api/roadmap/test-groq/', {'topic': 'Python', 'use_cache': False}, format='json')
+
+        self.assertEqual(cached.data['source'], 'cache')
+        self.assertEqual(bypassed.data['source'], 'ai')
+        self.assertEqual(groq.call_count, 1)
+        self.assertEqual(bypassed.data['first_topic'], fresh['roadmap'][0]['topic'])
+
+    def test_lru_eviction_keeps_most_recent_entries(self):
+        for i in range(3):
+            store_cached_roadmap(f'fp{i}', [f'T{i}'], 'other', 'm', '1', self.ai_roadmap)
+        evict_roadmap_cache(max_entries=2)
+        self.assertEqual(
+            sorted(RoadmapCacheEntry.objects.values_list('fingerprint', flat=True)),
+            ['fp1', 'fp2'],
+        )
+
+
+class RoadmapJobQueueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def queue_plan(self, topic='Python', priority=0):
+        response = self.client.post('/api/roadmap/studyplan/create/?async=1', {
+            'main_topic': topic, 'available_time': 20, 'purpose_of_study': 'skill_development', 'priority': priority,
+        }, format='json')
+        self.assertEqual(response.status_code, 202)
+        return RoadmapJob.objects.get(id=response.data['job']['id'])
+
+    def test_async_create_returns_job_and_defers_generation(self):
+        with patch('roadmap.views.generate_roadmap_with_source') as generate:
+            job = self.queue_plan()
+        generate.assert_not_called()
+        self.assertEqual(job.status, 'queued')
+        self.assertFalse(UserRoadmap.objects.filter(title='Python - Study Plan').exists())
+
+        status_response = self.client.get(f'/api/roadmap/studyplan/jobs/{job.id}/')
+        self.assertEqual(status_response.data['status'], 'queued')
+
+    def test_claim_prefers_higher_priority(self):
+        self.queue_plan('Low', priority=0)
+        high = self.queue_plan('High', priority=5)
+        claimed = claim_next_job('w1')
+        self.assertEqual(claimed.id, high.id)
+        self.assertEqual((claimed.status, claimed.attempts), ('running', 1))
+
+    def test_worker_persists_roadmap(self):
+        job = self.queue_plan()
+        ai_roadmap = get_fallback_roadmap(['Python'], 'skill_development')
+        with patch('roadmap.views.generate_roadmap_with_source', return_value=(ai_roadmap, 'ai')):
+            run_roadmap_job(claim_next_job('w1'))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.source), ('succeeded', 'ai'))
+        response = self.client.get(f'/api/roadmap/studyplan/jobs/{job.id}/')
+        self.assertEqual(response.data['roadmap']['user_roadmap_id'], job.user_roadmap_id)
+        self.assertTrue(job.study_plan.roadmaps.exists())
+
+    def test_fallback_is_retried_until_last_attempt(self):
+        job = self.queue_plan()
+        with patch('roadmap.views.request_roadmap_from_groq', return_value=None):
+            run_roadmap_job(claim_next_job('w1'))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+
+            RoadmapJob.objects.filter(id=job.id).update(attempts=job.max_attempts - 1, available_at=job.created_at)
+            run_roadmap_job(claim_next_job('w1'))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.source), ('succeeded', 'fallback'))
+
+    def test_stale_running_job_is_requeued(self):
+        job = self.queue_plan()
+        claim_next_job('dead-worker')
+        requeued, failed = recover_stale_jobs(lease_seconds=-1)
+        job.refresh_from_db()
+        self.assertEqual((requeued, failed, job.status), (1, 0, 'queued'))
+
+
+class RoadmapStreamingTests(TestCase):
+    def setUp(self):
+        self.document = json.dumps(get_fallback_roadmap(['Rust'], 'personal_interest'), indent=2)
+
+    def test_parser_emits_each_topic_as_it_closes(self):
+        parser = RoadmapStreamParser()
+        emitted_at = []
+        text = "```json\n" + self.document + "\n```"
+        for i, char in enumerate(text):
+            if parser.feed(char):
+                emitted_at.append(i)
+
+        self.assertEqual([item['id'] for item in parser.items], ['1', '2', '3', '4'])
+        self.assertTrue(parser.finished)
+        # The first topic is available long before the document ends
+        self.assertLess(emitted_at[0], len(text) // 3)
+
+    def test_parser_keeps_complete_topics_of_truncated_output(self):
+        parser = RoadmapStreamParser()
+        parser.feed(self.document[:len(self.document) // 2])
+        self.assertFalse(parser.finished)
+        self.assertGreaterEqual(len(parser.items), 1)
+
+    def test_stream_view_emits_topics_and_persists_roadmap(self):
+        chunks = [self.document[i:i + 40] for i in range(0, len(self.document), 40)]
+        with override_settings(GROQ_API_KEY=TEST_GROQ_KEY), \
+                patch('roadmap.providers.OpenAICompatibleProvider.stream_chat_completion', return_value=iter(chunks)):
+            response = self.client.post('/api/roadmap/generate_roadmap/stream/', {
+                'main_topic': 'Rust', 'available_time': 30, 'purpose_of_study': 'personal_interest',
+            }, content_type='application/json')
+            events = read_sse_events(response)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        names = [name for name, _ in events]
+        self.assertEqual(names, ['plan', 'topic', 'topic', 'topic', 'topic', 'complete'])
+        complete = events[-1][1]
+        self.assertEqual(complete['source'], 'ai')
+        self.assertAlmostEqual(sum_roadmap_hours(complete['roadmap']), 30, delta=0.5)
+        roadmap = UserRoadmap.objects.get(id=complete['user_roadmap_id'])
+        self.assertEqual(roadmap_data_of(roadmap)['roadmap'], complete['roadmap'])
+        self.assertEqual(RoadmapCacheEntry.objects.count(), 1)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LLMClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused_across_requests(self):
+        client = LLMClient(pool_maxsize=2, connect_timeout=1, read_timeout=2)
+        for _ in range(5):
+            self.assertEqual(client.post(self.url, json={}).json(), {'ok': True})
+
+        stats = client.pool_stats()
+        client.close()
+        self.assertEqual(stats['requests_sent'], 5)
+        self.assertEqual((stats['connect_timeout'], stats['read_timeout']), (1, 2))
+        host = stats['hosts'][0]
+        self.assertEqual((host['connections_opened'], host['requests']), (1, 5))
+        self.assertEqual(host['reuse_rate'], 0.8)
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+        release = threading.Event()
+
+        def slow_generation():
+            calls.append(1)
+            release.wait(2)
+            return {'roadmap': [{'id': '1'}]}
+
+        results = []
+
+        def caller():
+            results.append(single_flight('fp', slow_generation, timeout=5))
+
+        threads = [threading.Thread(target=caller) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+        # Each caller owns its copy
+        results[0][0]['roadmap'].clear()
+        self.assertEqual(results[1][0]['roadmap'], [{'id': '1'}])
+
+    def test_generation_lock_is_exclusive_until_released(self):
+        self.assertTrue(acquire_generation_lock('fp', 'worker-a'))
+        self.assertFalse(acquire_generation_lock('fp', 'worker-b'))
+        release_generation_lock('fp', 'worker-a')
+        self.assertTrue(acquire_generation_lock('fp', 'worker-b'))
+
+    def test_abandoned_lock_is_taken_over(self):
+        self.assertTrue(acquire_generation_lock('fp', 'crashed', ttl=-1))
+        self.assertTrue(acquire_generation_lock('fp', 'worker-b'))
+
+    @patch('roadmap.singleflight.POLL_INTERVAL_SECONDS', 0.01)
+    def test_waits_for_other_process_through_lookup(self):
+        acquire_generation_lock('fp', 'other-process')
+        published = iter([None, None, {'roadmap': []}])
+        generate = Mock()
+
+        result, coalesced = coalesce_generation('fp', generate, lambda: next(published), wait_timeout=5)
+
+        generate.assert_not_called()
+        self.assertEqual((result, coalesced), ({'roadmap': []}, True))
+
+    @patch('roadmap.singleflight.POLL_INTERVAL_SECONDS', 0.01)
+    def test_wait_timeout_returns_none_for_fallback(self):
+        acquire_generation_lock('fp', 'other-process')
+        result, coalesced = coalesce_generation('fp', Mock(), lambda: None, wait_timeout=0.05)
+        self.assertEqual((result, coalesced), (None, True))
+
+
+class CircuitBreakerTests(TestCase):
+    def test_opens_after_threshold_and_probes_once_after_reset(self):
+        breaker = CircuitBreaker('test', failure_threshold=2, reset_seconds=0)
+        breaker.record_failure('boom')
+        self.assertEqual(breaker.status()['state'], 'closed')
+        breaker.record_failure('boom')
+        self.assertEqual((breaker.status()['state'], breaker.status()['trip_count']), ('open', 1))
+
+        # Reset timeout elapsed: exactly one caller gets the probe
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.status()['state'], 'half_open')
+        breaker.record_success()
+        self.assertEqual(breaker.status()['state'], 'closed')
+
+    def test_open_circuit_rejects_until_reset(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, reset_seconds=60)
+        breaker.record_failure('boom')
+        self.assertFalse(breaker.allow_request())
+
+    def test_backoff_is_jittered_and_capped(self):
+        delays = [backoff_delay(5, base=1, cap=3) for _ in range(50)]
+        self.assertTrue(all(0 <= d <= 3 for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    @override_settings(GROQ_API_KEY=TEST_GROQ_KEY)
+    @patch('roadmap.providers.get_llm_client')
+    def test_open_circuit_skips_api_and_falls_back_fast(self, get_client):
+        CircuitBreaker('groq', failure_threshold=1, reset_seconds=60).record_failure('outage')
+        roadmap, source = generate_roadmap_with_source(['Go'], None, 'other')
+        get_client.assert_not_called()
+        self.assertEqual(source, 'fallback')
+
+    @override_settings(GROQ_API_KEY=TEST_GROQ_KEY)
+    @patch('roadmap.views.LLM_REQUEST_BUDGET_SECONDS', 0.5)
+    @patch('roadmap.providers.get_llm_client')
+    def test_exhausted_budget_does_not_claim_the_probe(self, get_client):
+        breaker = CircuitBreaker('groq', failure_threshold=1)
+        breaker.record_failure('outage')
+        CircuitBreakerState.objects.filter(name='groq').update(opened_at=timezone.now() - timedelta(hours=1))
+        _roadmap, source = generate_roadmap_with_source(['Go'], None, 'other')
+        get_client.assert_not_called()
+        self.assertEqual(source, 'fallback')
+        # Still open, so the next request with time to spare sends the probe
+        self.assertEqual(breaker.status()['state'], 'open')
+        self.assertTrue(breaker.allow_request())
+
+    @override_settings(GROQ_API_KEY=TEST_GROQ_KEY)
+    @patch('roadmap.views.backoff_delay', return_value=0)
+    @patch('roadmap.providers.get_llm_client')
+    def test_upstream_errors_count_against_breaker(self, get_client, _delay):
+        get_client.return_value.post.return_value = Mock(status_code=503, text='unavailable')
+        generate_roadmap_with_source(['Go'], None, 'other')
+        self.assertEqual(get_client.return_value.post.call_count, 3)
+        self.assertEqual(CircuitBreaker('groq').status()['consecutive_failures'], 3)
+
+
+class RoadmapRecoveryParserTests(TestCase):
+    def setUp(self):
+        self.document = json.dumps(get_fallback_roadmap(['SQL'], 'skill_development'))
+
+    def test_complete_output_with_fences_and_trailing_commas(self):
+        text = 'Here you go:\n```json\n' + self.document.replace(']}', '],}') + '\n```'
+        document, report = parse_roadmap_document(text)
+        self.assertEqual(document, json.loads(self.document))
+        self.assertFalse(report['truncated'])
+
+    def test_truncated_output_keeps_complete_topics(self):
+        cut = self.document.index('"id": "4"') + 20
+        document, report = parse_roadmap_document(self.document[:cut])
+        self.assertEqual([item['id'] for item in document['roadmap']], ['1', '2', '3'])
+        self.assertEqual(document['main_topics'], ['SQL'])
+        self.assertTrue(report['truncated'])
+        self.assertTrue(report['partial_topic_dropped'])
+        self.assertEqual(report['topics_salvaged'], 3)
+
+    def test_nothing_salvageable_raises(self):
+        with self.assertRaises(json.JSONDecodeError):
+            parse_roadmap_document('{"main_topics": ["SQL"], "roadmap": [{"id": "1", "topic": "Jo')
+
+    def test_repair_closes_open_containers(self):
+        self.assertEqual(json.loads(repair_truncated_json('{"a": [1, 2, "thr')), {'a': [1, 2]})
+
+    @override_settings(GROQ_API_KEY=TEST_GROQ_KEY)
+    @patch('roadmap.providers.get_llm_client')
+    def test_truncated_answer_is_used_instead_of_retried(self, get_client):
+        cut = self.document.index('"id": "3"') + 20
+        get_client.return_value.post.return_value = Mock(status_code=200, json=Mock(return_value={
+            'choices': [{'message': {'content': self.document[:cut]}}],
+        }))
+        roadmap, source = generate_roadmap_with_source(['SQL'], None, 'skill_development')
+
+        self.assertEqual(get_client.return_value.post.call_count, 1)
+        self.assertEqual((source, len(roadmap['roadmap'])), ('ai', 2))
+        self.assertEqual(RoadmapCacheEntry.objects.count(), 0)
+
+
+class LLMProviderTests(TestCase):
+    def setUp(self):
+        self.config = MockLLMConfig(seed=1)
+        self.server = make_mock_llm_server(port=0, config=self.config)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}/v1'
+        self.client = APIClient()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_study_plan_generated_through_mock_server(self):
+        with override_settings(LLM_PROVIDER='mock', LLM_MOCK_BASE_URL=self.base_url):
+            roadmap, source = generate_roadmap_with_source(['Kotlin'], 20, 'skill_development')
+        self.assertEqual(source, 'ai')
+        self.assertEqual(roadmap['main_topics'], ['Kotlin'])
+        self.assertAlmostEqual(sum_roadmap_hours(roadmap['roadmap']), 20, delta=0.5)
+        self.assertEqual(RoadmapCacheEntry.objects.get().model_name, 'mock-roadmap')
+        self.assertEqual(self.config.requests_served, 1)
+
+    def test_stream_view_against_mock_server(self):
+        with override_settings(LLM_PROVIDER='mock', LLM_MOCK_BASE_URL=self.base_url):
+            response = self.client.post('/api/roadmap/generate_roadmap/stream/', {
+                'main_topic': 'Elixir', 'available_time': 12, 'purpose_of_study': 'personal_interest',
+            }, format='json')
+            events = read_sse_events(response)
+        self.assertEqual(events[-1][0], 'complete')
+        self.assertEqual(events[-1][1]['source'], 'ai')
+        self.assertGreater(sum(1 for name, _ in events if name == 'topic'), 1)
+
+    def test_mock_errors_fall_back(self):
+        self.config.error_rate = 1.0
+        with override_settings(LLM_PROVIDER='mock', LLM_MOCK_BASE_URL=self.base_url), \
+                patch('roadmap.views.backoff_delay', return_value=0):
+            _roadmap, source = generate_roadmap_with_source(['Kotlin'], None, 'other')
+        self.assertEqual(source, 'fallback')
+        self.assertEqual(CircuitBreaker('mock').status()['consecutive_failures'], 3)
+
+    def test_cassette_replays_recorded_answers_offline(self):
+        payload = {'messages': [{'role': 'user', 'content': 'TOPIC: Zig\nPURPOSE: SKILL (skill_development)'}]}
+        with tempfile.TemporaryDirectory() as cassettes, \
+                override_settings(LLM_MOCK_BASE_URL=self.base_url):
+            recorder = CassetteProvider(build_provider('mock'), cassettes, mode='record')
+            recorded = recorder.chat_completion(payload)
+            self.server.shutdown()
+
+            player = CassetteProvider(build_provider('mock'), cassettes, mode='replay')
+            self.assertEqual(player.chat_completion(payload), recorded)
+            streamed = ''.join(player.stream_chat_completion({**payload, 'stream': True}))
+            self.assertEqual(streamed, recorded['choices'][0]['message']['content'])
+            with self.assertRaises(CassetteMiss):
+                player.chat_completion({'messages': []})
+        self.assertEqual(self.config.requests_served, 1)
+        self.assertEqual((player.name, player.model), ('cassette:mock', 'cassette:mock-roadmap'))
+
+    def test_cassette_does_not_record_errors(self):
+        self.config.error_rate = 1.0
+        payload = {'messages': [{'role': 'user', 'content': 'TOPIC: Zig'}]}
+        with tempfile.TemporaryDirectory() as cassettes, override_settings(LLM_MOCK_BASE_URL=self.base_url):
+            recorder = CassetteProvider(build_provider('mock'), cassettes, mode='record')
+            with self.assertRaises(UpstreamError):
+                recorder.chat_completion(payload)
+            self.assertEqual(os.listdir(cassettes), [])
+
+    def test_providers_must_implement_both_completions(self):
+        class ChatOnly(LLMProvider):
+            def chat_completion(self, payload, timeout=None):
+                return {}
+
+        with self.assertRaises(TypeError):
+            ChatOnly()
+
+
+class PregenerateRoadmapsTests(TransactionTestCase):
+    def setUp(self):
+        self.config = MockLLMConfig(seed=1)
+        self.server = make_mock_llm_server(port=0, config=self.config)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.settings = override_settings(
+            LLM_PROVIDER='mock', LLM_MOCK_BASE_URL=f'http://127.0.0.1:{self.server.server_address[1]}/v1',
+        )
+        self.settings.enable()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.matrix = os.path.join(self.tmp.name, 'matrix.json')
+        with open(self.matrix, 'w') as f:
+            json.dump({'topics': ['Go', 'Rust'], 'purposes': ['academics', 'research']}, f)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.tmp.cleanup()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def pregenerate(self):
+        call_command('pregenerate_roadmaps', self.matrix, '--concurrency', '2', stdout=io.StringIO())
+
+    def test_matrix_is_generated_and_used_before_the_llm(self):
+        self.pregenerate()
+        self.assertEqual(PregeneratedRoadmap.objects.count(), 4)
+        self.assertEqual(self.config.requests_served, 4)
+        entry = PregeneratedRoadmap.objects.get(topic='Go', purpose='research')
+        self.assertGreater(entry.completion_tokens, 0)
+
+        roadmap, source = generate_roadmap_with_source(['go'], 10, 'research')
+        self.assertEqual(source, 'pregenerated')
+        self.assertAlmostEqual(sum_roadmap_hours(roadmap['roadmap']), 10, delta=0.5)
+        self.assertEqual(self.config.requests_served, 4)
+
+    def test_rerun_resumes_from_stored_rows(self):
+        self.config.error_rate = 1.0
+        with patch('roadmap.views.backoff_delay', return_value=0):
+            self.pregenerate()
+        self.assertEqual(PregeneratedRoadmap.objects.count(), 0)
+
+        self.config.error_rate = 0.0
+        CircuitBreaker('mock').record_success()
+        self.pregenerate()
+        served = self.config.requests_served
+        with open(self.matrix + '.checkpoint.json') as f:
+            self.assertEqual(len(json.load(f)['completed']), 4)
+
+        self.pregenerate()
+        self.assertEqual(self.config.requests_served, served)
+
+        # The checkpoint does not override the table: deleted rows are generated again
+        PregeneratedRoadmap.objects.filter(topic='Go').delete()
+        self.pregenerate()
+        self.assertEqual(self.config.requests_served, served + 2)
+        self.assertEqual(PregeneratedRoadmap.objects.count(), 4)
+
+
+class RoadmapPersistenceTests(TestCase):
+    def setUp(self):
+        self.plan = StudyPlan.objects.create(
+            user=get_default_user(), main_topic='Research Methods', available_time=60, purpose_of_study='research',
+        )
+        self.items = get_fallback_roadmap(['Research Methods'], 'research')['roadmap']
+
+    def test_roadmap_is_saved_with_constant_queries(self):
+        nodes = sum(1 + len(item.get('subtopics', [])) for item in self.items)
+        # savepoint, template lookup, savepoint, template, one node insert per depth, release,
+        # UserRoadmap, topics, prerequisite links, release
+        with self.assertNumQueries(11):
+            user_roadmap = save_plan_roadmap(self.plan, self.items)
+
+        self.assertEqual(roadmap_data_of(user_roadmap), {'roadmap': self.items})
+        self.assertEqual(RoadmapTopic.objects.filter(study_plan=self.plan).count(), nodes)
+
+    def test_identical_roadmaps_share_one_template(self):
+        first = save_plan_roadmap(self.plan, self.items)
+        other_plan = StudyPlan.objects.create(user=self.plan.user, main_topic='Research Methods', available_time=60)
+        # savepoint, template lookup, UserRoadmap, topics, prerequisite links, release; no JSON or node copies
+        with self.assertNumQueries(6):
+            second = save_plan_roadmap(other_plan, self.items)
+
+        self.assertEqual(first.template_id, second.template_id)
+        self.assertIsNone(second.roadmap_data)
+        self.assertEqual(RoadmapTemplate.objects.count(), 1)
+        self.assertEqual(RoadmapNode.objects.filter(template=first.template).count(), first.node_count)
+        self.assertEqual(RoadmapNode.objects.filter(user_roadmap__isnull=False).count(), 0)
+
+    def test_template_is_immutable(self):
+        template = save_plan_roadmap(self.plan, self.items).template
+        with self.assertRaises(ValueError):
+            template.save()
+
+    def test_cohort_assignment_is_one_insert(self):
+        template = save_plan_roadmap(self.plan, self.items).template
+        users = [
+            get_user_model()(username=f'student{index}', email=f'student{index}@example.com')
+            for index in range(30)
+        ]
+        get_user_model().objects.bulk_create(users)
+        users = list(get_user_model().objects.filter(username__startswith='student'))
+
+        # savepoint, roadmap INSERT, release (version bumps run after commit)
+        with self.assertNumQueries(3):
+            created = assign_template_to_users(template, users, subject='Research Methods')
+        self.assertEqual(len(created), 30)
+        self.assertEqual(UserRoadmap.objects.filter(template=template).count(), 31)
+        self.assertEqual(RoadmapTemplate.objects.count(), 1)
+
+    def test_prerequisites_are_linked(self):
+        save_plan_roadmap(self.plan, self.items)
+        second = RoadmapTopic.objects.get(study_plan=self.plan, title=self.items[1]['topic'])
+        self.assertEqual(
+            list(second.prerequisites.values_list('title', flat=True)),
+            [self.items[0]['topic']],
+        )
+
+    def test_failure_rolls_back_everything(self):
+        roadmaps_before = UserRoadmap.objects.count()
+        with patch('roadmap.persistence.RoadmapTopic.prerequisites.through.objects.bulk_create',
+                   side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                save_plan_roadmap(self.plan, self.items)
+        self.assertEqual(UserRoadmap.objects.count(), roadmaps_before)
+        self.assertFalse(RoadmapTopic.objects.exists())
+
+
+class UserStudyPlansTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_default_user()
+
+    def create_plan(self, topic):
+        plan = StudyPlan.objects.create(user=self.user, main_topic=topic, available_time=10, purpose_of_study='research')
+        save_plan_roadmap(plan, get_fallback_roadmap([topic], 'research')['roadmap'])
+        return plan
+
+    def test_query_count_does_not_grow_with_plans(self):
+        self.create_plan('Go')
+        with CaptureQueriesContext(connection) as one_plan:
+            self.client.get('/api/roadmap/user_study_plans/')
+        for topic in ['Rust', 'Zig', 'Nim', 'Odin']:
+            self.create_plan(topic)
+        with CaptureQueriesContext(connection) as five_plans:
+            response = self.client.get('/api/roadmap/user_study_plans/')
+
+        self.assertEqual(len(response.data['results']), 6)  # Includes the signup placeholder plan
+        self.assertEqual(len(five_plans), len(one_plan))
+
+    def test_plan_gets_its_own_roadmap_not_a_title_match(self):
+        self.create_plan('Java')
+        self.create_plan('JavaScript')
+        plans = {plan['main_topic']: plan for plan in self.client.get('/api/roadmap/user_study_plans/').data['results']}
+        self.assertEqual(plans['Java']['roadmap_data']['roadmap'][0]['topic'], get_fallback_roadmap(['Java'], 'research')['roadmap'][0]['topic'])
+
+    def test_backfill_links_legacy_roadmaps(self):
+        backfill = importlib.import_module('roadmap.migrations.0018_backfill_userroadmap_study_plan')
+        plan = StudyPlan.objects.create(user=self.user, main_topic='Haskell', available_time=5)
+        legacy = UserRoadmap.objects.create(user=self.user, title='Haskell - Study Plan', roadmap_data={'roadmap': []})
+        UserRoadmap.objects.create(user=self.user, title='Unrelated', roadmap_data={'roadmap': []})
+
+        backfill.link_roadmaps_to_plans(django_apps, None)
+
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.study_plan, plan)
+        self.assertEqual(UserRoadmap.objects.filter(study_plan__isnull=False).count(), 1)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_default_user()
+        # Same created_at date for every plan, so pages rely on the id tiebreak
+        for index in range(6):
+            StudyPlan.objects.create(user=self.user, main_topic=f'Topic {index}', available_time=5)
+        self.expected = list(StudyPlan.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def walk(self, url):
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(plan['id'] for plan in response.data['results'])
+            url, pages = response.data['next'], pages + 1
+        return seen, pages
+
+    def test_pages_cover_every_row_once(self):
+        seen, pages = self.walk('/api/roadmap/user_study_plans/?page_size=2')
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 4)  # 7 plans with the signup placeholder
+
+    def test_rows_inserted_mid_walk_do_not_shift_pages(self):
+        first = self.client.get('/api/roadmap/user_study_plans/?page_size=3').data
+        StudyPlan.objects.create(user=self.user, main_topic='Late', available_time=5)
+        second = self.client.get(first['next']).data
+        self.assertEqual([plan['id'] for plan in second['results']], self.expected[3:6])
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.client.get('/api/roadmap/user_study_plans/?page_size=2').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([plan['id'] for plan in back['results']], self.expected[:2])
+        self.assertIsNotNone(back['next'])
+
+    @override_settings(API_MAX_PAGE_SIZE=3)
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/roadmap/user_study_plans/?page_size=1000')
+        self.assertEqual(response.data['page_size'], 3)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/roadmap/user_study_plans/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_deep_pages_do_not_use_offset(self):
+        first = self.client.get('/api/roadmap/user_study_plans/?page_size=2').data
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first['next'])
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+
+    def test_summary_covers_every_plan_in_one_response(self):
+        plan = StudyPlan.objects.create(user=self.user, main_topic='Elixir', available_time=5)
+        save_plan_roadmap(plan, get_fallback_roadmap(['Elixir'], 'research')['roadmap'])
+        with self.assertNumQueries(4):  # default user and data version for the ETag, default user, plans
+            response = self.client.get('/api/roadmap/user_study_plans/summary/')
+        self.assertEqual(response.data['plan_count'], len(self.expected) + 1)
+        self.assertEqual(response.data['plan_ids_with_roadmap'], [plan.id])
+
+    def test_user_roadmaps_are_paginated(self):
+        response = self.client.get('/api/roadmap/user_roadmaps/?page_size=1')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIn('next', response.data)
+
+    def test_user_roadmaps_list_is_a_summary(self):
+        plan = StudyPlan.objects.create(user=self.user, main_topic='Elixir', available_time=5)
+        roadmap = save_plan_roadmap(plan, get_fallback_roadmap(['Elixir'], 'research')['roadmap'])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/roadmap/user_roadmaps/')
+
+        summary = next(item for item in response.data['results'] if item['id'] == roadmap.id)
+        self.assertNotIn('roadmap_data', summary)
+        self.assertEqual(summary['node_count'], roadmap.node_count)
+        self.assertAlmostEqual(summary['total_hours'], roadmap.total_hours)
+        self.assertFalse(any('roadmap_data' in query['sql'] for query in queries.captured_queries))
+        detail = self.client.get(f'/api/roadmap/roadmap_detail/{roadmap.id}/')
+        self.assertEqual(detail.data['roadmap_data']['roadmap'], roadmap_data_of(roadmap)['roadmap'])
+
+
+class RoadmapNodeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.items = get_fallback_roadmap(['Compilers'], 'academics')['roadmap']
+        plan = StudyPlan.objects.create(user=get_default_user(), main_topic='Compilers', available_time=40)
+        self.roadmap = save_plan_roadmap(plan, self.items)
+
+    def owned_roadmap(self):
+        roadmap = UserRoadmap.objects.create(user=get_default_user(), title='Custom', roadmap_data={'roadmap': self.items})
+        sync_roadmap_nodes(roadmap)
+        return roadmap
+
+    def test_nodes_mirror_roadmap_structure(self):
+        nodes = list(subtree_nodes(self.roadmap))
+        self.assertEqual(len(nodes), sum(1 + len(item.get('subtopics', [])) for item in self.items))
+        child = node_scope(self.roadmap).get(node_id=self.items[0]['subtopics'][0]['id'])
+        self.assertEqual((child.depth, child.parent.node_id), (1, self.items[0]['id']))
+        self.assertAlmostEqual(subtree_hours(self.roadmap), sum_roadmap_hours(self.items))
+
+    def test_subtree_is_a_path_range(self):
+        root = node_scope(self.roadmap).get(node_id=self.items[1]['id'])
+        subtree = list(subtree_nodes(self.roadmap, root).values_list('node_id', flat=True))
+        self.assertEqual(subtree, [self.items[1]['id']] + [sub['id'] for sub in self.items[1]['subtopics']])
+        self.assertAlmostEqual(subtree_hours(self.roadmap, root), sum_roadmap_hours([self.items[1]]))
+
+    def test_node_edits_sync_back_to_roadmap_data(self):
+        roadmap = self.owned_roadmap()
+        RoadmapNode.objects.filter(user_roadmap=roadmap, node_id=self.items[0]['id']).update(title='Lexing')
+        data = refresh_roadmap_data(roadmap)
+        self.assertEqual(data['roadmap'][0]['topic'], 'Lexing')
+        self.assertEqual(data['roadmap'][1:], self.items[1:])
+
+        sync_roadmap_nodes(roadmap)
+        self.assertEqual(RoadmapNode.objects.filter(user_roadmap=roadmap, title='Lexing').count(), 1)
+
+    def test_template_edits_go_to_the_overlay(self):
+        other = save_plan_roadmap(StudyPlan.objects.create(user=get_default_user(), main_topic='Compilers', available_time=40), self.items)
+        node_id = self.items[0]['id']
+        response = self.client.patch(f'/api/roadmap/roadmap_detail/{self.roadmap.id}/nodes/{node_id}/',
+                                     {'topic': 'Lexing', 'notes': 'Start with regexes'}, format='json')
+        self.assertEqual(response.data['title'], 'Lexing')
+        self.assertEqual(response.data['attributes']['notes'], 'Start with regexes')
+
+        self.roadmap.refresh_from_db()
+        self.assertEqual(self.roadmap.overlay['nodes'], {node_id: {'topic': 'Lexing', 'notes': 'Start with regexes'}})
+        self.assertEqual(roadmap_data_of(self.roadmap)['roadmap'][0]['topic'], 'Lexing')
+        # The shared template and the other user's view are untouched
+        self.assertEqual(node_scope(self.roadmap).get(node_id=node_id).title, self.items[0]['topic'])
+        self.assertEqual(roadmap_data_of(other)['roadmap'], self.items)
+
+    def test_owned_node_edit_updates_roadmap_data(self):
+        roadmap = self.owned_roadmap()
+        node_id = self.items[0]['id']
+        response = self.client.patch(f'/api/roadmap/roadmap_detail/{roadmap.id}/nodes/{node_id}/', {'topic': 'Lexing'}, format='json')
+        self.assertEqual(response.data['title'], 'Lexing')
+        roadmap.refresh_from_db()
+        self.assertEqual(roadmap.roadmap_data['roadmap'][0]['topic'], 'Lexing')
+        bad = self.client.patch(f'/api/roadmap/roadmap_detail/{roadmap.id}/nodes/{node_id}/', {'depth': 3}, format='json')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_node_edits_are_validated_on_both_paths(self):
+        node_id = self.items[0]['id']
+        for roadmap in (self.roadmap, self.owned_roadmap()):
+            url = f'/api/roadmap/roadmap_detail/{roadmap.id}/nodes/{node_id}/'
+            for bad in ({'topic': ['Lexing']}, {'topic': {'x': 1}}, {'topic': '  '}, {'notes': 3}):
+                self.assertEqual(self.client.patch(url, bad, format='json').status_code, 400)
+            response = self.client.patch(url, {'topic': 'L' * 300}, format='json')
+            self.assertEqual(response.data['title'], 'L' * 255)
+        self.roadmap.refresh_from_db()
+        self.assertEqual(self.roadmap.overlay['nodes'][node_id], {'topic': 'L' * 255})
+
+    def test_node_endpoints(self):
+        node_id = self.items[0]['id']
+        response = self.client.get(f'/api/roadmap/roadmap_detail/{self.roadmap.id}/nodes/', {'root': node_id})
+        self.assertEqual(response.data['nodes'][0]['node_id'], node_id)
+        self.assertAlmostEqual(response.data['total_hours'], sum_roadmap_hours(self.items[:1]))
+
+        response = self.client.get(f'/api/roadmap/roadmap_detail/{self.roadmap.id}/nodes/{node_id}/')
+        self.assertEqual(len(response.data['children']), len(self.items[0]['subtopics']))
+        missing = self.client.get(f'/api/roadmap/roadmap_detail/{self.roadmap.id}/nodes/99.99/')
+        self.assertEqual(missing.status_code, 404)
+
+
+class RoadmapProgressTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.items = get_fallback_roadmap(['Databases'], 'skill_development')['roadmap']
+        plan = StudyPlan.objects.create(user=get_default_user(), main_topic='Databases', available_time=30)
+        self.roadmap = save_plan_roadmap(plan, self.items)
+        self.url = f'/api/roadmap/roadmap_detail/{self.roadmap.id}/progress/'
+
+    def test_totals_are_stored_on_save(self):
+        self.assertEqual(self.roadmap.node_count, node_scope(self.roadmap).count())
+        self.assertAlmostEqual(self.roadmap.total_hours, sum_roadmap_hours(self.items))
+        self.assertEqual(self.roadmap.completion_percentage, 0)
+
+    def test_patch_updates_weighted_completion_incrementally(self):
+        first, second = self.items[0], self.items[1]
+        # user, roadmap, nodes exist, node hours, savepoint, locked overlay, overlay and totals update, refresh, release
+        with self.assertNumQueries(9):
+            response = self.client.patch(self.url, {'nodes': {first['id']: True, second['id']: True, 'nope': True}}, format='json')
+
+        expected = first['estimated_time_hours'] + second['estimated_time_hours']
+        self.assertAlmostEqual(response.data['completed_hours'], expected)
+        self.assertEqual(response.data['completed_count'], 2)
+        self.assertEqual(response.data['unknown_nodes'], ['nope'])
+        self.assertAlmostEqual(response.data['completion_percentage'], round(100 * expected / self.roadmap.total_hours, 2))
+
+        # Repeating a toggle changes nothing; un-completing subtracts its hours
+        self.client.patch(self.url, {'node_ids': [first['id']], 'completed': True}, format='json')
+        response = self.client.patch(self.url, {'nodes': {second['id']: False}}, format='json')
+        self.assertAlmostEqual(response.data['completed_hours'], first['estimated_time_hours'])
+        self.assertEqual(self.client.get(self.url).data['completed_nodes'], [first['id']])
+
+    def test_completing_every_node_completes_the_roadmap(self):
+        node_ids = list(node_scope(self.roadmap).values_list('node_id', flat=True))
+        response = self.client.patch(self.url, {'node_ids': node_ids, 'completed': True}, format='json')
+        self.assertEqual(response.data['completion_percentage'], 100)
+        self.assertTrue(response.data['is_completed'])
+
+    def test_resync_keeps_completion(self):
+        self.client.patch(self.url, {'nodes': {self.items[0]['id']: True}}, format='json')
+        sync_roadmap_nodes(self.roadmap)
+        self.assertEqual(self.client.get(self.url).data['completed_nodes'], [self.items[0]['id']])
+
+    def test_completion_is_per_user(self):
+        other_user = get_user_model().objects.create(username='classmate', email='classmate@example.com')
+        plan = StudyPlan.objects.create(user=other_user, main_topic='Databases', available_time=30)
+        other = save_plan_roadmap(plan, self.items)
+        self.assertEqual(other.template_id, self.roadmap.template_id)
+
+        self.client.patch(self.url, {'nodes': {self.items[0]['id']: True}}, format='json')
+        other.refresh_from_db()
+        self.assertEqual(other.completed_count, 0)
+        self.assertEqual(other.overlay, {})
+
+    def test_owned_roadmap_progress_uses_node_rows(self):
+        roadmap = UserRoadmap.objects.create(user=get_default_user(), title='Custom', roadmap_data={'roadmap': self.items})
+        sync_roadmap_nodes(roadmap)
+        url = f'/api/roadmap/roadmap_detail/{roadmap.id}/progress/'
+        response = self.client.patch(url, {'nodes': {self.items[0]['id']: True}}, format='json')
+        self.assertEqual(response.data['completed_count'], 1)
+        self.assertTrue(RoadmapNode.objects.get(user_roadmap=roadmap, node_id=self.items[0]['id']).is_completed)
+        self.assertEqual(self.client.get(url).data['completed_nodes'], [self.items[0]['id']])
+
+    def test_invalid_payload(self):
+        self.assertEqual(self.client.patch(self.url, {'nodes': {'1': 'yes'}}, format='json').status_code, 400)
+        self.assertEqual(self.client.patch(self.url, {}, format='json').status_code, 400)
+        for node_ids in ([['1']], [{'id': '1'}], [1]):
+            self.assertEqual(self.client.patch(self.url, {'node_ids': node_ids}, format='json').status_code, 400)
+        self.assertEqual(self.client.patch(self.url, {'node_ids': ['1'], 'completed': 'yes'}, format='json').status_code, 400)
+        self.assertEqual(self.client.patch(self.url, {'node_ids': [], 'completed': 1}, format='json').status_code, 400)
+
+
+class RoadmapBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def fake_generation(self, topics, total_hours, purpose):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        if topics == ['Broken']:
+            raise RuntimeError('upstream exploded')
+        return get_fallback_roadmap(topics, purpose), 'ai'
+
+    def test_runs_items_concurrently_with_partial_success(self):
+        items = [{'topic': f'Topic {i}', 'purpose': 'research', 'hours': 20} for i in range(6)]
+        items += [{'topic': 'Broken'}, {'purpose': 'research'}, {'topic': 'X', 'purpose': 'nope'}]
+        with patch('roadmap.views.generate_roadmap_with_source', side_effect=self.fake_generation):
+            response = self.client.post('/api/roadmap/generate_roadmap/batch/',
+                                        {'items': items, 'concurrency': 3}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.peak, 3)
+        summary = response.data['summary']
+        self.assertEqual((summary['succeeded'], summary['failed'], summary['sources']), (6, 3, {'ai': 6}))
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['ok'] * 6 + ['error'] * 3)
+        self.assertEqual(UserRoadmap.objects.filter(title__startswith='Topic ').count(), 6)
+        self.assertIsNotNone(response.data['results'][0]['user_roadmap_id'])
+
+    def test_rejects_empty_batch(self):
+        response = self.client.post('/api/roadmap/generate_roadmap/batch/', {'items': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.items = get_fallback_roadmap(['Compilers'], 'research')['roadmap']
+        plan = StudyPlan.objects.create(user=get_default_user(), main_topic='Compilers', available_time=20)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.roadmap = save_plan_roadmap(plan, self.items)
+        self.url = f'/api/roadmap/roadmap_detail/{self.roadmap.id}/'
+
+    def test_matching_etag_is_answered_before_the_view_runs(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        # default user, data version; no roadmap query, no serialization
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_is_per_url(self):
+        detail = self.client.get(self.url)['ETag']
+        plans = self.client.get('/api/roadmap/user_study_plans/')['ETag']
+        paged = self.client.get('/api/roadmap/user_study_plans/?page_size=1')['ETag']
+        self.assertEqual(len({detail, plans, paged}), 3)
+
+    def test_progress_update_changes_the_etag(self):
+        etag = self.client.get('/api/roadmap/user_roadmaps/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'{self.url}progress/', {'nodes': {self.items[0]['id']: True}}, format='json')
+
+        response = self.client.get('/api/roadmap/user_roadmaps/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleting_a_plan_changes_the_etag(self):
+        etag = self.client.get('/api/roadmap/user_study_plans/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/roadmap/delete_plan/{self.roadmap.study_plan_id}/')
+        self.assertEqual(self.client.get('/api/roadmap/user_study_plans/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_learning_lists_use_the_requesting_users_version(self):
+        user = get_user_model().objects.create_user(username='etag_user', email='etag@example.com', password='pass12345')
+        self.client.force_authenticate(user)
+        etag = self.client.get('/api/learning/goals/')['ETag']
+        self.assertEqual(self.client.get('/api/learning/goals/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Another user's change leaves this user's ETag alone
+        with self.captureOnCommitCallbacks(execute=True):
+            StudyPlan.objects.create(user=get_default_user(), main_topic='Other', available_time=1)
+        self.assertEqual(self.client.get('/api/learning/goals/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class RoadmapCodecTests(TestCase):
+    def setUp(self):
+        self.data = get_fallback_roadmap(['Operating Systems'], 'academics')
+        self.plan = StudyPlan.objects.create(user=get_default_user(), main_topic='Operating Systems', available_time=10)
+
+    def stored_text(self, row):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT roadmap_data FROM {row._meta.db_table} WHERE id = %s', [row.id])
+            return cursor.fetchone()[0]
+
+    def test_round_trip_and_summary(self):
+        envelope = encode_roadmap(self.data)
+        self.assertEqual(decode_roadmap(envelope), self.data)
+        self.assertEqual(envelope['summary']['node_count'], len(flatten_roadmap_items(self.data['roadmap'])))
+        self.assertAlmostEqual(envelope['summary']['total_hours'], sum_roadmap_hours(self.data['roadmap']))
+        self.assertLess(len(json.dumps(envelope)), len(json.dumps(self.data)) / 2)
+
+    def test_unknown_version_is_rejected(self):
+        envelope = dict(encode_roadmap(self.data), v=99)
+        with self.assertRaises(ValueError):
+            decode_roadmap(envelope)
+
+    @override_settings(ROADMAP_DATA_CODEC='compact')
+    def test_compact_rows_decode_lazily(self):
+        roadmap = save_plan_roadmap(self.plan, self.data['roadmap'])
+        self.assertIn('"_codec"', self.stored_text(roadmap.template))
+
+        owned = UserRoadmap.objects.create(user=self.plan.user, title='Owned', roadmap_data=self.data)
+        self.assertIn('"_codec"', self.stored_text(owned))
+        loaded = UserRoadmap.objects.get(pk=owned.pk)
+        self.assertIsInstance(loaded.__dict__['roadmap_data'], EncodedRoadmapData)
+        with patch('roadmap.codec.decode_roadmap') as decode:
+            summary = stored_roadmap_summary(loaded)
+            loaded.title = 'Renamed'
+            loaded.save()
+        decode.assert_not_called()
+        self.assertEqual(summary['node_count'], roadmap.node_count)
+
+        self.assertEqual(loaded.roadmap_data, self.data)
+        response = self.client.get(f'/api/roadmap/roadmap_detail/{roadmap.pk}/')
+        self.assertEqual(response.json()['roadmap_data']['roadmap'], self.data['roadmap'])
+
+    @override_settings(ROADMAP_DATA_CODEC='compact')
+    def test_values_rows_are_decoded(self):
+        owned = UserRoadmap.objects.create(user=self.plan.user, title='Owned', roadmap_data=self.data)
+        rows = UserRoadmap.objects.filter(pk=owned.pk)
+        self.assertEqual(rows.values('roadmap_data').get()['roadmap_data'], self.data)
+        self.assertEqual(rows.values_list('id', 'roadmap_data').get(), (owned.pk, self.data))
+        self.assertEqual(rows.values_list('roadmap_data', named=True).get().roadmap_data, self.data)
+        self.assertEqual(list(rows.values_list('roadmap_data', flat=True).iterator()), [self.data])
+
+        template = save_plan_roadmap(self.plan, self.data['roadmap']).template
+        self.assertEqual(
+            RoadmapTemplate.objects.filter(pk=template.pk).values_list('roadmap_data', flat=True).get(),
+            {'roadmap': self.data['roadmap']},
+        )
+
+    @override_settings(ROADMAP_DATA_CODEC='json')
+    def test_migration_command_rewrites_rows_both_ways(self):
+        template = save_plan_roadmap(self.plan, self.data['roadmap']).template
+        owned = UserRoadmap.objects.create(user=self.plan.user, title='Owned', roadmap_data=self.data)
+        self.assertNotIn('"_codec"', self.stored_text(template))
+
+        with override_settings(ROADMAP_DATA_CODEC='compact'):
+            call_command('compact_roadmap_data', stdout=io.StringIO())
+        for row in (template, owned):
+            self.assertIn('"_codec"', self.stored_text(row))
+        self.assertEqual(RoadmapTemplate.objects.get(pk=template.pk).roadmap_data, {'roadmap': self.data['roadmap']})
+        self.assertEqual(UserRoadmap.objects.get(pk=owned.pk).roadmap_data, self.data)
+
+        call_command('compact_roadmap_data', stdout=io.StringIO())
+        for row in (template, owned):
+            self.assertNotIn('"_codec"', self.stored_text(row))
+
+    def test_benchmark_on_fallback_roadmaps(self):
+        roadmaps = [get_fallback_roadmap([topic], 'research') for topic in ['Go', 'Python', 'Linear Algebra']]
+        result = benchmark_codec(roadmaps, repeat=2)
+        self.assertEqual(result['roadmaps'], 3)
+        self.assertLess(result['compact_bytes'], result['json_bytes'])
+        # Timings vary with machine load; check they are reported, not how they compare
+        for key in ('json_decode_us', 'compact_decode_us', 'summary_read_us'):
+            self.assertIsInstance(result[key], float)
+            self.assertGreaterEqual(result[key], 0)
+        for data in roadmaps:
+            self.assertEqual(decode_roadmap(json.loads(json.dumps(encode_roadmap(data)))), data)
+
+
+class ResourceIndexTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.subject = Subject.objects.create(name='Programming')
+        self.topic = LearningTopic.objects.create(subject=self.subject, name='Python')
+        self.items = [
+            {'id': '1', 'topic': 'Python functions', 'estimated_time_hours': 4, 'subtopics': [
+                {'id': '1.1', 'topic': 'Introduction to decorators', 'estimated_time_hours': 2},
+            ]},
+            {'id': '2', 'topic': 'SQL joins', 'estimated_time_hours': 3},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.decorators = self.resource('Python decorators explained')
+            self.functions = self.resource('Writing Python functions')
+            self.cooking = self.resource('Introduction to cooking')
+            plan = StudyPlan.objects.create(user=get_default_user(), main_topic='Python', available_time=10)
+            self.roadmap = save_plan_roadmap(plan, self.items)
+
+    def resource(self, title):
+        return Resource.objects.create(
+            title=title, description='', resource_type='article', subject=self.subject, topic=self.topic,
+            difficulty_level='beginner',
+        )
+
+    def links(self, roadmap=None):
+        response = self.client.get(f'/api/roadmap/roadmap_detail/{(roadmap or self.roadmap).id}/resources/')
+        self.assertEqual(response.status_code, 200)
+        return {node['node_id']: [resource['title'] for resource in node['resources']] for node in response.data['nodes']}
+
+    def test_every_node_in_one_request(self):
+        # default user and data version for the ETag, default user, roadmap, node rows, links with their resources
+        with self.assertNumQueries(6):
+            links = self.links()
+        self.assertEqual(links['1'], ['Writing Python functions', 'Python decorators explained'])
+        # "Introduction" is a stopword, so cooking never matches
+        self.assertEqual(links['1.1'], ['Python decorators explained'])
+        self.assertEqual(links['2'], [])
+
+    def test_new_retitled_and_deleted_resources_relink_nodes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            joins = self.resource('SQL joins by example')
+        self.assertEqual(self.links()['2'], ['SQL joins by example'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            joins.title = 'Window functions'
+            joins.save()
+        self.assertEqual(self.links()['2'], [])
+        self.assertEqual(IndexTerm.objects.get(text='joins').resource_count, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.functions.delete()
+        self.assertEqual(self.links()['1'], ['Python decorators explained', 'Window functions'])
+        self.assertEqual(IndexTerm.objects.get(text='python').resource_count, 1)
+
+    def test_links_keep_the_best_resources(self):
+        with override_settings(ROADMAP_NODE_RESOURCES=1), self.captureOnCommitCallbacks(execute=True):
+            self.resource('Python tips')
+        self.assertEqual(self.links()['1'], ['Writing Python functions'])
+
+    def test_owned_roadmaps_are_indexed_on_sync_and_edit(self):
+        roadmap = UserRoadmap.objects.create(user=get_default_user(), title='Custom', roadmap_data={'roadmap': self.items})
+        with self.captureOnCommitCallbacks(execute=True):
+            sync_roadmap_nodes(roadmap)
+        self.assertEqual(self.links(roadmap)['1.1'], ['Python decorators explained'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/roadmap/roadmap_detail/{roadmap.id}/nodes/1.1/', {'topic': 'Cooking basics'}, format='json')
+        self.assertEqual(self.links(roadmap)['1.1'], ['Introduction to cooking'])
+
+    def test_topics_renamed_in_an_overlay_are_linked_on_the_new_title(self):
+        self.assertIsNotNone(self.roadmap.template_id)
+        url = f'/api/roadmap/roadmap_detail/{self.roadmap.id}/nodes/1.1/'
+        self.assertEqual(self.client.patch(url, {'topic': 'Cooking basics'}, format='json').status_code, 200)
+        response = self.client.get(f'/api/roadmap/roadmap_detail/{self.roadmap.id}/resources/')
+        renamed = response.data['nodes'][1]
+        self.assertEqual(renamed['title'], 'Cooking basics')
+        self.assertEqual([resource['title'] for resource in renamed['resources']], ['Introduction to cooking'])
+        self.assertEqual(self.links()['1'], ['Writing Python functions', 'Python decorators explained'])
+
+        # Other users of the template keep the template's links
+        plan = StudyPlan.objects.create(user=get_default_user(), main_topic='Python', available_time=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            other = save_plan_roadmap(plan, self.items)
+        self.assertEqual(other.template_id, self.roadmap.template_id)
+        self.assertEqual(self.links(other)['1.1'], ['Python decorators explained'])
+
+    def test_relinked_nodes_revalidate_the_owners_etag(self):
+        url = f'/api/roadmap/roadmap_detail/{self.roadmap.id}/resources/'
+        etag = self.client.get(url)['ETag']
+        # A queryset update skips the catalog signals; only the new links can move the ETag
+        Resource.objects.filter(pk=self.cooking.pk).update(title='SQL joins cookbook')
+        with self.captureOnCommitCallbacks(execute=True):
+            index_resources([self.cooking.pk])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['nodes'][-1]['resources'][0]['title'], 'SQL joins cookbook')
+
+        # Relinking without a change leaves it valid
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_node_links(RoadmapNode.objects.values_list('id', flat=True))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_common_tokens_are_not_linked_on(self):
+        # "python" is in two of the three resources
+        with override_settings(ROADMAP_INDEX_COMMON_TERM_SHARE=0.5), patch('roadmap.resource_index.COMMON_TERM_MIN_RESOURCES', 1):
+            rebuild_resource_index()
+        self.assertEqual(self.links()['1'], ['Writing Python functions'])
+        self.assertEqual(self.links()['1.1'], ['Python decorators explained'])
+
+    def test_rebuild_matches_incremental_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.resource('Python decorators in depth')
+            self.functions.title = 'SQL functions'
+            self.functions.save()
+        incremental = set(NodeResource.objects.values_list('node_id', 'resource_id'))
+        self.assertEqual(rebuild_resource_index(), (4, 3))
+        self.assertEqual(set(NodeResource.objects.values_list('node_id', 'resource_id')), incremental)
@@ -4,8 +4,12 @@ from . import views
 
 urlpatterns = [
     path('generate_roadmap/', views.generate_roadmap, name='generate_roadmap'),
+    path('generate_roadmap/stream/', views.generate_roadmap_stream, name='generate_roadmap_stream'),
+    path('generate_roadmap/batch/', views.generate_roadmap_batch, name='generate_roadmap_batch'),
     path('user_study_plans/', views.user_study_plans, name='user_study_plans'),
+    path('user_study_plans/summary/', views.user_study_plans_summary, name='user_study_plans_summary'),
     path('studyplan/create/', views.create_study_plan, name='create_study_plan'),
+    path('studyplan/jobs/<int:job_id>/', views.get_roadmap_job_status, name='roadmap_job_status'),
     path('delete_plan/<int:pk>/', views.delete_study_plan, name='delete_study_plan'),
     path('roadmap/get_plan/<int:pk>/', views.get_studyplan_detail, name='get_studyplan_detail'),
     path('roadmap_cards/', views.get_roadmap_cards, name='get_roadmap_cards'),
@@ -13,6 +17,11 @@ urlpatterns = [
     path('user_roadmaps/', views.get_user_roadmaps, name='get_user_roadmaps'),
     path('user_roadmaps/<int:roadmap_id>/', views.delete_user_roadmap, name='delete_user_roadmap'),
     path('roadmap_detail/<int:roadmap_id>/', views.get_roadmap_detail, name='get_roadmap_detail'),
+    path('roadmap_detail/<int:roadmap_id>/nodes/', views.get_roadmap_nodes, name='get_roadmap_nodes'),
+    path('roadmap_detail/<int:roadmap_id>/resources/', views.get_roadmap_resources, name='get_roadmap_resources'),
+    path('roadmap_detail/<int:roadmap_id>/progress/', views.roadmap_progress, name='roadmap_progress'),
+    path('roadmap_detail/<int:roadmap_id>/nodes/<str:node_id>/', views.get_roadmap_node, name='get_roadmap_node'),
     path('purpose-choices/', views.get_purpose_choices, name='get_purpose_choices'),
     path('test-groq/', views.test_groq_api, name='test_groq_api'),
+    path('llm/status/', views.get_llm_status, name='llm_status'),
 ]
@@ -1,20 +1,43 @@
 import json
-import re
 import requests
 import os
-from django.http import JsonResponse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.test import RequestFactory
-from .models import StudyPlan, RoadmapTopic, UserRoadmap, Topic, UserProgress
-from .serializers import StudyPlanSerializer, UserRoadmapSerializer
+from .models import StudyPlan, RoadmapTopic, UserRoadmap, Topic, UserProgress, RoadmapJob, MetricCounter
+from .serializers import StudyPlanSerializer, UserRoadmapSerializer, UserRoadmapSummarySerializer, RoadmapNodeSerializer
+from .cache import (
+    roadmap_fingerprint, get_cached_roadmap, get_pregenerated_roadmap, store_cached_roadmap, roadmap_cache_stats,
+)
+from .jobs import enqueue_roadmap_job, roadmap_job_payload
+from .persistence import get_or_create_templates, save_plan_roadmap, template_roadmap
+from .nodes import (
+    sync_roadmap_nodes, ensure_roadmap_nodes, subtree_nodes, subtree_hours, set_nodes_completed, progress_payload,
+    node_scope, overlay_nodes, completed_node_ids, roadmap_data_of, edit_roadmap_node, EDITABLE_NODE_FIELDS,
+)
+from .parsing import RoadmapStreamParser, parse_roadmap_document
+from .resource_index import node_resource_links, title_resource_links
+from .llm import get_llm_client, LLM_READ_TIMEOUT
+from .providers import get_llm_provider, GROQ_MODEL
+from .singleflight import coalesce_generation
+from .breaker import get_llm_breaker, backoff_delay, UpstreamError, LLM_REQUEST_BUDGET_SECONDS
+from .etags import bump_data_version, conditional_on_user_data
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.utils import timezone
+from learning.serializers import ResourceSerializer
+from learning_roadmap_django.pagination import KeysetPagination
 
-# Get GROQ API key from settings or environment
-GROQ_API_KEY = getattr(settings, 'GROQ_API_KEY', os.environ.get('GROQ_API_KEY'))
+# Bump whenever the prompt or payload changes so cached roadmaps are not reused
+ROADMAP_PROMPT_VERSION = "1"
 
 # Get the custom user model
 User = get_user_model()
@@ -232,34 +255,12 @@ def get_fallback_roadmap(topics, purpose="General"):
         "roadmap": roadmap_items
     }
 
-# ===== Extract JSON from any messy model output =====
-def extract_json(text):
-    try:
-        match = re.search(r"\{[\s\S]*\}$", text.strip())
-        if match:
-            return json.loads(match.group(0))
-    except json.JSONDecodeError:
-        pass
-    return None
-
-def generate_roadmap_with_groq(topics, total_hours=None, purpose="General"):
-    import json, re, requests
-
-    # Check if API key is configured
-    if not GROQ_API_KEY:
-        print("❌ GROQ API key not configured. Using fallback roadmap.")
-        return get_fallback_roadmap(topics, purpose)
-    
-    if len(GROQ_API_KEY) < 10:  # Basic validation
-        print("❌ GROQ API key appears invalid. Using fallback roadmap.")
-        return get_fallback_roadmap(topics, purpose)
-
+def build_roadmap_payload(topics, purpose="General"):
+    """Chat completion payload (prompt and sampling settings) for a roadmap request"""
     if isinstance(topics, str):
         topics = [topics]
 
     topic_str = ", ".join(topics)
-    
-    print(f"🎯 Generating AI roadmap for: {topic_str} (Purpose: {purpose})")
 
     # Map purpose values to detailed specifications
     purpose_configs = {
@@ -466,16 +467,8 @@ Required JSON structure:
 }}
 """
 
-
-
-
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     payload = {
-        "model": "llama-3.1-8b-instant",
+        "model": GROQ_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.8,  # Higher temperature for more creative and detailed responses
         "max_tokens": 10000,  # Increased further for more comprehensive output
@@ -483,23 +476,35 @@ Required JSON structure:
         "frequency_penalty": 0.3,  # Reduce repetitive content
         "presence_penalty": 0.2  # Encourage new topics and concepts
     }
+    return payload
 
-    def request_and_parse():
-        try:
-            res = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30  # Add timeout to prevent hanging
-            )
-            
-            print(f"GROQ API Response Status: {res.status_code}")
-            
-            if res.status_code != 200:
-                print(f"GROQ API Error Response: {res.text}")
-                raise ValueError(f"Groq API error {res.status_code}: {res.text}")
 
-            data = res.json()
+def request_roadmap_from_groq(topics, purpose="General", stats=None, provider=None):
+    """Call the configured LLM provider for a fresh roadmap; returns None when every attempt fails.
+
+    When a stats dict is passed it is filled with details of the generation
+    (attempts made, token usage, parse/salvage report).
+    """
+    if provider is None:
+        provider = get_llm_provider()
+    if not provider.is_configured():
+        return None
+
+    if isinstance(topics, str):
+        topics = [topics]
+
+    topic_str = ", ".join(topics)
+    
+    print(f"🎯 Generating AI roadmap for: {topic_str} (Purpose: {purpose})")
+
+    payload = build_roadmap_payload(topics, purpose)
+
+    def request_and_parse(read_timeout):
+        try:
+            # Never outlive the request budget
+            data = provider.chat_completion(payload, timeout=read_timeout)
+            if stats is not None:
+                stats['usage'] = data.get("usage")
             if not data.get("choices"):
                 raise ValueError("No choices in API response")
                 
@@ -510,25 +515,14 @@ Required JSON structure:
             print(f"Raw API output length: {len(raw_output)}")
             print(f"Raw API output preview: {raw_output[:200]}...")
 
-            # Clean the output more thoroughly
-            raw_output = raw_output.strip()
-            
-            # Remove markdown fences
-            raw_output = re.sub(r"^```[a-zA-Z]*\n?", "", raw_output)
-            raw_output = re.sub(r"\n?```$", "", raw_output)
-            
-            # Remove any explanation before JSON
-            first_brace = raw_output.find("{")
-            if first_brace != -1:
-                raw_output = raw_output[first_brace:]
-            
-            # Find the last closing brace to handle incomplete JSON
-            last_brace = raw_output.rfind("}")
-            if last_brace != -1:
-                raw_output = raw_output[:last_brace + 1]
-
-            print(f"Cleaned output length: {len(raw_output)}")
-            parsed_data = json.loads(raw_output)
+            # Repairs truncated output instead of failing the attempt
+            parsed_data, report = parse_roadmap_document(raw_output)
+            if report['truncated']:
+                print(f"🩹 Salvaged {report['topics_salvaged']} complete topics from truncated output "
+                      f"({report['salvaged_chars']}/{report['input_chars']} chars, "
+                      f"partial topic dropped: {report['partial_topic_dropped']})")
+            if stats is not None:
+                stats['parse'] = report
             
             # Validate the structure
             if not isinstance(parsed_data, dict):
@@ -547,58 +541,72 @@ Required JSON structure:
             print(f"Network error: {e}")
             raise
         except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
+            print(f"JSON parsing error (nothing salvageable): {e}")
             print(f"Problematic JSON: {raw_output[:500]}...")
             raise
         except Exception as e:
             print(f"Other error in request_and_parse: {e}")
             raise
 
-    # Enhanced retry logic with multiple attempts
+    # Retry with jittered exponential backoff inside a total latency budget,
+    # skipping the API entirely while the shared circuit breaker is open
+    breaker = get_llm_breaker(provider.name)
+    deadline = time.monotonic() + LLM_REQUEST_BUDGET_SECONDS
     max_retries = 3
+    roadmap_data = None
     for attempt in range(max_retries):
+        if attempt > 0:
+            delay = backoff_delay(attempt - 1)
+            if time.monotonic() + delay >= deadline:
+                print(f"⌛ Latency budget of {LLM_REQUEST_BUDGET_SECONDS}s exhausted")
+                break
+            print(f"🔄 Retrying in {delay:.2f}s...")
+            time.sleep(delay)
+
+        # Budget first: allow_request() may claim the half-open probe, which must then report back
+        remaining = deadline - time.monotonic()
+        if remaining < 1:
+            print(f"⌛ Latency budget of {LLM_REQUEST_BUDGET_SECONDS}s exhausted")
+            break
+
+        if not breaker.allow_request():
+            print(f"⚡ Circuit open, skipping {provider.name} API")
+            break
+
+        if stats is not None:
+            stats['attempts'] = attempt + 1
         try:
-            print(f"🚀 GROQ API Attempt {attempt + 1}/{max_retries} for purpose: {purpose}")
-            roadmap_data = request_and_parse()
-            print("✅ Successfully generated roadmap using GROQ API")
+            print(f"🚀 {provider.name} API Attempt {attempt + 1}/{max_retries} for purpose: {purpose}")
+            roadmap_data = request_and_parse(min(LLM_READ_TIMEOUT, remaining))
+            breaker.record_success()
+            print(f"✅ Successfully generated roadmap using {provider.name} API")
             break
         except json.JSONDecodeError as e:
+            # The API is healthy, the model output was not
+            breaker.record_success()
             print(f"⚠️ JSON parsing failed on attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                print(f"🔄 Retrying with modified parameters...")
-                # Reduce max_tokens slightly for retry to avoid truncation
-                payload["max_tokens"] = max(4000, payload["max_tokens"] - 1000)
-                payload["temperature"] = 0.5  # Reduce creativity for more consistent output
-                continue
-            else:
-                print(f"❌ All JSON parsing attempts failed")
-                print("🔄 Falling back to template roadmap...")
-                return get_fallback_roadmap(topics, purpose)
+            # Reduce max_tokens slightly for retry to avoid truncation
+            payload["max_tokens"] = max(4000, payload["max_tokens"] - 1000)
+            payload["temperature"] = 0.5  # Reduce creativity for more consistent output
+        except (UpstreamError, requests.exceptions.RequestException) as e:
+            breaker.record_failure(e)
+            print(f"❌ GROQ API failed on attempt {attempt + 1}: {e}")
         except ValueError as e:
+            breaker.record_success()
             print(f"⚠️ API validation error on attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                print(f"🔄 Retrying...")
-                continue
-            else:
-                print(f"❌ All API attempts failed")
-                print("🔄 Falling back to template roadmap...")
-                return get_fallback_roadmap(topics, purpose)
         except Exception as e:
             print(f"❌ GROQ API failed on attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                print(f"🔄 Retrying...")
-                continue
-            else:
-                print(f"❌ All attempts failed")
-                print("🔄 Falling back to template roadmap...")
-                return get_fallback_roadmap(topics, purpose)
-    else:
-        # This should not be reached, but just in case
-        print("❌ Unexpected error: no roadmap_data assigned")
+
+    if roadmap_data is None:
+        print("❌ All attempts failed")
         print("🔄 Falling back to template roadmap...")
-        return get_fallback_roadmap(topics, purpose)
+        return None
+
+    return roadmap_data
+
 
-    # Scale durations if total_hours provided
+def scale_roadmap_hours(roadmap_data, total_hours):
+    """Scale every estimated_time_hours so the roadmap adds up to total_hours"""
     if total_hours and "roadmap" in roadmap_data:
         try:
             total_hours = float(total_hours)
@@ -629,6 +637,56 @@ Required JSON structure:
     return roadmap_data
 
 
+def generate_roadmap_with_source(topics, total_hours=None, purpose="General", use_cache=True):
+    """Resolve a roadmap via the pregenerated table, the shared cache, the LLM provider, then the fallback templates.
+
+    Returns (roadmap_data, source) where source is 'pregenerated', 'cache',
+    'ai', 'coalesced' (shared with an identical in-flight generation) or 'fallback'.
+    """
+    if isinstance(topics, str):
+        topics = [topics]
+
+    provider = get_llm_provider()
+    fingerprint = roadmap_fingerprint(topics, purpose, provider.model, ROADMAP_PROMPT_VERSION)
+
+    roadmap_data = get_pregenerated_roadmap(fingerprint) if use_cache else None
+    source = 'pregenerated'
+    if roadmap_data is None and use_cache:
+        roadmap_data = get_cached_roadmap(fingerprint)
+        source = 'cache'
+    if roadmap_data is not None:
+        print(f"⚡ Roadmap {source} hit for: {', '.join(topics)} (Purpose: {purpose})")
+    else:
+        def generate():
+            stats = {}
+            generated = request_roadmap_from_groq(topics, purpose, stats, provider=provider)
+            # Salvaged partial roadmaps are served but not cached, so the next request can get a full one
+            if generated is not None and not stats.get('parse', {}).get('truncated'):
+                store_cached_roadmap(fingerprint, topics, purpose, provider.model, ROADMAP_PROMPT_VERSION, generated)
+            return generated
+
+        # Identical concurrent requests share one upstream call. Without the cache, only a
+        # generation that finishes after this request started may be shared, never an older entry.
+        stored_after = None if use_cache else timezone.now()
+        roadmap_data, coalesced = coalesce_generation(
+            fingerprint,
+            generate=generate,
+            lookup=lambda: get_cached_roadmap(fingerprint, record_stats=False, stored_after=stored_after),
+        )
+        if roadmap_data is None:
+            return get_fallback_roadmap(topics, purpose), 'fallback'
+        source = 'coalesced' if coalesced else 'ai'
+
+    # Scale after lookup so total_hours never splits cache entries
+    return scale_roadmap_hours(roadmap_data, total_hours), source
+
+
+def generate_roadmap_with_groq(topics, total_hours=None, purpose="General", use_cache=True):
+    """Return a roadmap for topics, scaled to total_hours when given"""
+    roadmap_data, _source = generate_roadmap_with_source(topics, total_hours, purpose, use_cache)
+    return roadmap_data
+
+
 # ===== Main view =====
 @csrf_exempt
 def generate_roadmap(request):
@@ -636,13 +694,13 @@ def generate_roadmap(request):
         try:
             body = json.loads(request.body)
             topics = body.get("topics", [])
+            purpose = body.get("purpose", "General")
 
-            # Strictly try Groq first
-            roadmap_data = generate_roadmap_with_groq(topics)
+            # Cached roadmap first, then Groq
+            roadmap_data = generate_roadmap_with_groq(topics, body.get("total_hours"), purpose)
 
             # Only fallback if API fully fails or JSON invalid
             if not roadmap_data:
-                purpose = body.get("purpose", "General")
                 roadmap_data = get_fallback_roadmap(topics, purpose)
 
             return JsonResponse(roadmap_data, safe=False)
@@ -666,112 +724,123 @@ def get_default_user():
         )
 
 
-@api_view(['POST'])
-def create_study_plan(request):
-    print("Received data:", request.data)
-    serializer = StudyPlanSerializer(data=request.data)
-    if serializer.is_valid():
-        default_user = get_default_user()
-        plan = serializer.save(user=default_user)
+def default_user_id(request):
+    """ETag scope of the views that serve the default user's data"""
+    return get_default_user().pk
 
-        topic_name = serializer.data.get("main_topic")
-        available_time = serializer.data.get("available_time")
-        purpose_of_study = serializer.data.get("purpose_of_study", "General")
 
-        roadmap_data = []
+def build_plan_roadmap(topic_name, available_time, purpose_of_study):
+    """Generate roadmap items for a study plan; always returns (items, source)"""
+    roadmap_data = []
+    source = 'fallback'
 
-        # Try to generate roadmap via GROQ API directly
-        try:
-            print(f"Attempting to generate roadmap for topic(s): {topic_name} with purpose: {purpose_of_study}")
+    # Try cached or Groq roadmap first
+    try:
+        print(f"Attempting to generate roadmap for topic(s): {topic_name} with purpose: {purpose_of_study}")
+
+        roadmap_data, source = generate_roadmap_with_source(
+            topics=[topic_name],
+            total_hours=available_time,
+            purpose=purpose_of_study
+        )
 
-            # Call Groq API directly instead of internal request
-            roadmap_data = generate_roadmap_with_groq(
-                topics=[topic_name],
-                total_hours=available_time,
-                purpose=purpose_of_study
-            )
+        if not roadmap_data or "roadmap" not in roadmap_data:
+            raise ValueError("Invalid roadmap JSON from Groq")
 
-            if not roadmap_data or "roadmap" not in roadmap_data:
-                raise ValueError("Invalid roadmap JSON from Groq")
+        roadmap_data = roadmap_data["roadmap"]
 
-            roadmap_data = roadmap_data["roadmap"]
+        print(f"Extracted roadmap data: {len(roadmap_data)} items")
+        if roadmap_data:
+            print(f"First item structure: {roadmap_data[0]}")
+
+    except Exception as e:
+        print(f"Error generating roadmap: {e}")
+        roadmap_data = []
+        source = 'fallback'
 
-            print(f"Extracted roadmap data: {len(roadmap_data)} items")
+    # Check if we need to use fallback
+    if not roadmap_data:
+        print(f"🔄 FALLBACK TRIGGERED for Topic: '{topic_name}', Purpose: '{purpose_of_study}'")
+        print(f"📝 Reason: AI roadmap generation failed, using purpose-specific fallback")
+        try:
+            fallback_data = get_fallback_roadmap([topic_name], purpose_of_study)
+            roadmap_data = fallback_data.get("roadmap", [])
+            print(f"✅ Generated {len(roadmap_data)} purpose-specific fallback topics")
+            
+            # Log the first few topics to verify purpose-specificity
             if roadmap_data:
-                print(f"First item structure: {roadmap_data[0]}")
+                print(f"📋 Sample fallback topics:")
+                for i, item in enumerate(roadmap_data[:3]):
+                    print(f"   {i+1}. {item.get('topic', 'No topic')}")
+                    
+        except Exception as fallback_error:
+            print(f"❌ ERROR in purpose-specific fallback generation: {fallback_error}")
+            print(f"🚨 Using ULTIMATE GENERIC fallback (not purpose-specific)")
+            # Ultimate fallback - basic generic structure
+            hours_per_topic = max(1, int(available_time) // 4) if available_time else 5
+            roadmap_data = [
+                {
+                    "id": "1",
+                    "topic": f"Introduction to {topic_name}",
+                    "estimated_time_hours": hours_per_topic
+                },
+                {
+                    "id": "2",
+                    "topic": f"Fundamentals of {topic_name}",
+                    "estimated_time_hours": hours_per_topic
+                },
+                {
+                    "id": "3",
+                    "topic": f"Advanced {topic_name}",
+                    "estimated_time_hours": hours_per_topic
+                },
+                {
+                    "id": "4",
+                    "topic": f"Practice and Projects in {topic_name}",
+                    "estimated_time_hours": hours_per_topic
+                }
+            ]
+    else:
+        print(f"✅ AI-Generated roadmap successfully created with {len(roadmap_data)} topics")
 
-        except Exception as e:
-            print(f"Error generating roadmap: {e}")
-            roadmap_data = []
+    return roadmap_data, source
 
-        # Check if we need to use fallback
-        if not roadmap_data:
-            print(f"🔄 FALLBACK TRIGGERED for Topic: '{topic_name}', Purpose: '{purpose_of_study}'")
-            print(f"📝 Reason: AI roadmap generation failed, using purpose-specific fallback")
-            try:
-                fallback_data = get_fallback_roadmap([topic_name], purpose_of_study)
-                roadmap_data = fallback_data.get("roadmap", [])
-                print(f"✅ Generated {len(roadmap_data)} purpose-specific fallback topics")
-                
-                # Log the first few topics to verify purpose-specificity
-                if roadmap_data:
-                    print(f"📋 Sample fallback topics:")
-                    for i, item in enumerate(roadmap_data[:3]):
-                        print(f"   {i+1}. {item.get('topic', 'No topic')}")
-                        
-            except Exception as fallback_error:
-                print(f"❌ ERROR in purpose-specific fallback generation: {fallback_error}")
-                print(f"🚨 Using ULTIMATE GENERIC fallback (not purpose-specific)")
-                # Ultimate fallback - basic generic structure
-                hours_per_topic = max(1, int(available_time) // 4) if available_time else 5
-                roadmap_data = [
-                    {
-                        "id": "1",
-                        "topic": f"Introduction to {topic_name}",
-                        "estimated_time_hours": hours_per_topic
-                    },
-                    {
-                        "id": "2",
-                        "topic": f"Fundamentals of {topic_name}",
-                        "estimated_time_hours": hours_per_topic
-                    },
-                    {
-                        "id": "3",
-                        "topic": f"Advanced {topic_name}",
-                        "estimated_time_hours": hours_per_topic
-                    },
-                    {
-                        "id": "4",
-                        "topic": f"Practice and Projects in {topic_name}",
-                        "estimated_time_hours": hours_per_topic
-                    }
-                ]
-        else:
-            print(f"✅ AI-Generated roadmap successfully created with {len(roadmap_data)} topics")
 
-        # Save complete roadmap
-        user_roadmap = UserRoadmap.objects.create(
-            user=default_user,
-            title=f"{topic_name} - Study Plan",
-            subject=topic_name,
-            roadmap_data={'roadmap': roadmap_data}
-        )
+def is_async_request(request):
+    """Async generation is on per request (?async=1 or "async": true) or globally via settings"""
+    flag = request.query_params.get('async', request.data.get('async'))
+    if flag is None:
+        return getattr(settings, 'ROADMAP_ASYNC_GENERATION', False)
+    return str(flag).lower() in ('1', 'true', 'yes')
 
-        # Save flattened version for progress tracking
-        def flatten_roadmap_for_db(items, plan_ref):
-            for item in items:
-                RoadmapTopic.objects.create(
-                    study_plan=plan_ref,
-                    title=item.get("topic", "Unknown Topic"),
-                    description=f"Estimated time: {item.get('estimated_time_hours', 0)} hours (ID: {item.get('id', '')})"
-                )
-                if 'subtopics' in item and item['subtopics']:
-                    flatten_roadmap_for_db(item['subtopics'], plan_ref)
 
-        flatten_roadmap_for_db(roadmap_data, plan)
+@api_view(['POST'])
+def create_study_plan(request):
+    print("Received data:", request.data)
+    serializer = StudyPlanSerializer(data=request.data)
+    if serializer.is_valid():
+        default_user = get_default_user()
+        plan = serializer.save(user=default_user)
+
+        topic_name = serializer.data.get("main_topic")
+        available_time = serializer.data.get("available_time")
+        purpose_of_study = serializer.data.get("purpose_of_study", "General")
+
+        if is_async_request(request):
+            # Hand generation to the roadmap_worker command and return immediately
+            try:
+                priority = int(request.data.get('priority', 0))
+            except (TypeError, ValueError):
+                priority = 0
+            job = enqueue_roadmap_job(plan, priority=priority)
+            print(f"📥 Queued roadmap job {job.id} for plan {plan.id}")
+            return Response({
+                "plan": serializer.data,
+                "job": roadmap_job_payload(job),
+            }, status=status.HTTP_202_ACCEPTED)
 
-        print(f"Saved roadmap: {len(roadmap_data)} main topics with nested subtopics")
-        print(f"UserRoadmap ID: {user_roadmap.id}")
+        roadmap_data, _source = build_plan_roadmap(topic_name, available_time, purpose_of_study)
+        user_roadmap = save_plan_roadmap(plan, roadmap_data)
 
         return Response({
             "plan": serializer.data,
@@ -785,42 +854,264 @@ def create_study_plan(request):
     print("Error: Serializer errors:", serializer.errors)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def stream_plan_roadmap_events(plan, plan_data):
+    """SSE events for a study plan: plan, one topic per main topic, then complete.
+
+    Topic events carry the model's own hour estimates; the complete event holds
+    the persisted roadmap with hours scaled to the plan's available time.
+    """
+    topics = [plan.main_topic]
+    purpose = plan.purpose_of_study
+    yield sse_event('plan', plan_data)
+
+    provider = get_llm_provider()
+    fingerprint = roadmap_fingerprint(topics, purpose, provider.model, ROADMAP_PROMPT_VERSION)
+    breaker = get_llm_breaker(provider.name)
+    roadmap_items = []
+    source = 'pregenerated'
+
+    cached = get_pregenerated_roadmap(fingerprint)
+    if cached is None:
+        cached = get_cached_roadmap(fingerprint)
+        source = 'cache'
+    if cached is not None:
+        roadmap_items = cached.get('roadmap', [])
+        for item in roadmap_items:
+            yield sse_event('topic', item)
+    elif provider.is_configured() and breaker.allow_request():
+        source = 'ai'
+        parser = RoadmapStreamParser()
+        try:
+            for chunk in provider.stream_chat_completion(build_roadmap_payload(topics, purpose)):
+                for item in parser.feed(chunk):
+                    yield sse_event('topic', item)
+            breaker.record_success()
+        except Exception as e:
+            if isinstance(e, (UpstreamError, requests.exceptions.RequestException)):
+                breaker.record_failure(e)
+            # Keep whatever topics completed before the stream broke
+            print(f"⚠️ Streaming generation stopped after {len(parser.items)} topics: {e}")
+        roadmap_items = parser.items
+        if roadmap_items and parser.finished:
+            store_cached_roadmap(fingerprint, topics, purpose, provider.model, ROADMAP_PROMPT_VERSION,
+                                 {"main_topics": topics, "roadmap": roadmap_items})
+
+    if not roadmap_items:
+        print(f"🔄 FALLBACK TRIGGERED for streamed Topic: '{plan.main_topic}', Purpose: '{purpose}'")
+        source = 'fallback'
+        roadmap_items = get_fallback_roadmap(topics, purpose)["roadmap"]
+        for item in roadmap_items:
+            yield sse_event('topic', item)
+    else:
+        roadmap_items = scale_roadmap_hours({"roadmap": roadmap_items}, plan.available_time)["roadmap"]
+
+    try:
+        user_roadmap = save_plan_roadmap(plan, roadmap_items)
+    except Exception as e:
+        print(f"❌ Failed to save streamed roadmap: {e}")
+        yield sse_event('error', {'error': 'Failed to save roadmap'})
+        return
+
+    yield sse_event('complete', {
+        "main_topic": plan.main_topic,
+        "roadmap": roadmap_items,
+        "user_roadmap_id": user_roadmap.id,
+        "source": source,
+    })
+
+
+@csrf_exempt
+def generate_roadmap_stream(request):
+    """Create a study plan and stream its roadmap topics as Server-Sent Events"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method allowed"}, status=405)
+
+    try:
+        body = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON input"}, status=400)
+
+    serializer = StudyPlanSerializer(data=body)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    plan = serializer.save(user=get_default_user())
+
+    response = StreamingHttpResponse(
+        stream_plan_roadmap_events(plan, serializer.data),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
+def validate_batch_item(index, spec):
+    """Normalize one batch spec; returns (item, error)"""
+    if not isinstance(spec, dict):
+        return None, "Item must be an object"
+    topic = str(spec.get('topic') or '').strip()
+    if not topic:
+        return None, "'topic' is required"
+    purpose = spec.get('purpose') or 'personal_interest'
+    if purpose not in dict(StudyPlan.PURPOSE_CHOICES):
+        return None, f"Unknown purpose '{purpose}'"
+    hours = spec.get('hours')
+    if hours is not None:
+        try:
+            hours = float(hours)
+        except (TypeError, ValueError):
+            return None, "'hours' must be a number"
+        if hours <= 0:
+            return None, "'hours' must be positive"
+    return {'index': index, 'topic': topic, 'purpose': purpose, 'hours': hours}, None
+
+
+def run_batch_item(item):
+    """Generate one batch item in a pool thread"""
+    started = time.monotonic()
+    try:
+        roadmap_data, source = generate_roadmap_with_source([item['topic']], item['hours'], item['purpose'])
+        return {**item, 'status': 'ok', 'source': source, 'roadmap': roadmap_data.get('roadmap', []),
+                'elapsed_ms': round((time.monotonic() - started) * 1000)}
+    except Exception as e:
+        print(f"❌ Batch item {item['index']} failed: {e}")
+        return {**item, 'status': 'error', 'error': str(e),
+                'elapsed_ms': round((time.monotonic() - started) * 1000)}
+    finally:
+        # Pool threads each open their own connection
+        connection.close()
+
+
+@api_view(['POST'])
+def generate_roadmap_batch(request):
+    """Generate many roadmaps concurrently; each item succeeds or fails on its own.
+
+    Body: {"items": [{"topic", "purpose", "hours"}], "concurrency": 4, "persist": true}
+    """
+    specs = request.data.get('items')
+    max_items = getattr(settings, 'ROADMAP_BATCH_MAX_ITEMS', 100)
+    if not isinstance(specs, list) or not specs:
+        return Response({'error': "'items' must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(specs) > max_items:
+        return Response({'error': f"At most {max_items} items per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+    max_concurrency = getattr(settings, 'ROADMAP_BATCH_MAX_CONCURRENCY', 8)
+    try:
+        concurrency = int(request.data.get('concurrency', max_concurrency))
+    except (TypeError, ValueError):
+        concurrency = max_concurrency
+    concurrency = max(1, min(concurrency, max_concurrency))
+    persist = str(request.data.get('persist', True)).lower() not in ('false', '0')
+
+    results = [None] * len(specs)
+    runnable = []
+    for index, spec in enumerate(specs):
+        item, error = validate_batch_item(index, spec)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+        else:
+            runnable.append(item)
+
+    print(f"📦 Batch of {len(specs)} roadmaps ({len(runnable)} valid) with concurrency {concurrency}")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='roadmap-batch') as executor:
+        for result in executor.map(run_batch_item, runnable):
+            results[result['index']] = result
+
+    succeeded = [result for result in results if result['status'] == 'ok']
+    if persist and succeeded:
+        # One transaction; identical roadmaps share a template, new templates and roadmaps insert in batches
+        with transaction.atomic():
+            user = get_default_user()
+            templates = get_or_create_templates([result['roadmap'] for result in succeeded])
+            created = UserRoadmap.objects.bulk_create([
+                template_roadmap(template, user=user, title=f"{result['topic']} - Study Plan", subject=result['topic'])
+                for result, template in zip(succeeded, templates)
+            ])
+            bump_data_version(user.pk)  # bulk_create sends no post_save
+        for result, user_roadmap in zip(succeeded, created):
+            result['user_roadmap_id'] = user_roadmap.id
+
+    sources = {}
+    for result in succeeded:
+        sources[result['source']] = sources.get(result['source'], 0) + 1
+
+    return Response({
+        'results': results,
+        'summary': {
+            'total': len(results),
+            'succeeded': len(succeeded),
+            'failed': len(results) - len(succeeded),
+            'sources': sources,
+            'concurrency': concurrency,
+        },
+    })
+
+
+@api_view(['GET'])
+def get_roadmap_job_status(request, job_id):
+    """Poll the state of a queued study plan generation"""
+    user = get_default_user()
+    try:
+        job = RoadmapJob.objects.select_related('study_plan', 'user_roadmap').get(id=job_id, user=user)
+    except RoadmapJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=404)
+    return Response(roadmap_job_payload(job, include_roadmap=True))
+
+@api_view(['GET'])
+@conditional_on_user_data(default_user_id)
+def user_study_plans_summary(request):
+    """Every study plan of the user in one small payload, for totals on screens that page the full list"""
+    user = get_default_user()
+    plans = StudyPlan.objects.filter(user=user).annotate(
+        has_roadmap=Exists(RoadmapTopic.objects.filter(study_plan=OuterRef('pk')))
+        | Exists(UserRoadmap.objects.filter(study_plan=OuterRef('pk'))),
+    ).order_by('-created_at', '-id').values_list('id', 'has_roadmap')
+    plans = list(plans)
+    return Response({
+        'plan_count': len(plans),
+        'plan_ids_with_roadmap': [plan_id for plan_id, has_roadmap in plans if has_roadmap],
+    })
+
+
 @api_view(['GET'])
+@conditional_on_user_data(default_user_id)
 def user_study_plans(request):
     user = get_default_user()
-    plans = StudyPlan.objects.filter(user=user)
+    # Constant number of queries however many plans: plans, topics, prerequisites, roadmaps
+    paginator = KeysetPagination()
+    plans = paginator.paginate_queryset(StudyPlan.objects.filter(user=user).prefetch_related(
+        'roadmaps__prerequisites',
+        Prefetch('user_roadmaps', queryset=UserRoadmap.objects.select_related('template').order_by('-created_at', '-id'), to_attr='linked_roadmaps'),
+    ), request)
     
-    # Enhance plans with complete roadmap data from UserRoadmap
+    # Enhance plans with complete roadmap data from their UserRoadmap
     enhanced_plans = []
     for plan in plans:
         plan_data = StudyPlanSerializer(plan).data
+        user_roadmap = plan.linked_roadmaps[0] if plan.linked_roadmaps else None
         
-        # Try to find associated UserRoadmap with complete nested data
-        try:
-            user_roadmap = UserRoadmap.objects.filter(
-                user=user,
-                title__icontains=plan.main_topic
-            ).first()
-            
-            if user_roadmap and user_roadmap.roadmap_data:
-                # Use complete nested roadmap from UserRoadmap
-                plan_data['roadmaps'] = user_roadmap.roadmap_data.get('roadmap', [])
-                plan_data['roadmap_data'] = user_roadmap.roadmap_data
-                print(f"Enhanced plan '{plan.main_topic}' with complete roadmap data ({len(plan_data['roadmaps'])} items)")
-            else:
-                # Fallback to basic roadmap from RoadmapTopic (main topics only)
-                print(f"Warning: Using fallback roadmap for '{plan.main_topic}' (no UserRoadmap found)")
-                
-        except Exception as e:
-            print(f"Error enhancing plan '{plan.main_topic}': {e}")
+        roadmap_data = roadmap_data_of(user_roadmap) if user_roadmap else None
+        if roadmap_data:
+            # Use complete nested roadmap from UserRoadmap
+            plan_data['roadmaps'] = roadmap_data.get('roadmap', [])
+            plan_data['roadmap_data'] = roadmap_data
+        else:
+            # Fallback to basic roadmap from RoadmapTopic (main topics only)
+            print(f"Warning: Using fallback roadmap for '{plan.main_topic}' (no UserRoadmap found)")
             
         enhanced_plans.append(plan_data)
     
     print(f"Returning {len(enhanced_plans)} enhanced study plans")
-    return Response(enhanced_plans)
+    return paginator.get_paginated_response(enhanced_plans)
 
 
 @api_view(['GET'])
+@conditional_on_user_data(default_user_id)
 def get_studyplan_detail(request, pk):
     user = get_default_user()
     try:
@@ -893,6 +1184,7 @@ def create_roadmap_from_form(request):
             deadline=data.get('deadline'),
             roadmap_data=data.get('roadmap_data', {})
         )
+        sync_roadmap_nodes(user_roadmap)
         
         serializer = UserRoadmapSerializer(user_roadmap)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -902,12 +1194,15 @@ def create_roadmap_from_form(request):
 
 
 @api_view(['GET'])
+@conditional_on_user_data(default_user_id)
 def get_user_roadmaps(request):
-    """Get all user roadmaps"""
+    """Get all user roadmaps as summaries; the full roadmap_data is served by roadmap_detail"""
     user = get_default_user()
-    roadmaps = UserRoadmap.objects.filter(user=user)
-    serializer = UserRoadmapSerializer(roadmaps, many=True)
-    return Response(serializer.data)
+    paginator = KeysetPagination()
+    # The JSON blob is never read from the table for list pages
+    roadmaps = paginator.paginate_queryset(UserRoadmap.objects.filter(user=user).defer('roadmap_data'), request)
+    serializer = UserRoadmapSummarySerializer(roadmaps, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['DELETE'])
@@ -923,6 +1218,7 @@ def delete_user_roadmap(request, roadmap_id):
 
 
 @api_view(['GET'])
+@conditional_on_user_data(default_user_id)
 def get_roadmap_detail(request, roadmap_id):
     """Get detailed roadmap data"""
     user = get_default_user()
@@ -934,6 +1230,148 @@ def get_roadmap_detail(request, roadmap_id):
         return Response({'error': 'Roadmap not found'}, status=404)
 
 
+@api_view(['GET'])
+@conditional_on_user_data(default_user_id)
+def get_roadmap_nodes(request, roadmap_id):
+    """Flat node list of a roadmap, or of one subtree with ?root=<node id>; optional ?max_depth="""
+    user = get_default_user()
+    try:
+        roadmap = UserRoadmap.objects.get(id=roadmap_id, user=user)
+    except UserRoadmap.DoesNotExist:
+        return Response({'error': 'Roadmap not found'}, status=404)
+    ensure_roadmap_nodes(roadmap)
+
+    root = None
+    root_id = request.query_params.get('root')
+    if root_id:
+        root = node_scope(roadmap).filter(node_id=root_id).first()
+        if root is None:
+            return Response({'error': 'Node not found'}, status=404)
+
+    max_depth = request.query_params.get('max_depth')
+    try:
+        max_depth = int(max_depth) if max_depth is not None else None
+    except ValueError:
+        return Response({'error': 'max_depth must be an integer'}, status=400)
+
+    nodes = subtree_nodes(roadmap, root, max_depth)
+    return Response({
+        'roadmap_id': roadmap.id,
+        'root': root.node_id if root else None,
+        'total_hours': subtree_hours(roadmap, root),
+        'nodes': RoadmapNodeSerializer(overlay_nodes(roadmap, nodes), many=True).data,
+    })
+
+
+@api_view(['GET'])
+@conditional_on_user_data(default_user_id)
+def get_roadmap_resources(request, roadmap_id):
+    """Linked learning resources of every node of a roadmap, in document order"""
+    user = get_default_user()
+    try:
+        roadmap = UserRoadmap.objects.get(id=roadmap_id, user=user)
+    except UserRoadmap.DoesNotExist:
+        return Response({'error': 'Roadmap not found'}, status=404)
+
+    nodes = list(node_scope(roadmap).order_by('path'))
+    if not nodes:
+        ensure_roadmap_nodes(roadmap)
+        nodes = list(node_scope(roadmap).order_by('path'))
+    nodes = overlay_nodes(roadmap, nodes)
+    links = node_resource_links(node_scope(roadmap))
+    if roadmap.template_id is not None:
+        # The index holds the template's titles; topics renamed in this user's overlay are ranked on the new title
+        edits = roadmap.overlay.get('nodes') or {}
+        links.update(title_resource_links({
+            node.pk: node.title for node in nodes if 'topic' in edits.get(node.node_id, {})
+        }))
+    return Response({
+        'roadmap_id': roadmap.id,
+        'nodes': [
+            {
+                'node_id': node.node_id,
+                'title': node.title,
+                'resources': ResourceSerializer(links.get(node.pk, []), many=True).data,
+            }
+            for node in nodes
+        ],
+    })
+
+
+@api_view(['GET', 'PATCH'])
+@conditional_on_user_data(default_user_id)
+def get_roadmap_node(request, roadmap_id, node_id):
+    """One roadmap node with its direct children and the hours of its whole subtree.
+
+    PATCH changes the node's topic or notes; on a shared template the edit
+    is kept in this user's overlay.
+    """
+    user = get_default_user()
+    try:
+        roadmap = UserRoadmap.objects.get(id=roadmap_id, user=user)
+    except UserRoadmap.DoesNotExist:
+        return Response({'error': 'Roadmap not found'}, status=404)
+    ensure_roadmap_nodes(roadmap)
+
+    node = node_scope(roadmap).filter(node_id=node_id).first()
+    if node is None:
+        return Response({'error': 'Node not found'}, status=404)
+
+    if request.method == 'PATCH':
+        changes = {key: value for key, value in request.data.items() if key in EDITABLE_NODE_FIELDS}
+        if not changes:
+            return Response({'error': f"Provide any of: {', '.join(EDITABLE_NODE_FIELDS)}"}, status=400)
+        try:
+            edit_roadmap_node(roadmap, node, changes)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+    data = RoadmapNodeSerializer(overlay_nodes(roadmap, [node])[0]).data
+    data['children'] = RoadmapNodeSerializer(overlay_nodes(roadmap, node.children.order_by('path')), many=True).data
+    data['subtree_hours'] = subtree_hours(roadmap, node)
+    return Response(data)
+
+
+@api_view(['GET', 'PATCH'])
+@conditional_on_user_data(default_user_id)
+def roadmap_progress(request, roadmap_id):
+    """Read or update per-node completion of a roadmap.
+
+    PATCH accepts {"nodes": {"1.2": true, "3": false}} or
+    {"node_ids": ["1.2", "3"], "completed": true}.
+    """
+    user = get_default_user()
+    try:
+        roadmap = UserRoadmap.objects.get(id=roadmap_id, user=user)
+    except UserRoadmap.DoesNotExist:
+        return Response({'error': 'Roadmap not found'}, status=404)
+    ensure_roadmap_nodes(roadmap)
+
+    if request.method == 'GET':
+        data = progress_payload(roadmap)
+        data['completed_nodes'] = completed_node_ids(roadmap)
+        return Response(data)
+
+    changes = request.data.get('nodes')
+    if changes is None and 'node_ids' in request.data:
+        node_ids = request.data.get('node_ids')
+        completed = request.data.get('completed', True)
+        if not isinstance(node_ids, list) or not all(isinstance(node_id, str) for node_id in node_ids):
+            return Response({'error': "'node_ids' must be a list of node id strings"}, status=400)
+        if not isinstance(completed, bool):
+            return Response({'error': "'completed' must be true or false"}, status=400)
+        changes = {node_id: completed for node_id in node_ids}
+    if not isinstance(changes, dict) or not changes:
+        return Response({'error': "Provide 'nodes' as {node_id: completed} or 'node_ids' with 'completed'"}, status=400)
+    if not all(isinstance(value, bool) for value in changes.values()):
+        return Response({'error': 'Completion values must be true or false'}, status=400)
+
+    unknown = set_nodes_completed(roadmap, changes)
+    data = progress_payload(roadmap)
+    data['unknown_nodes'] = unknown
+    return Response(data)
+
+
 @api_view(['GET'])
 def get_purpose_choices(request):
     """Get available purpose of study choices"""
@@ -950,28 +1388,38 @@ def test_groq_api(request):
     print(f"🧪 Testing GROQ API for: {topic} (Purpose: {purpose})")
     
     # Check API key
-    if not GROQ_API_KEY:
+    provider = get_llm_provider()
+    if not provider.is_configured():
         return Response({
             'status': 'error',
-            'message': 'GROQ API key not configured',
+            'message': f'{provider.name} API key not configured',
+            'provider': provider.name,
             'fallback_used': True
         })
     
+    # Pass use_cache=false to force a real Groq round trip
+    use_cache = str(request.data.get('use_cache', True)).lower() not in ('false', '0')
+    
     try:
-        result = generate_roadmap_with_groq([topic], total_hours=40, purpose=purpose)
+        result, source = generate_roadmap_with_source([topic], total_hours=40, purpose=purpose, use_cache=use_cache)
         
-        if result and "roadmap" in result:
+        if result and "roadmap" in result and source != 'fallback':
             return Response({
                 'status': 'success',
-                'message': 'AI generation successful',
+                'message': 'AI generation successful' if source == 'ai' else 'Served from roadmap cache',
                 'roadmap_items': len(result["roadmap"]),
                 'first_topic': result["roadmap"][0].get("topic") if result["roadmap"] else None,
+                'source': source,
+                'provider': provider.name,
+                'cache': roadmap_cache_stats(),
                 'fallback_used': False
             })
         else:
             return Response({
                 'status': 'error',
-                'message': 'Invalid roadmap structure',
+                'message': 'AI generation failed, fallback roadmap used',
+                'source': source,
+                'cache': roadmap_cache_stats(),
                 'fallback_used': True
             })
             
@@ -980,4 +1428,17 @@ def test_groq_api(request):
             'status': 'error',
             'message': str(e),
             'fallback_used': True
-        })
\ No newline at end of file
+        })
+
+
+@api_view(['GET'])
+def get_llm_status(request):
+    """Connection pool, cache, coalescing and circuit breaker statistics"""
+    provider = get_llm_provider()
+    return Response({
+        'pool': get_llm_client().pool_stats(),
+        'cache': roadmap_cache_stats(),
+        'singleflight': MetricCounter.values('singleflight.'),
+        'provider': {'name': provider.name, 'model': provider.model},
+        'breaker': get_llm_breaker(provider.name).status(),
+    })
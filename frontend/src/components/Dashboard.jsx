@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
-import { getStudyPlansFromStorage, calculateProgressStats, getProgressForPlan } from '../utils/studyPlanUtils';
+import { getStudyPlansFromStorage, calculateProgressStats, getProgressForPlan, fetchPage } from '../utils/studyPlanUtils';
 
 const Dashboard = () => {
   const { user } = useAuth();
@@ -42,17 +42,27 @@ const Dashboard = () => {
   const fetchDashboardData = async () => {
     try {
       let roadmapsData = [];
+      // Plans the stats cover: { id, hasRoadmap } for every plan, not only the ones shown
+      let statsPlans = null;
+      let planCount = 0;
       
       // If user is authenticated, prioritize backend data
       if (user && localStorage.getItem('access')) {
         try {
           const token = localStorage.getItem('access');
-          const response = await axios.get('http://localhost:8000/api/roadmap/user_study_plans/', {
+          const config = {
             headers: {
               'Authorization': `Token ${token}`
             }
-          });
-          roadmapsData = response.data || [];
+          };
+          // Only the cards shown are fetched; the totals come from the summary endpoint
+          const [page, summary] = await Promise.all([
+            fetchPage(axios, 'http://localhost:8000/api/roadmap/user_study_plans/?page_size=6', config),
+            axios.get('http://localhost:8000/api/roadmap/user_study_plans/summary/', config),
+          ]);
+          roadmapsData = page.items;
+          statsPlans = summary.data.plan_ids_with_roadmap.map(id => ({ id, hasRoadmap: true }));
+          planCount = summary.data.plan_count;
           console.log('Fetched roadmaps from backend:', roadmapsData);
         } catch (error) {
           console.warn('Backend API failed for authenticated user:', error);
@@ -92,12 +102,21 @@ const Dashboard = () => {
       let inProgressTasks = 0;
       let completedRoadmaps = 0;
 
-      roadmapsData.forEach(roadmap => {
+      if (statsPlans === null) {
+        // Local plans are all in memory already
+        statsPlans = roadmapsData.map(roadmap => ({
+          id: roadmap.id,
+          hasRoadmap: Boolean(roadmap.roadmaps && roadmap.roadmaps.length > 0)
+        }));
+        planCount = roadmapsData.length;
+      }
+
+      statsPlans.forEach(plan => {
         try {
           // Get saved progress for this specific user
-          const savedProgress = getProgressForPlan(roadmap.id, userId);
+          const savedProgress = getProgressForPlan(plan.id, userId);
           
-          if (roadmap.roadmaps && roadmap.roadmaps.length > 0) {
+          if (plan.hasRoadmap) {
             // Calculate stats directly from saved progress
             const stats = calculateProgressStats(savedProgress);
             totalTasks += stats.total;
@@ -115,7 +134,7 @@ const Dashboard = () => {
       });
 
       setStats({
-        totalRoadmaps: roadmapsData.length,
+        totalRoadmaps: planCount,
         completedTasks,
         totalTasks,
         inProgressTasks,
@@ -6,6 +6,7 @@ import {
   getStudyPlansFromStorage,
   getProgressForPlan,
   calculateProgressStats,
+  fetchPage,
 } from "../utils/studyPlanUtils";
 
 const Progress = () => {
@@ -61,10 +62,19 @@ const Progress = () => {
   const fetchStudyPlans = async () => {
     setLoading(true);
     try {
-      const response = await axios.get(
-        "http://localhost:8000/api/roadmap/user_study_plans/"
-      );
-      let plans = response.data || [];
+      // Only this week's plans are shown and pages come newest first,
+      // so stop once a page reaches past the last seven days
+      const weekAgo = new Date();
+      weekAgo.setHours(0, 0, 0, 0);
+      weekAgo.setDate(weekAgo.getDate() - 7);
+      let plans = [];
+      let url = "http://localhost:8000/api/roadmap/user_study_plans/";
+      while (url) {
+        const page = await fetchPage(axios, url);
+        plans = plans.concat(page.items);
+        const oldest = page.items[page.items.length - 1];
+        url = oldest && new Date(oldest.created_at) >= weekAgo ? page.next : null;
+      }
 
       if (plans.length === 0) {
         console.log("No backend data, using localStorage...");
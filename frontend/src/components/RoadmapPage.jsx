@@ -2,11 +2,14 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import axios from 'axios';
+import { fetchPage } from '../utils/studyPlanUtils';
 
 const RoadmapPage = () => {
   const [roadmapCards, setRoadmapCards] = useState([]);
   const [userRoadmaps, setUserRoadmaps] = useState([]);
   const [filteredUserRoadmaps, setFilteredUserRoadmaps] = useState([]);
+  const [nextPageUrl, setNextPageUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [customTopic, setCustomTopic] = useState('');
   const [customHours, setCustomHours] = useState('');
@@ -54,9 +57,9 @@ const RoadmapPage = () => {
       setRoadmapCards(cardsResponse.data.roadmap_cards);
 
       // Fetch user-created roadmaps
-      const userRoadmapsResponse = await axios.get('http://localhost:8000/api/roadmap/user_roadmaps/');
-      const roadmaps = userRoadmapsResponse.data.roadmaps;
-      setUserRoadmaps(roadmaps);
+      const page = await fetchPage(axios, 'http://localhost:8000/api/roadmap/user_roadmaps/');
+      setUserRoadmaps(page.items);
+      setNextPageUrl(page.next);
       
       // No longer extracting purposes since filters are removed
     } catch (error) {
@@ -66,6 +69,20 @@ const RoadmapPage = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextPageUrl) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(axios, nextPageUrl);
+      setUserRoadmaps(prev => [...prev, ...page.items]);
+      setNextPageUrl(page.next);
+    } catch (error) {
+      console.error('Error loading more roadmaps:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const generateRoadmap = async (topic, hours = null) => {
     setIsGenerating(true);
     try {
@@ -94,7 +111,7 @@ const RoadmapPage = () => {
 
   const handleUserRoadmapClick = (roadmap) => {
     console.log('Selected roadmap:', roadmap);
-    alert(`Roadmap: ${roadmap.title}\\nItems: ${roadmap.roadmap_data?.roadmap?.length || 0}`);
+    alert(`Roadmap: ${roadmap.title}\\nItems: ${roadmap.node_count || 0}`);
   };
 
   const handleCustomSubmit = (e) => {
@@ -247,6 +264,18 @@ const RoadmapPage = () => {
               ))}
             </div>
             )}
+
+            {nextPageUrl && (
+              <div className="text-center mt-8">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="bg-white hover:bg-gray-50 text-green-600 border border-green-600 px-6 py-2 rounded-lg transition-all disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         )}
 
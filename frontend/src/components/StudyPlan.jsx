@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { useNavigate, useLocation, useSearchParams } from 'react-router-dom';
 import axios from 'axios';
-import { getStudyPlansFromStorage, getProgressForPlan, calculateProgressStats, deleteStudyPlanFromStorage } from '../utils/studyPlanUtils';
+import { getStudyPlansFromStorage, getProgressForPlan, calculateProgressStats, deleteStudyPlanFromStorage, fetchPage } from '../utils/studyPlanUtils';
 import RoadmapGraph from './RoadmapGraph';
 
 const StudyPlan = () => {
@@ -17,6 +17,8 @@ const StudyPlan = () => {
   const [openMenuId, setOpenMenuId] = useState(null);
   const [selectedRoadmap, setSelectedRoadmap] = useState(null);
   const [showRoadmapDetail, setShowRoadmapDetail] = useState(false);
+  const [nextPageUrl, setNextPageUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Helper function to convert purpose values to human-readable labels
   const getPurposeLabel = (purposeValue) => {
@@ -155,6 +157,51 @@ const StudyPlan = () => {
     setFilteredRoadmaps(filtered);
   }, [roadmaps]);
 
+  // Progress for each roadmap using both saved progress and nodeStatuses
+  const progressFor = (roadmapsData) => {
+    const progress = {};
+    roadmapsData.forEach(roadmap => {
+      try {
+        // Get saved progress from localStorage
+        const savedProgress = getProgressForPlan(roadmap.id);
+        
+        // Get nodeStatuses for real-time updates
+        const nodeStatuses = JSON.parse(localStorage.getItem('nodeStatuses')) || {};
+        
+        // Merge progress data, prioritizing nodeStatuses for accuracy
+        let mergedProgress = { ...savedProgress };
+        
+        if (roadmap.roadmaps && roadmap.roadmaps.length > 0) {
+          roadmap.roadmaps.forEach((item, index) => {
+            const topicName = item.topic || item.title || `Topic ${index + 1}`;
+            const nodeId = item.id?.toString() || topicName || `topic-${index}`;
+            
+            // Use nodeStatus if available, otherwise use saved progress
+            if (nodeStatuses[nodeId]) {
+              mergedProgress[topicName] = nodeStatuses[nodeId];
+            } else if (!mergedProgress[topicName]) {
+              mergedProgress[topicName] = 'Not Started';
+            }
+          });
+        }
+        
+        if (Object.keys(mergedProgress).length > 0) {
+          const stats = calculateProgressStats(mergedProgress);
+          progress[roadmap.id] = {
+            ...stats,
+            progress: mergedProgress
+          };
+        } else {
+          progress[roadmap.id] = { completed: 0, inProgress: 0, total: 0, percentage: 0, progress: {} };
+        }
+      } catch (error) {
+        console.error('Error reading progress:', error);
+        progress[roadmap.id] = { completed: 0, inProgress: 0, total: 0, percentage: 0, progress: {} };
+      }
+    });
+    return progress;
+  };
+
   const fetchRoadmaps = async (forceRefresh = false) => {
     setLoading(true);
     try {
@@ -162,13 +209,15 @@ const StudyPlan = () => {
       
       // First try backend API (like Progress component does)
       try {
-        const response = await axios.get('http://localhost:8000/api/roadmap/user_study_plans/');
-        console.log('Backend study plans:', response.data);
-        roadmapsData = response.data || [];
+        const page = await fetchPage(axios, 'http://localhost:8000/api/roadmap/user_study_plans/');
+        roadmapsData = page.items;
+        setNextPageUrl(page.next);
+        console.log('Backend study plans:', roadmapsData);
         console.log('Using backend data:', roadmapsData);
       } catch (error) {
         console.warn('Backend API failed:', error);
         roadmapsData = [];
+        setNextPageUrl(null);
       }
       
       // Also get localStorage data and merge/prioritize it
@@ -219,47 +268,7 @@ const StudyPlan = () => {
       // No longer extracting purposes since filters are removed
       
       // Calculate progress for each roadmap using both saved progress and nodeStatuses
-      const progress = {};
-      roadmapsData.forEach(roadmap => {
-        try {
-          // Get saved progress from localStorage
-          const savedProgress = getProgressForPlan(roadmap.id);
-          
-          // Get nodeStatuses for real-time updates
-          const nodeStatuses = JSON.parse(localStorage.getItem('nodeStatuses')) || {};
-          
-          // Merge progress data, prioritizing nodeStatuses for accuracy
-          let mergedProgress = { ...savedProgress };
-          
-          if (roadmap.roadmaps && roadmap.roadmaps.length > 0) {
-            roadmap.roadmaps.forEach((item, index) => {
-              const topicName = item.topic || item.title || `Topic ${index + 1}`;
-              const nodeId = item.id?.toString() || topicName || `topic-${index}`;
-              
-              // Use nodeStatus if available, otherwise use saved progress
-              if (nodeStatuses[nodeId]) {
-                mergedProgress[topicName] = nodeStatuses[nodeId];
-              } else if (!mergedProgress[topicName]) {
-                mergedProgress[topicName] = 'Not Started';
-              }
-            });
-          }
-          
-          if (Object.keys(mergedProgress).length > 0) {
-            const stats = calculateProgressStats(mergedProgress);
-            progress[roadmap.id] = {
-              ...stats,
-              progress: mergedProgress
-            };
-          } else {
-            progress[roadmap.id] = { completed: 0, inProgress: 0, total: 0, percentage: 0, progress: {} };
-          }
-        } catch (error) {
-          console.error('Error reading progress:', error);
-          progress[roadmap.id] = { completed: 0, inProgress: 0, total: 0, percentage: 0, progress: {} };
-        }
-      });
-      setProgressData(progress);
+      setProgressData(progressFor(roadmapsData));
     } catch (error) {
       console.error('Error fetching roadmaps:', error);
     } finally {
@@ -267,6 +276,21 @@ const StudyPlan = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextPageUrl) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(axios, nextPageUrl);
+      setRoadmaps(prev => [...prev, ...page.items.filter(plan => !prev.some(existing => existing.id === plan.id))]);
+      setProgressData(prev => ({ ...prev, ...progressFor(page.items) }));
+      setNextPageUrl(page.next);
+    } catch (error) {
+      console.error('Error loading more study plans:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleCreateNewRoadmap = () => {
     navigate('/form');
   };
@@ -561,6 +585,18 @@ const StudyPlan = () => {
           </div>
         )}
 
+        {nextPageUrl && (
+          <div className="text-center mt-8">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="bg-white hover:bg-gray-50 text-purple-600 border border-purple-600 px-6 py-2 rounded-lg transition-all disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
+
         {/* Quick Stats */}
         {roadmaps.length > 0 && (
           <div className="mt-12 bg-white rounded-lg shadow-lg p-6">
@@ -181,3 +181,15 @@ export const calculateProgressStats = (progress) => {
     percentage
   };
 };
+
+// List endpoints are cursor paginated ({ next, previous, results }): screens load one page,
+// then follow `next` only when the user asks for more
+export const fetchPage = async (client, url, config = {}) => {
+  const response = await client.get(url, config);
+  const data = response.data;
+  if (Array.isArray(data)) {
+    // Unpaginated endpoint
+    return { items: data, next: null };
+  }
+  return { items: data?.results || [], next: data?.next || null };
+};